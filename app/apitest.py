@@ -1,14 +1,21 @@
-from app.database.connection import supabase_db
+import asyncio
+
+from app.database.connection import database
 
 user_id = "4a8881cd-1568-4234-a24b-d9e90b1c19ad"
 activity_type = "quiz_completed"
 
-existing_user = (
-    supabase_db
-    .table('user_activities')
-    .select("*")
-    .eq('activity_type', activity_type)
-    .execute()
-)
 
-print(existing_user.data[0])
\ No newline at end of file
+async def main():
+    existing_user = await (
+        database
+        .table('user_activities')
+        .select("*")
+        .eq('activity_type', activity_type)
+        .execute()
+    )
+    print(existing_user.data[0])
+    await database.close()
+
+
+asyncio.run(main())
@@ -1,6 +1,189 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from redis import asyncio as aioredis
+from app.core.config import settings
+from app.core.app_logging import app_logger as logger
+
+# Shared async Redis connection, set up by setup_cache() when REDIS_URL is configured
+redis_client: Optional[aioredis.Redis] = None
+
+# Set per request by the middleware in main.py when the client asks to skip cached LLM output
+llm_cache_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+LLM_CACHE_BYPASS_HEADER = "x-llm-cache"
+
+
 async def setup_cache():
-    redis = aioredis.from_url("redis://localhost", encoding="utf8", decode_responses=True)
-    FastAPICache.init(RedisBackend(redis), prefix="alif-cache:")
+    global redis_client
+    redis_client = aioredis.from_url(settings.REDIS_URL or "redis://localhost", encoding="utf8", decode_responses=True)
+    FastAPICache.init(RedisBackend(redis_client), prefix="alif-cache:")
+
+
+async def close_cache():
+    global redis_client
+    if redis_client is not None:
+        await redis_client.close()
+        redis_client = None
+
+
+def wants_cache_bypass(headers) -> bool:
+    """True if the request asked for fresh LLM output (X-LLM-Cache: bypass or Cache-Control: no-cache)."""
+    if headers.get(LLM_CACHE_BYPASS_HEADER, "").lower() == "bypass":
+        return True
+    return "no-cache" in headers.get("cache-control", "").lower()
+
+
+def _key_default(value: Any):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True, mode="json")
+    return str(value)
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for LLM text responses.
+
+    Keys are a SHA-256 of model, generation config and prompt. Entries live in an
+    in-process LRU bounded by entry count and total size, and in Redis (when
+    configured) so every worker shares them. Identical requests that arrive while
+    the first one is still generating wait for it instead of calling Gemini again.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: int, prefix: str = "alif-llm:"):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._size = 0
+        self._inflight: dict = {}
+        self.stats = {"memory_hits": 0, "redis_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        raw = json.dumps(parts, sort_keys=True, default=_key_default, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            self._remove_local(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _remove_local(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def _set_local(self, key: str, value: str, ttl: int):
+        if len(value) > self.max_bytes:
+            return
+        self._remove_local(key)
+        self._entries[key] = (time.time() + ttl, value)
+        self._size += len(value)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            oldest_key, _ = next(iter(self._entries.items()))
+            self._remove_local(oldest_key)
+            self.stats["evictions"] += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._get_local(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+
+        if redis_client is not None:
+            try:
+                value = await redis_client.get(self.prefix + key)
+            except Exception as e:
+                logger.warning(f"LLM cache Redis read failed: {e}")
+                value = None
+            if value is not None:
+                self.stats["redis_hits"] += 1
+                self._set_local(key, value, self.ttl_seconds)
+                return value
+
+        return None
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None):
+        ttl = ttl or self.ttl_seconds
+        self._set_local(key, value, ttl)
+        if redis_client is not None:
+            try:
+                await redis_client.set(self.prefix + key, value, ex=ttl)
+            except Exception as e:
+                logger.warning(f"LLM cache Redis write failed: {e}")
+
+    async def get_or_generate(self, key: str, producer: Callable[[], Awaitable[str]]) -> str:
+        """Return the cached value for key, or await producer() and cache its result."""
+        if llm_cache_bypass.get():
+            self.stats["bypassed"] += 1
+            value = await producer()
+            if isinstance(value, str):
+                await self.set(key, value)
+            return value
+
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Only swallow the cancellation if it was the first request that got cancelled
+                if not inflight.cancelled():
+                    raise
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await producer()
+            if isinstance(value, str):
+                await self.set(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; mark the exception as retrieved
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["redis_hits"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "redis_enabled": redis_client is not None
+        }
+
+
+llm_cache = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    max_bytes=settings.LLM_CACHE_MAX_BYTES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+)
@@ -10,11 +10,84 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     LLAMA_KEY: str = os.getenv("LLAMA_KEY", "")
     GEMINI_KEY: str = os.getenv("GEMINI_KEY", "")
+    GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
 
     GEMINI_MODEL_NAME: str = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash")
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+    GEMINI_TIMEOUT_SECONDS: float = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    LLM_CACHE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    VECTOR_STORE_DIR: str = os.getenv("VECTOR_STORE_DIR", "data/vector_stores")
+    VECTOR_STORE_MAX_RESIDENT: int = int(os.getenv("VECTOR_STORE_MAX_RESIDENT", "32"))
+    VECTOR_INDEX_TYPE: str = os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+    VECTOR_INDEX_PROMOTE_THRESHOLD: int = int(os.getenv("VECTOR_INDEX_PROMOTE_THRESHOLD", "50000"))
+    VECTOR_INDEX_TRAIN_SAMPLE: int = int(os.getenv("VECTOR_INDEX_TRAIN_SAMPLE", "20000"))
+    VECTOR_INDEX_HNSW_M: int = int(os.getenv("VECTOR_INDEX_HNSW_M", "32"))
+    VECTOR_INDEX_HNSW_EF_SEARCH: int = int(os.getenv("VECTOR_INDEX_HNSW_EF_SEARCH", "64"))
+    VECTOR_INDEX_NPROBE: int = int(os.getenv("VECTOR_INDEX_NPROBE", "16"))
+    RETRIEVAL_K: int = int(os.getenv("RETRIEVAL_K", "3"))
+    RETRIEVAL_FETCH_K: int = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+    RETRIEVAL_HYBRID_ALPHA: float = float(os.getenv("RETRIEVAL_HYBRID_ALPHA", "0.6"))
+    RETRIEVAL_RERANK: bool = os.getenv("RETRIEVAL_RERANK", "True") == "True"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite3")
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+    EMBEDDING_MAX_CONCURRENCY: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+    EMBEDDING_MAX_RETRIES: int = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+    EMBEDDING_RETRY_BASE_SECONDS: float = float(os.getenv("EMBEDDING_RETRY_BASE_SECONDS", "1.0"))
+    INGESTION_CHUNK_TOKENS: int = int(os.getenv("INGESTION_CHUNK_TOKENS", "250"))
+    INGESTION_CHUNK_OVERLAP_TOKENS: int = int(os.getenv("INGESTION_CHUNK_OVERLAP_TOKENS", "50"))
+    INGESTION_WORKERS: int = int(os.getenv("INGESTION_WORKERS", "2"))
+    INGESTION_JOB_TTL_SECONDS: int = int(os.getenv("INGESTION_JOB_TTL_SECONDS", str(24 * 60 * 60)))
+
+    CHAT_HISTORY_MAX_SESSIONS: int = int(os.getenv("CHAT_HISTORY_MAX_SESSIONS", "1000"))
+    CHAT_HISTORY_MAX_MESSAGES: int = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "40"))
+    CHAT_HISTORY_KEEP_RECENT: int = int(os.getenv("CHAT_HISTORY_KEEP_RECENT", "12"))
+    CHAT_HISTORY_TTL_SECONDS: int = int(os.getenv("CHAT_HISTORY_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+
+    EXTRACTION_MAX_WORKERS: int = int(os.getenv("EXTRACTION_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+    EXTRACTION_PARALLEL_MIN_PAGES: int = int(os.getenv("EXTRACTION_PARALLEL_MIN_PAGES", "32"))
+    EXTRACTION_MAX_PAGES: int = int(os.getenv("EXTRACTION_MAX_PAGES", "1000"))
+    EXTRACTION_MAX_BYTES: int = int(os.getenv("EXTRACTION_MAX_BYTES", str(50 * 1024 * 1024)))
+    EXTRACTION_CACHE_DIR: str = os.getenv("EXTRACTION_CACHE_DIR", "data/extraction_cache")
+    EXTRACTION_CACHE_MAX_BYTES: int = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+    SUMMARY_CHUNK_TOKENS: int = int(os.getenv("SUMMARY_CHUNK_TOKENS", "8000"))
+    ANALYSIS_CHUNK_TOKENS: int = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "8000"))
+    ANALYSIS_MAX_CONCURRENCY: int = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "8"))
+    SUMMARY_MAX_CONCURRENCY: int = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "8"))
+    SUMMARY_REDUCE_FAN_IN: int = int(os.getenv("SUMMARY_REDUCE_FAN_IN", "8"))
+
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+    UPLOAD_MEMORY_LIMIT: int = int(os.getenv("UPLOAD_MEMORY_LIMIT", str(8 * 1024 * 1024)))
+    UPLOAD_SPOOL_DIR: str = os.getenv("UPLOAD_SPOOL_DIR", "")
 
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
+    DB_TIMEOUT_SECONDS: float = float(os.getenv("DB_TIMEOUT_SECONDS", "10"))
+    DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "20"))
+    DB_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("DB_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    DB_SLOW_QUERY_MS: float = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+
+    USER_LOOKUP_NEGATIVE_CACHE_SIZE: int = int(os.getenv("USER_LOOKUP_NEGATIVE_CACHE_SIZE", "10000"))
+    USER_LOOKUP_NEGATIVE_TTL_SECONDS: float = float(os.getenv("USER_LOOKUP_NEGATIVE_TTL_SECONDS", "60"))
+
+    # Trusting token claims skips the per-request user lookup, but a demoted or
+    # deleted user keeps their privileges until the token expires.
+    AUTH_TRUST_TOKEN_CLAIMS: bool = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "False") == "True"
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))
+
+    ACTIVITY_BATCH_SIZE: int = int(os.getenv("ACTIVITY_BATCH_SIZE", "100"))
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "2"))
+    ACTIVITY_SPILL_DIR: str = os.getenv("ACTIVITY_SPILL_DIR", "data/activity_spill")
 
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
     ALGORITHM: str = "HS256"
@@ -0,0 +1,86 @@
+"""
+In-process publish/subscribe bus telling modules about changes.
+
+When Redis is configured the bus also relays events over Redis pub/sub, so every
+worker sees uploads, resets and registrations made on another. Kept free of the
+vector store and LangChain so lightweight modules (e.g. auth) can import it.
+"""
+import asyncio
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.core.app_logging import app_logger as logger
+
+# Published after an owner's documents were added or cleared
+DOCUMENTS_CHANGED = "documents_changed"
+
+# Published after an account is created; payload["identifiers"] holds its username and email
+USER_REGISTERED = "user_registered"
+
+EVENTS_CHANNEL = "alif-events"
+
+# handler(owner_id, payload); payload["remote"] is True for events from another worker
+EventHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class EventBus:
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._subscribers: Dict[str, List[EventHandler]] = {}
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, event: str, handler: EventHandler):
+        self._subscribers.setdefault(event, []).append(handler)
+
+    async def publish(self, event: str, owner_id: str, **payload):
+        """Run local subscribers, then relay the event to other workers over Redis."""
+        await self._dispatch(event, owner_id, {**payload, "remote": False})
+        if self._redis is not None:
+            message = {"event": event, "owner_id": owner_id, "origin": self.worker_id, "payload": payload}
+            try:
+                await self._redis.publish(EVENTS_CHANNEL, json.dumps(message))
+            except Exception as e:
+                logger.warning(f"Failed to relay '{event}' event over Redis: {e}")
+
+    async def _dispatch(self, event: str, owner_id: str, payload: Dict[str, Any]):
+        for handler in self._subscribers.get(event, []):
+            try:
+                await handler(owner_id, payload)
+            except Exception as e:
+                logger.error(f"Event handler {handler.__qualname__} failed for '{event}': {e}")
+
+    async def start_redis(self, redis_client):
+        """Start relaying events through Redis pub/sub. Called from main.lifespan."""
+        if self._listener is not None:
+            return
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe(EVENTS_CHANNEL)
+        self._redis = redis_client
+        self._listener = asyncio.create_task(self._listen(pubsub), name="event-bus-redis")
+        logger.info("Event bus relaying through Redis pub/sub")
+
+    async def _listen(self, pubsub):
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if data.get("origin") == self.worker_id:
+                    continue
+                await self._dispatch(data["event"], data["owner_id"], {**data.get("payload", {}), "remote": True})
+        finally:
+            await pubsub.close()
+
+    async def stop(self):
+        self._redis = None
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+
+event_bus = EventBus()
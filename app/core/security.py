@@ -1,24 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
 from fastapi import Depends, HTTPException, status
-from app.services.user_service import UserService
+from app.models.user import CurrentUser
+from app.core.password_hasher import PasswordHasher
+from app.services.user_service import user_service
 
 
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# Runs bcrypt on worker threads; use the async helpers below from request handlers
+password_hasher = PasswordHasher(pwd_context, settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
 
 # OAuth2 scheme for token-based authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-user_service = UserService()
+# Same, but lets requests without an Authorization header through as anonymous
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
+
+
+class PrincipalCache:
+    """
+    Principals resolved from the database, keyed by token subject. An entry lives
+    for PRINCIPAL_CACHE_TTL_SECONDS but never past the expiry of the token that
+    created it, so a cached principal can't outlive the credentials it came from.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, CurrentUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+            return entry[1]
+
+    def put(self, subject: str, principal: CurrentUser, token_expires_at: Optional[float]):
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._entries[subject] = (expires_at, principal)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            self._entries.pop(subject, None)
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def principal_from_user(user: dict) -> CurrentUser:
+    return CurrentUser(
+        id=str(user["id"]),
+        username=user["username"],
+        email=user.get("email"),
+        role=user.get("role") or "user"
+    )
 
 
 # Dependency to get the current user based on the token
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
+    """
+    Resolve the caller from the access token.
+
+    By default the subject is resolved through the database once and then
+    through principal_cache, so role changes and deletions take effect within
+    PRINCIPAL_CACHE_TTL_SECONDS. Tokens issued by /auth/login and /auth/register
+    also carry the user id (and role) as claims; with AUTH_TRUST_TOKEN_CLAIMS=True
+    the principal is built from the signed token alone, which avoids the lookup
+    but keeps a demoted or deleted user's privileges until the token expires.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -26,22 +96,40 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     )
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+    except JWTError:
+        raise credentials_exception
 
-        # NEW: Normalize username to lowercase for consistent lookups
-        username = username.lower()
+    username: str = payload.get("sub")
+    if username is None:
+        raise credentials_exception
 
-        # NEW: Fetch the full user object - ensure case insensitive lookup
-        user = await user_service.get_user_by_username(username)
-        if user is None:
-            raise credentials_exception
+    # Normalize username to lowercase for consistent lookups
+    username = username.lower()
 
-        return user  # Return full user object with UUID
+    user_id = payload.get("custom_user_id")
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and user_id:
+        return CurrentUser(id=user_id, username=username, role=payload.get("role") or "user")
 
-    except JWTError:
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+
+    user = await user_service.get_user_by_username(username)
+    if user is None:
         raise credentials_exception
+    principal = principal_from_user(user)
+    principal_cache.put(username, principal, payload.get("exp"))
+    return principal
+
+
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[CurrentUser]:
+    """
+    The authenticated principal, or None for anonymous requests (no bearer token).
+    A token that is present but invalid or expired is still rejected with 401.
+    """
+    if not token:
+        return None
+    return await get_current_user(token)
 
 
 # Function to create an access token for a user
@@ -65,3 +153,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)  # Hashes the password using bcrypt
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.hash(password)
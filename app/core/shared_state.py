@@ -1,37 +1,73 @@
 """
 Module to share state between different FastAPI endpoints/routers
+
+Document state is kept per owner: the id of the authenticated user (from the
+bearer token). Only anonymous requests, sent without a token, share the
+"default" owner.
+
+Document changes are announced on `app.core.event_bus`, so every worker drops
+an index another worker rewrote on disk.
 """
+from typing import Any, Dict, List, Optional
+from fastapi import Depends, Header
+from app.core.event_bus import DOCUMENTS_CHANGED, event_bus
+from app.core.security import get_optional_user
+from app.models.user import CurrentUser
+from app.services.vector_store import vector_store_manager
+
+DEFAULT_OWNER = "default"
+
 # Shared variables accessible by all modules
-vector_db = None
-uploaded_file_metadata = []
+uploaded_file_metadata: Dict[str, List[dict]] = {}
+
+
+def get_owner_id(current_user: Optional[CurrentUser] = Depends(get_optional_user)) -> str:
+    """FastAPI dependency resolving whose documents a request works on."""
+    return current_user.id if current_user is not None else DEFAULT_OWNER
+
+
+def get_session_id(x_session_id: Optional[str] = Header(None)) -> str:
+    """FastAPI dependency for the chat session (`x-session-id` header) within an owner."""
+    return x_session_id.strip() if x_session_id and x_session_id.strip() else DEFAULT_OWNER
+
+
+async def aget_vector_db(owner_id: str = DEFAULT_OWNER):
+    return await vector_store_manager.aget(owner_id)
+
+
+def get_vector_store_version(owner_id: str = DEFAULT_OWNER) -> int:
+    return vector_store_manager.version(owner_id)
+
+
+async def aadd_documents(owner_id: str, documents, progress=None):
+    return await vector_store_manager.aadd_documents(owner_id, documents, progress=progress)
+
+
+async def aget_file_manifest(owner_id: str = DEFAULT_OWNER) -> Dict[str, dict]:
+    return await vector_store_manager.amanifest(owner_id)
 
 
-def get_vector_db():
-    global vector_db
-    return vector_db
+def get_uploaded_metadata(owner_id: str = DEFAULT_OWNER):
+    return uploaded_file_metadata.get(owner_id, [])
 
 
-def set_vector_db(db):
-    global vector_db
-    vector_db = db
+def set_uploaded_metadata(metadata, owner_id: str = DEFAULT_OWNER):
+    uploaded_file_metadata[owner_id] = metadata
 
 
-def get_uploaded_metadata():
-    global uploaded_file_metadata
-    return uploaded_file_metadata
+def add_file_metadata(metadata, owner_id: str = DEFAULT_OWNER):
+    uploaded_file_metadata.setdefault(owner_id, []).append(metadata)
 
 
-def set_uploaded_metadata(metadata):
-    global uploaded_file_metadata
-    uploaded_file_metadata = metadata
+def clear_all(owner_id: str = DEFAULT_OWNER):
+    vector_store_manager.clear(owner_id)
+    uploaded_file_metadata.pop(owner_id, None)
 
 
-def add_file_metadata(metadata):
-    global uploaded_file_metadata
-    uploaded_file_metadata.append(metadata)
+async def _drop_stale_index(owner_id: str, payload: Dict[str, Any]):
+    # Another worker changed the index on disk; reload it on next use
+    if payload.get("remote"):
+        vector_store_manager.invalidate(owner_id)
 
 
-def clear_all():
-    global vector_db, uploaded_file_metadata
-    vector_db = None
-    uploaded_file_metadata = []
\ No newline at end of file
+event_bus.subscribe(DOCUMENTS_CHANGED, _drop_stale_index)
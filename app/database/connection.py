@@ -1,30 +1,139 @@
-from supabase import create_client, Client
+"""
+The single Supabase data layer.
+
+Every table query goes through one async PostgREST client backed by a pooled
+httpx.AsyncClient: keep-alive connections are reused across requests (at most
+DB_MAX_CONNECTIONS open), each query is bounded by DB_TIMEOUT_SECONDS, and
+awaiting a query never blocks the event loop. Queries slower than
+DB_SLOW_QUERY_MS are logged, and counters are served at /health/database.
+
+Request handlers get the shared instance through the `get_db` dependency;
+services built at import time use `database` directly.
+
+The pooled client is handed to postgrest as `http_client=` (postgrest >= 2.19).
+Older releases have no such argument and build their session in
+`create_session`, so there the pool is injected by overriding that method.
+"""
+import inspect
+import time
+from typing import Optional
+
+import httpx
+import postgrest
+from postgrest import AsyncPostgrestClient
 from app.core.config import settings
-import atexit
+from app.core.app_logging import app_logger as logger
+
+_STARTED = "alif_query_started"
+
+
+# postgrest >= 2.19 accepts a ready-made httpx client
+_ACCEPTS_HTTP_CLIENT = "http_client" in inspect.signature(AsyncPostgrestClient.__init__).parameters
+
+
+class _LegacyPooledPostgrestClient(AsyncPostgrestClient):
+    """For postgrest releases without `http_client=`: hand over the pool from create_session."""
 
-class DatabaseConnection:
-    _instance = None
+    def __init__(self, base_url: str, headers: dict, session: httpx.AsyncClient):
+        self._pooled_session = session
+        super().__init__(base_url, headers=headers)
 
-    def __new__(cls):
-        if not cls._instance:
-            cls._instance = super().__new__(cls)
-            cls._instance.client = create_client(
-                settings.SUPABASE_URL,
-                settings.SUPABASE_KEY
+    def create_session(self, *args, **kwargs) -> httpx.AsyncClient:
+        return self._pooled_session
 
+
+class Database:
+    def __init__(self, url: str, key: str):
+        self.rest_url = f"{url.rstrip('/')}/rest/v1"
+        self.headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        self._client: Optional[AsyncPostgrestClient] = None
+        self.stats = {"queries": 0, "errors": 0, "slow": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+    @property
+    def client(self) -> AsyncPostgrestClient:
+        if self._client is None:
+            session = self._create_session()
+            if _ACCEPTS_HTTP_CLIENT:
+                client = AsyncPostgrestClient(self.rest_url, headers=self.headers, http_client=session)
+            else:
+                client = _LegacyPooledPostgrestClient(self.rest_url, self.headers, session)
+            if client.session is not session:
+                # Pool limits, timeouts and query timing would silently not apply
+                raise RuntimeError(f"postgrest {postgrest.__version__} did not use the pooled http client")
+            self._client = client
+        return self._client
+
+    def _create_session(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.rest_url,
+            headers=self.headers,
+            timeout=httpx.Timeout(settings.DB_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.DB_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DB_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            event_hooks={"request": [self._on_request], "response": [self._on_response]},
+            follow_redirects=True
+        )
+
+    def table(self, name: str):
+        """Query builder for a table; finish the chain with `await ....execute()`."""
+        return self.client.from_(name)
+
+    def rpc(self, function: str, params: Optional[dict] = None):
+        return self.client.rpc(function, params or {})
+
+    async def _on_request(self, request: httpx.Request):
+        request.extensions[_STARTED] = time.perf_counter()
+
+    async def _on_response(self, response: httpx.Response):
+        started = response.request.extensions.get(_STARTED)
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats["queries"] += 1
+        self.stats["total_ms"] += elapsed_ms
+        self.stats["max_ms"] = max(self.stats["max_ms"], elapsed_ms)
+        if response.status_code >= 400:
+            self.stats["errors"] += 1
+        if elapsed_ms >= settings.DB_SLOW_QUERY_MS:
+            self.stats["slow"] += 1
+            request = response.request
+            logger.warning(
+                f"Slow database query ({elapsed_ms:.0f} ms, {response.status_code}): {request.method} {request.url.path}"
             )
-        return cls._instance
 
-    def get_client(self) -> Client:
-        return self.client
+    def snapshot(self) -> dict:
+        queries = self.stats["queries"]
+        hooks = self._client.session.event_hooks if self._client is not None else {}
+        return {
+            **self.stats,
+            # Whether the query timing hooks are installed on the live client
+            "pooled": self._on_response in hooks.get("response", []),
+            "total_ms": round(self.stats["total_ms"], 1),
+            "max_ms": round(self.stats["max_ms"], 1),
+            "avg_ms": round(self.stats["total_ms"] / queries, 1) if queries else 0.0,
+        }
 
-    def close_connection(self):
-        if DatabaseConnection._instance:
-            DatabaseConnection._instance.client.close()
+    async def close(self):
+        """Close pooled connections. Called from main.lifespan on shutdown."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
 
 if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
     raise ValueError("Missing critical environment variables: SUPABASE_URL or SUPABASE_KEY")
 
 
-supabase_db = DatabaseConnection().get_client()
\ No newline at end of file
+database = Database(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+
+async def get_db() -> Database:
+    """FastAPI dependency returning the shared data layer."""
+    return database
@@ -0,0 +1,10 @@
+-- Case-insensitive user lookups without scanning the users table.
+-- Run once in the Supabase SQL editor. The columns are generated, so the API
+-- never writes them; UserService.find_user matches on them with plain equality.
+
+alter table users
+    add column if not exists username_lower text generated always as (lower(username)) stored,
+    add column if not exists email_lower text generated always as (lower(email)) stored;
+
+create index if not exists users_username_lower_idx on users (username_lower);
+create index if not exists users_email_lower_idx on users (email_lower);
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Response, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from google.genai import types  # Correct import pattern that works
-from app.services.gemini_client import call_gemini
+from app.services.gemini_client import call_gemini_async
 from app.core.app_logging import app_logger as logger
 import json
 from reportlab.lib.pagesizes import letter
@@ -105,7 +105,7 @@ Text: {request.text}
     )
 
     try:
-        llm_response = call_gemini(prompt=prompt, config=config)
+        llm_response = await call_gemini_async(prompt=prompt, config=config, use_cache=True)
         logger.info(f"Raw Gemini response (Assignment): {llm_response}")
     except Exception as e:
         logger.exception(f"Error calling Gemini for assignment: {e}")
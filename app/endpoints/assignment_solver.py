@@ -2,13 +2,11 @@ from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Response
 from pydantic import BaseModel
 from typing import Optional
 from google.genai import types
-from app.services.gemini_client import call_gemini
+from app.services.gemini_client import call_gemini_async
 from app.core.app_logging import app_logger as logger
-import fitz  # PyMuPDF for PDF text extraction
+from app.services.document_extraction import extract_document_text
+from app.utils.uploads import read_upload
 import os
-import shutil
-import tempfile
-import docx2txt  # For docx extraction
 import time
 import re  # Added for filename sanitization
 # Import PDF generation libraries
@@ -35,37 +33,12 @@ class SolutionResponse(BaseModel):
 
 
 # --- Helper Functions ---
-def extract_text_from_file(file_path, file_type):
+async def extract_text_from_file(file_path, file_type):
     """Extract text content from various file types."""
-    doc = None
-    try:
-        if file_type == "application/pdf":
-            doc = fitz.open(file_path)
-            text = "".join([page.get_text() for page in doc])
-            return text
-        elif file_type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                           "application/msword"]:
-            text = docx2txt.process(file_path)
-            return text
-        elif file_type.startswith("text/"):
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read()
-        else:
-            raise HTTPException(status_code=415, detail=f"Unsupported file type: {file_type}")
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        logger.error(f"Error extracting text from {file_path} ({file_type}): {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to extract text from file: {e}")
-    finally:
-        if doc:
-            try:
-                doc.close()
-            except Exception as close_err:
-                logger.error(f"Error closing PDF document {file_path}: {close_err}")
+    return await extract_document_text(file_path, file_type)
 
 
-def generate_solution(text: str, difficulty: str = "medium", format: str = "markdown"):
+async def generate_solution(text: str, difficulty: str = "medium", format: str = "markdown"):
     """Generate a solution for an assignment using Gemini AI."""
     # Build a prompt that instructs Gemini to solve the assignment
     prompt = f"""
@@ -100,7 +73,7 @@ Return the solution in {format} format.
     )
 
     try:
-        llm_response = call_gemini(prompt=prompt, config=config)
+        llm_response = await call_gemini_async(prompt=prompt, config=config, use_cache=True)
         logger.info("Successfully generated assignment solution")
         return llm_response
     except Exception as e:
@@ -218,7 +191,7 @@ def generate_solution_pdf(assignment_text: str, solution_text: str, time_taken:
 # --- Endpoints ---
 @router.post("/text", response_model=SolutionResponse,
              responses={200: {"content": {"application/json": {}, "application/pdf": {}}}})
-def solve_assignment_text(request: SolveTextRequest):
+async def solve_assignment_text(request: SolveTextRequest):
     """Generate a solution for an assignment from text input."""
     start_time = time.time()
     try:
@@ -226,7 +199,7 @@ def solve_assignment_text(request: SolveTextRequest):
             raise HTTPException(status_code=400, detail="Assignment text cannot be empty")
 
         # Generate solution text
-        solution = generate_solution(request.text, request.difficulty, request.format)
+        solution = await generate_solution(request.text, request.difficulty, request.format)
 
         # Calculate time taken
         end_time = time.time()
@@ -270,23 +243,19 @@ async def solve_assignment_upload(
     """Generate a solution for an assignment from an uploaded file."""
     start_time = time.time()
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        safe_filename = re.sub(r'[^\w\-.]', '_', os.path.basename(file.filename or "uploaded_file"))
-        file_path = os.path.join(temp_dir, safe_filename)
+    safe_filename = re.sub(r'[^\w\-.]', '_', os.path.basename(file.filename or "uploaded_file"))
 
+    # Kept in memory, or spooled to a unique temp file when large
+    async with await read_upload(file) as upload:
         try:
-            # Save uploaded file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
             # Extract text based on file content type
-            text = extract_text_from_file(file_path, file.content_type)
+            text = await extract_text_from_file(upload.source, file.content_type)
 
             if not text or not text.strip():
                 raise HTTPException(status_code=422, detail="Could not extract meaningful text from the file")
 
             # Generate solution
-            solution = generate_solution(text, difficulty, format)
+            solution = await generate_solution(text, difficulty, format)
 
             # Calculate time taken
             end_time = time.time()
@@ -6,56 +6,51 @@ from typing import Any
 from datetime import timedelta
 from app.core.security import (
     create_access_token,
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
     get_current_user,
 )
 from app.core.config import settings
-from app.models.user import UserCreate, UserResponse, UserLogin
-from app.database.connection import supabase_db
+from app.models.user import CurrentUser, UserCreate, UserResponse, UserLogin
+from app.database.connection import Database, get_db
+from app.services.activity_log import activity_writer
+from app.services.user_service import user_service
+from app.core.event_bus import event_bus, USER_REGISTERED
 from app.core.exception import CustomHTTPException
 from app.core.uuid_helper import ensure_uuid
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+
+async def forget_registered_user(user_id: str, payload: dict):
+    user_service.forget_missing(*payload.get("identifiers", []))
+
+
+event_bus.subscribe(USER_REGISTERED, forget_registered_user)
+
 def get_remote_address(request: Request) -> str:
     return request.client.host
 
 @router.get("/protected-route")
-async def protected_route(current_user: str = Depends(get_current_user)):
+async def protected_route(current_user: CurrentUser = Depends(get_current_user)):
     return {"message": "Welcome to the protected route!", "user": current_user}
 
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate) -> Any:
+async def register(user_data: UserCreate, db: Database = Depends(get_db)) -> Any:
     try:
         # Normalize username and email to lowercase for case-insensitive comparison
         normalized_username = user_data.username.lower()
         normalized_email = user_data.email.lower()
 
-        # Check if user exists using case-insensitive search
-        # First try using the ilike operator for case-insensitive comparison
-        existing_user = supabase_db.table('users').select("*").or_(
-            f"email.ilike.{normalized_email},username.ilike.{normalized_username}"
-        ).execute()
-
-        # If ilike isn't supported, fallback to direct lowercase comparison
-        if not existing_user.data:
-            existing_user = supabase_db.table('users').select("*").execute()
-            # Manual case-insensitive filtering
-            existing_user.data = [
-                user for user in existing_user.data
-                if user.get('email', '').lower() == normalized_email or
-                   user.get('username', '').lower() == normalized_username
-            ]
-
-        if existing_user.data:
+        # Check if user exists (indexed lower-case username/email lookup)
+        if await user_service.find_existing(normalized_username, normalized_email):
             raise CustomHTTPException(
                 "Username or email already registered",
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
         # Hash password
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
 
         # Create user (store normalized lowercase versions of username and email)
         new_user = {
@@ -64,15 +59,20 @@ async def register(user_data: UserCreate) -> Any:
             "password": hashed_password
         }
 
-        result = supabase_db.table('users').insert(new_user).execute()
+        result = await db.table('users').insert(new_user).execute()
 
         if not result.data:
             raise CustomHTTPException("Failed to create user")
+        # Every worker may have cached these names as unknown; the new user must be able to log in anywhere
+        await event_bus.publish(
+            USER_REGISTERED, str(result.data[0]['id']), identifiers=[normalized_username, normalized_email]
+        )
 
         # Create access token
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": normalized_username, "custom_user_id": str(result.data[0]['id'])}, expires_delta=access_token_expires
+            data={"sub": normalized_username, "custom_user_id": str(result.data[0]['id']), "role": result.data[0].get("role") or "user"},
+            expires_delta=access_token_expires
         )
 
         # Log activity
@@ -84,6 +84,8 @@ async def register(user_data: UserCreate) -> Any:
             "access_token": access_token
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise CustomHTTPException(str(e))
 
@@ -95,31 +97,17 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         print(f"Received username: {form_data.username} (normalized to {normalized_username})")
         print(f"Received password: Sikeeee That's the wrong number!")  # Do not log passwords
 
-        # Try case-insensitive search first using ilike
-        user_result = supabase_db.table('users').select("*").ilike("username", normalized_username).execute()
+        # Indexed case-insensitive lookup by username or email; unknown names are negatively cached
+        user = await user_service.find_user(normalized_username)
 
-        # If ilike isn't supported or no results, try alternative case-insensitive approach
-        if not user_result.data:
-            # Get all users and filter manually by lowercase username
-            all_users = supabase_db.table('users').select("*").execute()
-            user_result.data = [
-                user for user in all_users.data
-                if user.get('username', '').lower() == normalized_username or
-                   user.get('email', '').lower() == normalized_username
-            ]
-
-        print(f"User query result: {user_result.data}")
-
-        if not user_result.data:
+        if not user:
             raise CustomHTTPException(
                 "Incorrect username or password",
                 status_code=status.HTTP_401_UNAUTHORIZED
             )
 
-        user = user_result.data[0]
-
         # Verify password
-        if not verify_password(form_data.password, user["password"]):
+        if not await verify_password_async(form_data.password, user["password"]):
             print("Password verification failed")  # Log password verification issue
             raise CustomHTTPException(
                 "Incorrect username or password",
@@ -129,7 +117,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         # Create access token using the normalized username
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user["username"], "custom_user_id": str(user["id"])},
+            data={"sub": user["username"], "custom_user_id": str(user["id"]), "role": user.get("role") or "user"},
             expires_delta=access_token_expires
         )
         print(f"Generated access token: {access_token}")
@@ -143,24 +131,20 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             "access_token": access_token
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Login error: {e}")  # Log any exceptions
         raise CustomHTTPException(str(e))
 
 async def log_user_activity(user_id: str, activity_type: str, metadata: dict = None) -> None:
-    """Log user activity to the database"""
+    """Queue a user activity; it is written to the database in the next batch"""
     try:
         # Convert user_id to valid UUID format
         valid_uuid = ensure_uuid(user_id)
 
-        insert_data = {
-            "user_id": str(valid_uuid),  # Convert UUID to string for Supabase
-            "activity_type": activity_type
-        }
-        if metadata:
-            insert_data["metadata"] = metadata  # Store metadata as a JSON/object column in your DB
-
-        supabase_db.table('user_activities').insert(insert_data).execute()
+        # Convert UUID to string for Supabase; metadata goes to a JSON/object column
+        activity_writer.enqueue(str(valid_uuid), activity_type, metadata)
     except Exception as e:
         # Log error but don't fail the request
         print(f"Failed to log activity: {str(e)}")
\ No newline at end of file
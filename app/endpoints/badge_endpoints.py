@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from app.core.security import get_current_user
+from app.database.connection import Database, get_db
 from app.services.badges_service import BadgeService
 from app.services.badge_checker import BadgeChecker
 from app.core.schemas import APIResponse
@@ -13,11 +14,10 @@ badge_checker = BadgeChecker(badge_service)
 @router.get("/", response_model=APIResponse)
 async def get_user_badges(current_user=Depends(get_current_user)):
     if not current_user:
-        result = badge_service.db.table('badges').select("*").execute()
         return APIResponse(
             success=True,
             message="Retrieved all available badges",
-            data=result.data
+            data=await badge_service.get_all_badges()
         )
     badges = await badge_service.get_user_badges(current_user.id)
     return APIResponse(
@@ -53,8 +53,8 @@ async def check_all_badges(
         )
 
 @router.get("/available", response_model=APIResponse)
-async def get_available_badges():
-    result = badge_service.db.table('badges').select("*").execute()
+async def get_available_badges(db: Database = Depends(get_db)):
+    result = await db.table('badges').select("*").execute()
     return APIResponse(
         success=True,
         message=f"Retrieved {len(result.data)} badges",
@@ -1,33 +1,48 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body, APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Body, APIRouter, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Any
-import fitz  # PyMuPDF
-from io import BytesIO
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from collections import OrderedDict
 from langchain.chains import ConversationalRetrievalChain
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.memory import ConversationBufferMemory
-from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
 from langchain.prompts import PromptTemplate
+import asyncio
 import os
 import uuid
 import time
 from dotenv import load_dotenv
-from pptx import Presentation  # For PPTX support
 import requests
-from app.core.shared_state import set_vector_db, add_file_metadata, clear_all, get_vector_db, get_uploaded_metadata
+from app.core.event_bus import event_bus, DOCUMENTS_CHANGED
+from app.core.shared_state import (
+    aadd_documents, add_file_metadata, clear_all, aget_vector_db, get_uploaded_metadata, get_owner_id,
+    get_session_id, get_vector_store_version
+)
+from app.services.model_registry import model_registry
+from app.services.document_extraction import extract_document_pages
+from app.utils.uploads import BufferedUpload, read_upload
+from app.utils.text_splitter import TextSplitter
+from app.utils.sse import format_sse
+from app.services.hybrid_retriever import hybrid_retriever
+from app.services.chat_history import chat_history_store, format_history
+from app.core.config import settings
+from app.services.ingestion_jobs import ingestion_queue
+from app.models.ingestion import FileProgress, IngestionJob
 
 router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 
 # Configuration
 USE_VECTOR_SEARCH = os.getenv("USE_VECTOR_SEARCH", "True") == "True"
+QA_CHAIN_CACHE_SIZE = int(os.getenv("QA_CHAIN_CACHE_SIZE", "256"))
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3/search"
 
-chat_history = []
+# Recent messages of the session (after its summary) included in QA prompts
+PROMPT_HISTORY_MESSAGES = 6
+
+# Retrieval chains per owner. They keep no memory: each question passes the
+# session's history from chat_history_store. Values are (vector store version,
+# chain); a version change means new documents.
+qa_chains: "OrderedDict[str, tuple]" = OrderedDict()
 
 # Load environment variables
 load_dotenv()
@@ -50,102 +65,102 @@ app.add_middleware(
 
 
 # Text extraction functions
-def extract_text_from_file(file: UploadFile):
-    """Extract text from uploaded file (PDF, TXT, PPTX)."""
-    content = file.file.read()
-    filename = file.filename
-
-    if file.content_type == "application/pdf":
-        doc = fitz.open(stream=content, filetype="pdf")
-        return [{"text": page.get_text("text"), "page_number": i + 1} for i, page in enumerate(doc)]
-    elif file.content_type == "text/plain":
-        return [{"text": content.decode("utf-8"), "page_number": 1}]
-    elif file.content_type == "application/vnd.openxmlformats-officedocument.presentationml.presentation":
-        prs = Presentation(BytesIO(content))
-        text = ""
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text += shape.text + "\n"
-        return [{"text": text, "page_number": 1}]
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported file type")
-
-
-def process_files(files: List[UploadFile]):
-    print(f"process_files called with {len(files)} files: {[f.filename for f in files]}")
-    if not files or len(files) == 0:
-        print("No files received in process_files.")
-        raise HTTPException(status_code=400, detail="No files received")
-
-    clear_all()  # Clear existing vector DB and metadata
-    uploaded_files = []
-    for file in files:
-        print(f"Processing file: {file.filename}, type: {file.content_type}")
-        file_size = 0
-        try:
-            file.file.seek(0, 2)
-            file_size = file.file.tell()
-            file.file.seek(0)
-        except Exception as e:
-            print(f"Error getting file size: {e}")
-
-        pages = extract_text_from_file(file)
-
-        file_metadata = {
-            "id": str(uuid.uuid4()),
-            "filename": file.filename,
-            "file_size": file_size,
-            "page_count": len(pages),
-            "content_type": file.content_type,
-            "active": True,
-            "created_at": int(time.time())
-        }
-        add_file_metadata(file_metadata)
-        print(f"Added file metadata: {file.filename}, {len(pages)} pages")
-        uploaded_files.append(file_metadata)
-
-        if USE_VECTOR_SEARCH:
-            all_docs = []
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-
-            for page in pages:
-                chunks = text_splitter.split_text(page["text"])
-                for i, chunk in enumerate(chunks):
-                    metadata = {
-                        "source": file.filename,
-                        "page_number": page["page_number"],
-                        "chunk_index": i,
-                        "file_size": file_size
-                    }
-                    all_docs.append(Document(page_content=chunk, metadata=metadata))
-
-            if all_docs:
-                try:
-                    embeddings = GoogleGenerativeAIEmbeddings(
-                        model="models/text-embedding-004",
-                        google_api_key=GOOGLE_API_KEY
-                    )
-                    db = FAISS.from_documents(all_docs, embeddings)
-                    set_vector_db(db)
-                    print(f"Successfully created vector DB with {len(all_docs)} documents")
-                except Exception as e:
-                    print(f"Warning: Failed to create vector DB but continuing with file metadata: {e}")
-
-    return {
-        "success": True,
-        "message": "Files processed successfully",
-        "data": {"file_count": len(files), "uploaded_files": uploaded_files}
+SUPPORTED_CONTENT_TYPES = {
+    "application/pdf",
+    "text/plain",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+def extract_text(content, content_type: str):
+    """Extract text from file content (PDF, TXT, PPTX), one entry per page or slide."""
+    return extract_document_pages(content, content_type)
+
+
+def split_pages(pages, filename: str, file_size: int) -> List[Document]:
+    text_splitter = TextSplitter(settings.INGESTION_CHUNK_TOKENS, settings.INGESTION_CHUNK_OVERLAP_TOKENS)
+    docs = []
+    for page in pages:
+        chunks = text_splitter.split_text(page["text"])
+        for i, chunk in enumerate(chunks):
+            metadata = {
+                "source": filename,
+                "page_number": page["page_number"],
+                "chunk_index": i,
+                "file_size": file_size
+            }
+            docs.append(Document(page_content=chunk, metadata=metadata))
+    return docs
+
+
+async def ingest_file(job: IngestionJob, progress: FileProgress, upload: BufferedUpload):
+    """Extract, chunk and embed one file of an ingestion job, updating its progress."""
+    owner_id = job.owner_id
+    progress.status = "extracting"
+    await ingestion_queue.save(job)
+    pages = await asyncio.to_thread(extract_text, upload.source, progress.content_type)
+    progress.page_count = len(pages)
+
+    if USE_VECTOR_SEARCH:
+        docs = await asyncio.to_thread(split_pages, pages, progress.filename, progress.file_size)
+        progress.chunk_count = len(docs)
+        progress.status = "embedding"
+        await ingestion_queue.save(job)
+
+        def on_progress(done: int, total: int):
+            progress.embedded_chunks = done
+
+        # Only the new chunks are embedded, in concurrent batches off the event loop;
+        # the owner's existing index is kept
+        await aadd_documents(owner_id, docs, progress=on_progress)
+        print(f"Added {len(docs)} chunks from {progress.filename} to the vector DB for '{owner_id}'")
+
+    file_metadata = {
+        "id": str(uuid.uuid4()),
+        "filename": progress.filename,
+        "file_size": progress.file_size,
+        "page_count": len(pages),
+        "content_type": progress.content_type,
+        "active": True,
+        "created_at": int(time.time())
     }
+    add_file_metadata(file_metadata, owner_id)
+    progress.file_id = file_metadata["id"]
+    progress.status = "done"
+    await ingestion_queue.save(job)
 
 
-def initialize_qa_chain():
-    """Initialize the ConversationalRetrievalChain."""
-    vector_db = get_vector_db()
-    if vector_db is None:
-        raise HTTPException(status_code=400, detail="No documents uploaded yet. Please upload a file first.")
+def make_ingestion_handler(uploads: List[BufferedUpload]):
+    """Job handler that ingests each file in turn; one failing file doesn't stop the rest."""
 
-    template = """You are an expert research paper analyst. Use the following pieces of context to provide a detailed answer to the question. If you can't answer based on the context, say so.
+    async def handler(job: IngestionJob):
+        try:
+            await ingest_all(job)
+        finally:
+            for upload in uploads:
+                upload.close()
+
+    async def ingest_all(job: IngestionJob):
+        for progress, upload in zip(job.files, uploads):
+            try:
+                await ingest_file(job, progress, upload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                print(f"Error ingesting {progress.filename}: {detail}")
+                progress.status = "failed"
+                progress.error = detail
+                await ingestion_queue.save(job)
+        if any(progress.status == "done" for progress in job.files):
+            # Earlier answers were about the previous set of documents
+            await chat_history_store.clear_owner(job.owner_id)
+        await sync_document_context(job.owner_id)
+
+    return handler
+
+
+QA_TEMPLATE = """You are an expert research paper analyst. Use the following pieces of context to provide a detailed answer to the question. If you can't answer based on the context, say so.
 
 Context:
 {context}
@@ -164,41 +179,99 @@ Please provide a comprehensive response that:
 
 Answer:"""
 
-    prompt = PromptTemplate(
-        input_variables=["context", "question", "chat_history"],
-        template=template
-    )
+QA_PROMPT = PromptTemplate(
+    input_variables=["context", "question", "chat_history"],
+    template=QA_TEMPLATE
+)
 
-    memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        input_key="question",
-        output_key="answer",
-        return_messages=True
-    )
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
-        temperature=0.7,
-        google_api_key=GOOGLE_API_KEY
-    )
+def build_general_prompt(question: str, file_ids: List[str], owner_id: str, session: dict) -> str:
+    """Prompt for answering without vector search, from file names and recent conversation."""
+    uploaded_files = get_uploaded_metadata(owner_id)
+
+    file_info = ""
+    if uploaded_files:
+        file_info = "The user has uploaded the following files:\n" + "\n".join([
+            f"- {f['filename']} ({f['page_count']} pages)" for f in uploaded_files
+            if f["id"] in file_ids
+        ])
 
+    conversation_context = ""
+    if session["messages"] or session["summary"]:
+        conversation_context = "Previous conversation:\n" + format_history(session, PROMPT_HISTORY_MESSAGES) + "\n"
+
+    return f"""You are an expert research paper analyst. Answer the following question:
+
+{question}
+
+{file_info}
+
+{conversation_context}
+
+Note: Advanced document search is currently disabled. Please provide your best answer
+based on the information available and general knowledge. If the question seems to require
+specific information from the uploaded documents, explain that detailed document search
+is temporarily unavailable.
+
+Please provide a comprehensive response that:
+1. Answers the question as best as possible with available information
+2. Explains technical concepts clearly
+3. Uses examples when helpful
+4. Maintains academic accuracy while being accessible
+"""
+
+
+def source_info(doc: Document) -> dict:
+    return {
+        "title": f"{doc.metadata['source']} (Page {doc.metadata['page_number']})",
+        "content": doc.page_content,
+        "relevance": doc.metadata.get("relevance", 0.0)
+    }
+
+
+def initialize_qa_chain(owner_id: str, vector_db):
+    """Initialize the ConversationalRetrievalChain."""
+    if vector_db is None:
+        raise HTTPException(status_code=400, detail="No documents uploaded yet. Please upload a file first.")
+
+    llm = model_registry.chat_model("gemini-2.0-flash", temperature=0.7)
+
+    # chat_history is passed in already rendered by format_history
     return ConversationalRetrievalChain.from_llm(
         llm=llm,
-        retriever=vector_db.as_retriever(search_kwargs={"k": 3}),
-        memory=memory,
-        combine_docs_chain_kwargs={"prompt": prompt},
+        retriever=hybrid_retriever(owner_id, vector_db, get_vector_store_version(owner_id)),
+        combine_docs_chain_kwargs={"prompt": QA_PROMPT},
+        get_chat_history=lambda history: history,
         return_source_documents=True
     )
 
 
-async def sync_document_context():
-    """Sync the document context after processing files."""
-    try:
-        import httpx
-        async with httpx.AsyncClient() as client:
-            await client.post(f"http://localhost:8000/api/v1/document-context/sync-from-chatbot")
-    except Exception as e:
-        print(f"Warning: Could not sync document context: {e}")
+def get_qa_chain(owner_id: str, vector_db):
+    """
+    Return the owner's cached chain, building a new one on first use or when the
+    owner's documents have changed since it was built.
+    """
+    version = get_vector_store_version(owner_id)
+    entry = qa_chains.get(owner_id)
+    if entry is not None and entry[0] == version:
+        qa_chains.move_to_end(owner_id)
+        return entry[1]
+
+    chain = initialize_qa_chain(owner_id, vector_db)
+    qa_chains[owner_id] = (version, chain)
+    qa_chains.move_to_end(owner_id)
+    while len(qa_chains) > QA_CHAIN_CACHE_SIZE:
+        qa_chains.popitem(last=False)
+    return chain
+
+
+def drop_qa_chains(owner_id: str):
+    qa_chains.pop(owner_id, None)
+
+
+async def sync_document_context(owner_id: str):
+    """Tell the document context (on every worker) that the owner's documents changed."""
+    await event_bus.publish(DOCUMENTS_CHANGED, owner_id)
 
 
 async def fetch_youtube_recommendations(query: str, max_results: int = 3):
@@ -232,17 +305,62 @@ async def fetch_youtube_recommendations(query: str, max_results: int = 3):
 
 # Endpoints
 @router.post("/upload-files/")
-async def upload_files(files: List[UploadFile] = File(...)):
-    global chat_history
+async def upload_files(
+        files: List[UploadFile] = File(...),
+        wait: bool = False,
+        owner_id: str = Depends(get_owner_id)
+):
+    """
+    Queue the files for ingestion and return the job id right away; poll
+    /chatbot/upload-jobs/{job_id} for progress. Pass wait=true to block until
+    the job has finished.
+    """
     if not files or len(files) == 0:
         print("No files uploaded in request.")
         return JSONResponse(content={"success": False, "message": "No files uploaded", "data": {"file_count": 0}},
                             status_code=400)
+
+    unsupported = [f.filename for f in files if f.content_type not in SUPPORTED_CONTENT_TYPES]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {', '.join(unsupported)}")
+
     try:
-        result = process_files(files)
-        chat_history = []
-        await sync_document_context()
-        return JSONResponse(content=result)
+        # Held in memory, or spooled to unique temp files, until the job has ingested them
+        uploads = []
+        try:
+            for f in files:
+                uploads.append(await read_upload(f))
+        except BaseException:
+            for upload in uploads:
+                upload.close()
+            raise
+        file_progress = [
+            FileProgress(filename=f.filename, content_type=f.content_type, file_size=upload.size)
+            for f, upload in zip(files, uploads)
+        ]
+        job = await ingestion_queue.submit(owner_id, file_progress, make_ingestion_handler(uploads))
+
+        if wait:
+            job = await ingestion_queue.wait(job.id)
+            file_ids = {f.file_id for f in job.files if f.file_id}
+            return JSONResponse(content={
+                "success": job.status != "failed",
+                "message": "Files processed successfully" if job.status == "completed" else f"Ingestion {job.status}",
+                "data": {
+                    "job_id": job.id,
+                    "file_count": len(files),
+                    "uploaded_files": [m for m in get_uploaded_metadata(owner_id) if m["id"] in file_ids],
+                    "job": job.model_dump()
+                }
+            })
+
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "message": "Files queued for processing",
+            "data": {"job_id": job.id, "file_count": len(files), "job": job.model_dump()}
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_detail = f"Error processing files: {str(e)}\n{traceback.format_exc()}"
@@ -250,89 +368,78 @@ async def upload_files(files: List[UploadFile] = File(...)):
         raise HTTPException(status_code=500, detail=error_detail)
 
 
+@router.get("/upload-jobs/")
+async def list_upload_jobs(owner_id: str = Depends(get_owner_id)):
+    """List this user's ingestion jobs, newest first."""
+    return JSONResponse(content={
+        "success": True,
+        "message": "Upload jobs retrieved",
+        "data": {"jobs": [job.model_dump() for job in ingestion_queue.list_for_owner(owner_id)]}
+    })
+
+
+@router.get("/upload-jobs/{job_id}")
+async def get_upload_job(job_id: str, owner_id: str = Depends(get_owner_id)):
+    """Per-file progress, chunk counts and errors for an ingestion job."""
+    job = await ingestion_queue.get(job_id)
+    if job is None or job.owner_id != owner_id:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return JSONResponse(content={
+        "success": True,
+        "message": f"Upload job {job.status}",
+        "data": job.model_dump()
+    })
+
+
 @router.post("/ask-question/")
-async def ask_question(data: Dict[str, Any] = Body(...)):
+async def ask_question(
+        data: Dict[str, Any] = Body(...),
+        owner_id: str = Depends(get_owner_id),
+        session_id: str = Depends(get_session_id)
+):
     """Ask a question about the uploaded documents."""
-    global chat_history
     question = data.get("question")
     file_ids = data.get("file_ids", [])
 
     if not question:
         raise HTTPException(status_code=400, detail="Question is required")
 
-    if not get_uploaded_metadata() and USE_VECTOR_SEARCH:
+    vector_db = await aget_vector_db(owner_id) if USE_VECTOR_SEARCH else None
+    if not get_uploaded_metadata(owner_id) and vector_db is None and USE_VECTOR_SEARCH:
         raise HTTPException(status_code=400, detail="No documents uploaded yet. Please upload a file first.")
 
     try:
         if USE_VECTOR_SEARCH:
-            vector_db = get_vector_db()
             if not vector_db:
                 raise HTTPException(status_code=400, detail="No documents uploaded yet. Please upload a file first.")
 
-            qa_chain = initialize_qa_chain()
-            response = qa_chain({"question": question})
+            # The session's summarized history lives in chat_history_store, not in the chain
+            session = await chat_history_store.get(owner_id, session_id)
+            qa_chain = get_qa_chain(owner_id, vector_db)
+            response = await qa_chain.ainvoke({
+                "question": question,
+                "chat_history": format_history(session, PROMPT_HISTORY_MESSAGES)
+            })
 
             answer = response["answer"]
             sources = []
             if "source_documents" in response:
                 for doc in response["source_documents"]:
-                    source_info = {
-                        "title": f"{doc.metadata['source']} (Page {doc.metadata['page_number']})",
-                        "content": doc.page_content,
-                        "relevance": 0.9
-                    }
-                    sources.append(source_info)
+                    sources.append(source_info(doc))
         else:
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash",
-                temperature=0.7,
-                google_api_key=GOOGLE_API_KEY
-            )
-
-            uploaded_files = get_uploaded_metadata()
-            if not uploaded_files:
-                raise HTTPException(status_code=400, detail="No documents uploaded yet. Please upload a file first.")
-
-            file_info = ""
-            if uploaded_files:
-                file_info = "The user has uploaded the following files:\n" + "\n".join([
-                    f"- {f['filename']} ({f['page_count']} pages)" for f in uploaded_files
-                    if f["id"] in file_ids
-                ])
+            llm = model_registry.chat_model("gemini-2.0-flash", temperature=0.7)
 
-            conversation_context = ""
-            if chat_history:
-                conversation_context = "Previous conversation:\n"
-                for msg in chat_history[-6:]:
-                    role = "User" if msg["role"] == "user" else "Assistant"
-                    conversation_context += f"{role}: {msg['content']}\n"
-
-            prompt = f"""You are an expert research paper analyst. Answer the following question:
-
-{question}
-
-{file_info}
-
-{conversation_context}
-
-Note: Advanced document search is currently disabled. Please provide your best answer
-based on the information available and general knowledge. If the question seems to require
-specific information from the uploaded documents, explain that detailed document search
-is temporarily unavailable.
+            if not get_uploaded_metadata(owner_id):
+                raise HTTPException(status_code=400, detail="No documents uploaded yet. Please upload a file first.")
 
-Please provide a comprehensive response that:
-1. Answers the question as best as possible with available information
-2. Explains technical concepts clearly
-3. Uses examples when helpful
-4. Maintains academic accuracy while being accessible
-"""
+            session = await chat_history_store.get(owner_id, session_id)
+            prompt = build_general_prompt(question, file_ids, owner_id, session)
 
-            response = llm.invoke(prompt)
+            response = await llm.ainvoke(prompt)
             answer = response.content
             sources = []
 
-        chat_history.append({"role": "user", "content": question})
-        chat_history.append({"role": "assistant", "content": answer})
+        await chat_history_store.append_turn(owner_id, session_id, question, answer)
 
         return JSONResponse(content={
             "success": True,
@@ -350,6 +457,66 @@ Please provide a comprehensive response that:
         raise HTTPException(status_code=500, detail=error_detail)
 
 
+@router.post("/ask-question/stream/")
+async def ask_question_stream(
+        data: Dict[str, Any] = Body(...),
+        owner_id: str = Depends(get_owner_id),
+        session_id: str = Depends(get_session_id)
+):
+    """
+    Streaming variant of ask-question as Server-Sent Events: a `sources` event with
+    the retrieved chunks, `token` events as Gemini generates the answer, then `done`
+    with the full answer (or `error`).
+    """
+    question = data.get("question")
+    file_ids = data.get("file_ids", [])
+
+    if not question:
+        raise HTTPException(status_code=400, detail="Question is required")
+
+    vector_db = await aget_vector_db(owner_id) if USE_VECTOR_SEARCH else None
+    if USE_VECTOR_SEARCH and vector_db is None:
+        raise HTTPException(status_code=400, detail="No documents uploaded yet. Please upload a file first.")
+    if not USE_VECTOR_SEARCH and not get_uploaded_metadata(owner_id):
+        raise HTTPException(status_code=400, detail="No documents uploaded yet. Please upload a file first.")
+
+    async def event_stream():
+        try:
+            session = await chat_history_store.get(owner_id, session_id)
+            if USE_VECTOR_SEARCH:
+                retriever = hybrid_retriever(owner_id, vector_db, get_vector_store_version(owner_id))
+                docs = await asyncio.to_thread(retriever.invoke, question)
+                yield format_sse("sources", [source_info(doc) for doc in docs])
+                prompt = QA_TEMPLATE.format(
+                    context="\n\n".join(doc.page_content for doc in docs),
+                    question=question,
+                    chat_history=format_history(session, PROMPT_HISTORY_MESSAGES)
+                )
+            else:
+                yield format_sse("sources", [])
+                prompt = build_general_prompt(question, file_ids, owner_id, session)
+
+            llm = model_registry.chat_model("gemini-2.0-flash", temperature=0.7)
+            parts = []
+            async for chunk in llm.astream(prompt):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield format_sse("token", {"text": chunk.content})
+
+            answer = "".join(parts)
+            await chat_history_store.append_turn(owner_id, session_id, question, answer)
+            yield format_sse("done", {"answer": answer, "recommendations": bool(file_ids)})
+        except Exception as e:
+            print(f"Error streaming answer: {e}")
+            yield format_sse("error", {"message": f"Error processing question: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/recommendations/")
 async def get_recommendations(query: str):
     """Fetch YouTube video recommendations based on query."""
@@ -370,22 +537,27 @@ async def get_recommendations(query: str):
 
 
 @router.get("/chat-history/")
-async def get_chat_history():
-    """Retrieve the current chat history."""
+async def get_chat_history(
+        offset: int = 0,
+        limit: int = 50,
+        owner_id: str = Depends(get_owner_id),
+        session_id: str = Depends(get_session_id)
+):
+    """Retrieve the session's chat history, `limit` messages at a time, with the summary of older turns."""
     return JSONResponse(content={
         "success": True,
         "message": "Chat history retrieved",
-        "data": {"chat_history": chat_history}
+        "data": await chat_history_store.page(owner_id, session_id, offset=offset, limit=limit)
     })
 
 
 @router.post("/reset/")
-async def reset():
+async def reset(owner_id: str = Depends(get_owner_id)):
     """Reset the vector store and chat history."""
-    global chat_history
-    clear_all()
-    chat_history = []
-    await sync_document_context()
+    clear_all(owner_id)
+    drop_qa_chains(owner_id)
+    await chat_history_store.clear_owner(owner_id)
+    await sync_document_context(owner_id)
     return JSONResponse(content={
         "success": True,
         "message": "Chatbot reset successfully",
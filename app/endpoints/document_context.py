@@ -5,12 +5,14 @@ from pydantic import BaseModel
 import os
 import time
 from app.core.app_logging import app_logger
+from app.services.faiss_index import index_type
 import traceback
 
 # Import vector_db from chatbot with proper relative import
-from app.core.shared_state import get_vector_db, get_uploaded_metadata
-
-uploaded_file_metadata = []  # This will be populated from chatbot.py
+from app.core.event_bus import event_bus, DOCUMENTS_CHANGED
+from app.core.shared_state import (
+    aget_vector_db, get_uploaded_metadata, get_owner_id, aget_file_manifest
+)
 
 router = APIRouter(prefix="/document-context", tags=["Document Context"])
 
@@ -34,15 +36,24 @@ class KnowledgeBaseInfo(BaseModel):
     connected: bool = False
 
 
-# In-memory storage (replace with database in production)
-active_files: Dict[str, FileInfo] = {}
-knowledge_bases: Dict[str, KnowledgeBaseInfo] = {}
+# In-memory storage per owner (replace with database in production)
+owner_active_files: Dict[str, Dict[str, FileInfo]] = {}
+owner_knowledge_bases: Dict[str, Dict[str, KnowledgeBaseInfo]] = {}
+
+
+def _active_files(owner_id: str) -> Dict[str, FileInfo]:
+    return owner_active_files.setdefault(owner_id, {})
+
+
+def _knowledge_bases(owner_id: str) -> Dict[str, KnowledgeBaseInfo]:
+    return owner_knowledge_bases.setdefault(owner_id, {})
 
 
 # Helper function to create test data (for debugging only)
-def create_test_data():
+def create_test_data(owner_id: str):
     """Create some test data to verify UI integration."""
-    global active_files, knowledge_bases
+    active_files = _active_files(owner_id)
+    knowledge_bases = _knowledge_bases(owner_id)
     app_logger.info("Creating test data for document context...")
 
     # Create a sample file
@@ -71,16 +82,17 @@ def create_test_data():
 
 # Endpoints
 @router.get("/active-files", response_model=List[FileInfo])
-async def get_active_files():
+async def get_active_files(owner_id: str = Depends(get_owner_id)):
     """Get all currently active files in the context."""
+    active_files = _active_files(owner_id)
     app_logger.info(f"GET /active-files called - Current count: {len(active_files)}")
 
     if not active_files:
         # If no active files tracked but vector DB exists, retrieve files from there
-        vector_db = get_vector_db()  # Get from shared state
+        vector_db = await aget_vector_db(owner_id)  # Get from shared state
         app_logger.info(f"No active files, checking vector_db. Vector DB exists: {vector_db is not None}")
         try:
-            await sync_from_chatbot_internal()
+            await sync_from_chatbot_internal(owner_id)
             app_logger.info(f"After sync, active files count: {len(active_files)}")
         except Exception as e:
             app_logger.error(f"Error automatically syncing from vector DB: {str(e)}")
@@ -92,15 +104,16 @@ async def get_active_files():
 
 
 @router.post("/active-files", response_model=FileInfo)
-async def add_active_file(file: FileInfo):
+async def add_active_file(file: FileInfo, owner_id: str = Depends(get_owner_id)):
     """Add a file to the active context."""
-    active_files[file.id] = file
+    _active_files(owner_id)[file.id] = file
     return file
 
 
 @router.delete("/active-files/{file_id}")
-async def remove_active_file(file_id: str):
+async def remove_active_file(file_id: str, owner_id: str = Depends(get_owner_id)):
     """Remove a file from the active context."""
+    active_files = _active_files(owner_id)
     if file_id in active_files:
         del active_files[file_id]
         return JSONResponse(content={"message": f"File {file_id} removed from context"})
@@ -108,24 +121,25 @@ async def remove_active_file(file_id: str):
 
 
 @router.post("/clear")
-async def clear_document_context():
+async def clear_document_context(owner_id: str = Depends(get_owner_id)):
     """Clear all document context data."""
-    global active_files, knowledge_bases
     app_logger.info("Clearing document context data")
 
-    active_files.clear()
-    knowledge_bases.clear()
+    owner_active_files.pop(owner_id, None)
+    owner_knowledge_bases.pop(owner_id, None)
 
     return JSONResponse(content={"message": "Document context cleared"})
 
 
 @router.get("/knowledge-bases", response_model=List[KnowledgeBaseInfo])
-async def get_knowledge_bases():
+async def get_knowledge_bases(owner_id: str = Depends(get_owner_id)):
     """Get all available knowledge bases."""
+    active_files = _active_files(owner_id)
+    knowledge_bases = _knowledge_bases(owner_id)
     app_logger.info(f"GET /knowledge-bases called - Current count: {len(knowledge_bases)}")
 
     # If no knowledge bases but vector DB exists, create a default entry
-    vector_db = get_vector_db()  # Get from shared state
+    vector_db = await aget_vector_db(owner_id)  # Get from shared state
     if not knowledge_bases and vector_db is not None:
         try:
             app_logger.info("Creating default knowledge base from vector DB")
@@ -145,79 +159,43 @@ async def get_knowledge_bases():
     return result
 
 
-async def sync_from_chatbot_internal():
+async def sync_from_chatbot_internal(owner_id: str):
     """Internal function to synchronize document context from chatbot state."""
-    global active_files, knowledge_bases
+    active_files = _active_files(owner_id)
+    knowledge_bases = _knowledge_bases(owner_id)
 
     # Clear existing files first
     active_files.clear()
 
-    # Get current vector_db and metadata from shared state
-    vector_db = get_vector_db()
-    uploaded_file_metadata = get_uploaded_metadata()
+    # Per-file manifest kept up to date at ingestion time; no docstore scan needed
+    manifest = await aget_file_manifest(owner_id)
+    uploaded_file_metadata = get_uploaded_metadata(owner_id)
 
-    app_logger.info(f"Vector DB exists: {vector_db is not None}")
-    app_logger.info(f"Fallback metadata available: {len(uploaded_file_metadata)}")
+    app_logger.info(f"Manifest files: {len(manifest)}, fallback metadata available: {len(uploaded_file_metadata)}")
 
-    # First try to get data from vector_db if it exists
-    if vector_db is not None:
-        app_logger.info("Using vector_db for document context")
-        sources = set()
-        page_counts = {}
+    if manifest:
+        timestamp_base = int(time.time())
+        for i, entry in enumerate(manifest.values()):
+            source = entry["source"]
+            file_id = f"file_{timestamp_base}_{i}"
+            file_type = source.split('.')[-1].lower() if '.' in source else 'unknown'
 
-        try:
-            # Access the docstore dictionary to extract metadata
-            if hasattr(vector_db, 'docstore') and hasattr(vector_db.docstore, '_dict'):
-                docstore_dict = vector_db.docstore._dict
-                app_logger.info(f"Vector DB docstore dict size: {len(docstore_dict)}")
-
-                # Debug: Print all metadata in vector DB
-                for doc_id, doc in docstore_dict.items():
-                    if hasattr(doc, 'metadata'):
-                        if 'source' in doc.metadata:
-                            source = doc.metadata['source']
-                            sources.add(source)
-                            app_logger.info(f"Found source in vector DB: {source}")
-
-                            # Count pages
-                            if source not in page_counts:
-                                page_counts[source] = set()
-                            if 'page_number' in doc.metadata:
-                                page_counts[source].add(doc.metadata['page_number'])
-            else:
-                app_logger.warning(f"Vector DB doesn't have expected docstore structure")
-
-            # Create file entries from vector DB
-            timestamp_base = int(time.time())
-            for i, source in enumerate(sources):
-                file_id = f"file_{timestamp_base}_{i}"
-                file_type = source.split('.')[-1].lower() if '.' in source else 'unknown'
-
-                active_files[file_id] = FileInfo(
-                    id=file_id,
-                    name=source,
-                    type=file_type,
-                    size=0,
-                    page_count=max(1, len(page_counts.get(source, {0}))),
-                    created_at=time.time()
-                )
-                app_logger.info(f"Added file from vector DB: {source}")
-
-            # Create knowledge base entry
-            if sources:
-                kb_id = "default-kb"
-                knowledge_bases[kb_id] = KnowledgeBaseInfo(
-                    id=kb_id,
-                    name="Document Vector Store",
-                    description="FAISS vector store with uploaded documents",
-                    document_count=len(sources),
-                    connected=True
-                )
-                app_logger.info(f"Created knowledge base entry from vector DB")
+            active_files[file_id] = FileInfo(
+                id=file_id,
+                name=source,
+                type=file_type,
+                size=entry.get("file_size", 0),
+                page_count=max(1, len(entry.get("pages", []))),
+                created_at=entry.get("added_at", time.time())
+            )
 
-        except Exception as e:
-            app_logger.error(f"Error accessing vector db documents: {e}")
-            app_logger.error(traceback.format_exc())
+        knowledge_bases["default-kb"] = KnowledgeBaseInfo(
+            id="default-kb",
+            name="Document Vector Store",
+            description="FAISS vector store with uploaded documents",
+            document_count=len(manifest),
+            connected=True
+        )
 
     # If no files in context yet but we have fallback metadata, use that
     if not active_files and uploaded_file_metadata:
@@ -237,7 +215,6 @@ async def sync_from_chatbot_internal():
                 page_count=file_meta.get("page_count", 1),
                 created_at=time.time()
             )
-            app_logger.info(f"Added file from fallback metadata: {filename}")
 
         # Create a fallback knowledge base
         if uploaded_file_metadata:
@@ -255,70 +232,72 @@ async def sync_from_chatbot_internal():
         f"Final file entries: {len(active_files)} with names: {[file.name for file in active_files.values()]}")
 
 
+async def on_documents_changed(owner_id: str, payload: Dict[str, Any]):
+    """Rebuild the owner's context whenever the chatbot adds or clears documents."""
+    _knowledge_bases(owner_id).clear()
+    await sync_from_chatbot_internal(owner_id)
+
+
+event_bus.subscribe(DOCUMENTS_CHANGED, on_documents_changed)
+
+
 @router.post("/sync-from-chatbot")
-async def sync_from_chatbot():
+async def sync_from_chatbot(owner_id: str = Depends(get_owner_id)):
     """API endpoint to synchronize document context from chatbot state."""
-    global active_files, knowledge_bases
-
     app_logger.info("POST /sync-from-chatbot called")
-    vector_db = get_vector_db()  # Get from shared state
+    vector_db = await aget_vector_db(owner_id)  # Get from shared state
     app_logger.info(f"Vector DB exists: {vector_db is not None}")
 
+    # Clear existing data
+    _active_files(owner_id).clear()
+    _knowledge_bases(owner_id).clear()
+
     if vector_db is None:
         return JSONResponse(content={"message": "No documents in chatbot to sync"})
 
-    # Clear existing data
-    active_files.clear()
-    knowledge_bases.clear()
-
-    await sync_from_chatbot_internal()
+    await sync_from_chatbot_internal(owner_id)
 
     return JSONResponse(content={
-        "files_synced": len(active_files),
-        "knowledge_bases_synced": len(knowledge_bases)
+        "files_synced": len(_active_files(owner_id)),
+        "knowledge_bases_synced": len(_knowledge_bases(owner_id))
     })
 
 
 # Add an endpoint to force test data creation (for debugging)
 @router.post("/create-test-data")
-async def create_debug_test_data():
+async def create_debug_test_data(owner_id: str = Depends(get_owner_id)):
     """Create test data for debugging purposes."""
-    create_test_data()
+    create_test_data(owner_id)
     return JSONResponse(content={
-        "files_created": len(active_files),
-        "knowledge_bases_created": len(knowledge_bases)
+        "files_created": len(_active_files(owner_id)),
+        "knowledge_bases_created": len(_knowledge_bases(owner_id))
     })
 
 
 @router.get("/debug-vector-db")
-async def debug_vector_db():
+async def debug_vector_db(owner_id: str = Depends(get_owner_id)):
     """Debug endpoint to check vector DB content."""
-    vector_db = get_vector_db()
+    vector_db = await aget_vector_db(owner_id)
     if vector_db is None:
         return JSONResponse(content={"status": "No vector DB found"})
 
     try:
-        files_found = set()
-        doc_count = 0
-        if hasattr(vector_db, 'docstore') and hasattr(vector_db.docstore, '_dict'):
-            doc_count = len(vector_db.docstore._dict)
-            for doc_id, doc in vector_db.docstore._dict.items():
-                if hasattr(doc, 'metadata') and 'source' in doc.metadata:
-                    files_found.add(doc.metadata['source'])
-
+        manifest = await aget_file_manifest(owner_id)
         return JSONResponse(content={
             "status": "Vector DB found",
-            "document_count": doc_count,
-            "files_found": list(files_found)
+            "document_count": vector_db.index.ntotal,
+            "index_type": index_type(vector_db.index),
+            "files_found": list(manifest.keys()),
+            "files": list(manifest.values())
         })
     except Exception as e:
         return JSONResponse(content={"status": f"Error inspecting vector DB: {str(e)}"})
 
 
 @router.get("/debug-fallback")
-async def debug_fallback_metadata():
+async def debug_fallback_metadata(owner_id: str = Depends(get_owner_id)):
     """Debug endpoint to check fallback metadata."""
-    uploaded_file_metadata = get_uploaded_metadata()
+    uploaded_file_metadata = get_uploaded_metadata(owner_id)
     return JSONResponse(content={
         "status": "Fallback metadata check",
         "file_count": len(uploaded_file_metadata),
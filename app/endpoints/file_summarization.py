@@ -5,8 +5,10 @@ from pydantic import BaseModel
 import re
 import logging
 from app.core.config import settings
-import fitz  # PyMuPDF for PDF text extraction
+from app.services.document_extraction import extract_pdf_text
+from app.utils.uploads import read_upload
 import io
+from pathlib import Path
 
 # --- Import the ACTUAL TextSummarizerGemini class ---
 from app.endpoints.text_sumarization import TextSummarizerGemini # Correct import
@@ -26,42 +28,44 @@ text_summarizer = TextSummarizerGemini()
 @router.post("/upload-for-summary/", response_model=SummaryResponse)
 async def upload_for_summary(file: UploadFile = File(...)):
     try:
-        # Read the uploaded file
-        content = await file.read()
+        # Read the uploaded file (size-capped); large files are spooled to disk and
+        # read from there, and the spooled copy is removed when the block exits
+        async with await read_upload(file) as upload:
+            source = upload.source
 
-        # Extract text based on file type
-        if file.content_type == "application/pdf":
-            # PDF file
-            text = extract_text_from_pdf(content)
-        elif file.content_type == "text/plain":
-            # Text file
-            text = content.decode("utf-8")
-        elif file.content_type.startswith("application/vnd.openxmlformats-officedocument.wordprocessingml"):
-            # DOCX file - requires python-docx library
-            try:
-                import docx
-                doc = docx.Document(io.BytesIO(content))
-                text = "\n".join([para.text for para in doc.paragraphs])
-                if not text.strip(): # Check if paragraphs yielded text
-                     logger.warning("DOCX contained no text in paragraphs. Trying tables (basic).")
-                     # Basic table text extraction (might need improvement)
-                     all_text = []
-                     for table in doc.tables:
-                         for row in table.rows:
-                             for cell in row.cells:
-                                 all_text.append(cell.text)
-                     text = "\n".join(all_text)
+            # Extract text based on file type
+            if file.content_type == "application/pdf":
+                # PDF file
+                text = await extract_text_from_pdf(source)
+            elif file.content_type == "text/plain":
+                # Text file
+                text = source.read_text("utf-8") if isinstance(source, Path) else str(source, "utf-8")
+            elif file.content_type.startswith("application/vnd.openxmlformats-officedocument.wordprocessingml"):
+                # DOCX file - requires python-docx library
+                try:
+                    import docx
+                    doc = docx.Document(str(source) if isinstance(source, Path) else io.BytesIO(source))
+                    text = "\n".join([para.text for para in doc.paragraphs])
+                    if not text.strip(): # Check if paragraphs yielded text
+                         logger.warning("DOCX contained no text in paragraphs. Trying tables (basic).")
+                         # Basic table text extraction (might need improvement)
+                         all_text = []
+                         for table in doc.tables:
+                             for row in table.rows:
+                                 for cell in row.cells:
+                                     all_text.append(cell.text)
+                         text = "\n".join(all_text)
 
-            except ImportError:
-                logger.error("python-docx library not installed. Cannot process DOCX.")
-                raise HTTPException(status_code=501, detail="DOCX processing requires 'python-docx'. Please install it.")
-            except Exception as docx_err:
-                 logger.error(f"Error parsing DOCX file: {docx_err}")
-                 raise HTTPException(status_code=500, detail="Failed to parse DOCX file.")
+                except ImportError:
+                    logger.error("python-docx library not installed. Cannot process DOCX.")
+                    raise HTTPException(status_code=501, detail="DOCX processing requires 'python-docx'. Please install it.")
+                except Exception as docx_err:
+                     logger.error(f"Error parsing DOCX file: {docx_err}")
+                     raise HTTPException(status_code=500, detail="Failed to parse DOCX file.")
 
-        else:
-            logger.warning(f"Unsupported file format attempt: {file.content_type}")
-            raise HTTPException(status_code=400, detail=f"Unsupported file format: {file.content_type}")
+            else:
+                logger.warning(f"Unsupported file format attempt: {file.content_type}")
+                raise HTTPException(status_code=400, detail=f"Unsupported file format: {file.content_type}")
 
         if not text or not text.strip():
              raise HTTPException(status_code=400, detail="Could not extract meaningful text from the file.")
@@ -78,16 +82,6 @@ async def upload_for_summary(file: UploadFile = File(...)):
         logger.exception(f"Error during file summarization for {file.filename}: {e}") # Use logger.exception for traceback
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during file processing: {str(e)}")
 
-def extract_text_from_pdf(content):
-    """Extract text from a PDF byte stream."""
-    try:
-        doc = fitz.open(stream=content, filetype="pdf")
-        text = ""
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text += page.get_text() + "\n" # Add newline between pages
-        return text.strip() # Strip leading/trailing whitespace from final text
-    except Exception as e:
-        logger.error(f"Error extracting text from PDF: {e}")
-        # It's often better to raise the HTTPException here where the error occurs
-        raise HTTPException(status_code=500, detail="Failed to extract text from PDF")
+async def extract_text_from_pdf(content):
+    """Extract text from a PDF byte stream or a path to the file."""
+    return await extract_pdf_text(content)
@@ -1,20 +1,28 @@
-import os
+import asyncio
 import logging
-from typing import Optional
+from typing import AsyncIterator, Dict, Optional
 
-import fitz  # PyMuPDF
-import google.generativeai as genai
 # Import the correct config type if needed, and other types
 from google.generativeai.types import HarmCategory, HarmBlockThreshold, GenerationConfig
-import textwrap
 
-from fastapi import File, UploadFile, HTTPException, APIRouter
+from fastapi import File, UploadFile, HTTPException, APIRouter, Query
+from fastapi.responses import StreamingResponse
 from app.core.config import settings
+from app.services.model_registry import model_registry
+from app.services.document_extraction import extract_pdf_text
+from app.utils.text_splitter import split_text, token_budget
+from app.utils.uploads import read_upload
+from app.utils.sse import format_sse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ANALYSIS_MODES = ("concurrent", "sequential")
+
+# Caps chunk analyses in flight across every request in this worker
+_analysis_semaphore = asyncio.Semaphore(settings.ANALYSIS_MAX_CONCURRENCY)
+
 class PDFAnalyzerGemini:
     def __init__(self, api_key: str): # api_key argument is passed from instantiation
         logger.info("Initializing PDFAnalyzerGemini (assuming genai is configured).")
@@ -36,20 +44,7 @@ class PDFAnalyzerGemini:
 
         # Removed genai.configure(...)
 
-        model_name = getattr(settings, "GEMINI_MODEL_NAME", "gemini-pro")
-        # Initialize the model instance safely
-        try:
-            # Now self.generation_config and self.safety_settings exist
-            self.model = genai.GenerativeModel(
-                model_name=model_name,
-                generation_config=self.generation_config, # Use self.
-                safety_settings=self.safety_settings     # Use self.
-            )
-            logger.info(f"PDFAnalyzerGemini initialized model '{model_name}'.")
-        except Exception as model_init_err:
-            logger.exception(
-                f"CRITICAL: Failed to initialize GenerativeModel '{model_name}' in PDFAnalyzerGemini: {model_init_err}")
-            self.model = None
+        self.model_name = getattr(settings, "GEMINI_MODEL_NAME", "gemini-pro")
 
         self.analysis_prompt = """
         Analyze the provided text from the PDF and explain the key concepts clearly and concisely.
@@ -61,57 +56,165 @@ class PDFAnalyzerGemini:
         Here's the text to analyze:
         """
 
-    def extract_text_from_pdf(self, pdf_path: str) -> Optional[str]:
+        self.synthesis_prompt = """
+        Below are independent analyses of consecutive parts of one PDF document.
+        Combine them into a single explanation of the whole document: merge overlapping
+        concepts, keep the order in which the document introduces them and avoid repetition.
+        Then provide 3 reflective questions covering the whole material to assess understanding.
+        Keep your response helpful but concise.
+        """
+
+    @property
+    def model(self):
+        """Shared model handle from the registry (None if it cannot be created)."""
+        try:
+            return model_registry.generative_model(
+                self.model_name,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings
+            )
+        except Exception as model_init_err:
+            logger.exception(
+                f"CRITICAL: Failed to initialize GenerativeModel '{self.model_name}' in PDFAnalyzerGemini: {model_init_err}")
+            return None
+
+    async def extract_text_from_pdf(self, source) -> Optional[str]:
         """
-        Extract text from a PDF file
+        Extract text from a PDF (its bytes or a path to it)
         """
         try:
-            with fitz.open(pdf_path) as pdf:
-                text = ""
-                for page_num in range(len(pdf)):
-                    page = pdf[page_num]
-                    text += page.get_text() + "\n"
-                return text.strip()
+            return await extract_pdf_text(source)
         except Exception as e:
-            logger.error(f"Error extracting text from PDF {pdf_path}: {e}")
+            logger.error(f"Error extracting text from PDF: {e}")
             return None # Return None on failure
 
-    def chunk_text(self, text: str, chunk_size: int = 30000) -> list[str]:
+    def chunk_text(self, text: str, max_tokens: Optional[int] = None) -> list[str]:
         """
-        Split text into chunks
+        Split text into chunks of at most `max_tokens` (ANALYSIS_CHUNK_TOKENS) estimated tokens
         """
-        return textwrap.wrap(text, chunk_size, break_long_words=False, break_on_hyphens=False)
+        return split_text(text, token_budget(self.model_name, max_tokens or settings.ANALYSIS_CHUNK_TOKENS))
 
     async def analyze_text(self, text: str) -> str:
         """
         Analyze text using the Gemini API
         """
-        if not self.model:
+        model = self.model
+        if not model:
             logger.error("PDFAnalyzerGemini model was not initialized successfully during startup.")
             return "Error: PDF analysis service model is not available."
 
         try:
             full_prompt = f"{self.analysis_prompt}\n\n{text}"
-            chat = self.model.start_chat(history=[])
-            response = await chat.send_message_async(full_prompt)
+            chat = model.start_chat(history=[])
+            response = await asyncio.wait_for(
+                chat.send_message_async(full_prompt), timeout=settings.GEMINI_TIMEOUT_SECONDS
+            )
             return response.text
         except Exception as e:
             logger.exception(f"Error during PDF text analysis API call: {e}") # Log full trace
             return f"Error: Unable to complete analysis due to API communication failure." # More specific error
 
-    async def process_long_text(self, text: str) -> str:
+    async def _analyze_part(self, model, index: int, total: int, chunk: str) -> str:
+        prompt = f"""
+        This is part {index} of {total} of the document; analyze it on its own.
+        {self.analysis_prompt}
+
+        {chunk}
+        """
+        async with _analysis_semaphore:
+            response = await asyncio.wait_for(
+                model.generate_content_async(prompt), timeout=settings.GEMINI_TIMEOUT_SECONDS
+            )
+        return response.text
+
+    async def iter_long_text_analysis(self, text: str) -> AsyncIterator[Dict]:
         """
-        Process long text by breaking it into chunks
+        Analyze the chunks of `text` independently and concurrently, yielding
+        {"event": "part", ...} as each one finishes (in completion order) and finally
+        {"event": "synthesis", "analysis": ...} combining them. Every request carries
+        only its own chunk, so cost grows linearly with the document.
         """
+        model = self.model
+        if not model:
+            logger.error("PDFAnalyzerGemini model was not initialized successfully.")
+            raise RuntimeError("Error: PDF analysis service model is not available.")
+
+        chunks = self.chunk_text(text)
+        if len(chunks) <= 1:
+            analysis = await self.analyze_text(text)
+            if analysis.startswith("Error:"):
+                raise RuntimeError(analysis)
+            yield {"event": "synthesis", "analysis": analysis}
+            return
+
+        total = len(chunks)
+
+        async def run(index: int, chunk: str):
+            try:
+                return index, await self._analyze_part(model, index, total, chunk), None
+            except Exception as e:
+                logger.exception(f"Error processing PDF analysis chunk {index}: {e}")
+                return index, None, "Communication failure."
+
+        tasks = [asyncio.create_task(run(i, chunk)) for i, chunk in enumerate(chunks, 1)]
+        analyses: Dict[int, str] = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, analysis, error = await next_done
+                if analysis is not None:
+                    analyses[index] = analysis
+                yield {"event": "part", "index": index, "total": total, "analysis": analysis, "error": error}
+        finally:
+            # The consumer went away (e.g. the client disconnected): stop the remaining calls
+            for task in tasks:
+                task.cancel()
+
+        if not analyses:
+            raise RuntimeError("Error: Unable to complete analysis due to API communication failure.")
+        yield {"event": "synthesis", "analysis": await self._synthesize(model, analyses, total)}
+
+    async def _synthesize(self, model, analyses: Dict[int, str], total: int) -> str:
+        parts = "\n\n".join(
+            f"--- Analysis Part {index}/{total} ---\n{analyses[index]}" for index in sorted(analyses)
+        )
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(f"{self.synthesis_prompt}\n\n{parts}"),
+                timeout=settings.GEMINI_TIMEOUT_SECONDS
+            )
+            return response.text
+        except Exception as e:
+            # The part analyses are still worth returning
+            logger.exception(f"Error during PDF analysis synthesis: {e}")
+            return parts
+
+    async def process_long_text(self, text: str, mode: str = "concurrent") -> str:
+        """
+        Process long text by breaking it into chunks.
+
+        "concurrent" analyzes the chunks independently and combines them with one
+        synthesis call; "sequential" walks them through a single chat session.
+        """
+        if mode == "concurrent":
+            if not text:
+                return "Error: No text provided for analysis."
+            try:
+                async for event in self.iter_long_text_analysis(text):
+                    if event["event"] == "synthesis":
+                        return event["analysis"]
+            except RuntimeError as e:
+                return str(e)
+
         chunks = self.chunk_text(text)
 
         if len(chunks) > 1:
             # Check model before starting chat
-            if not self.model:
+            model = self.model
+            if not model:
                  logger.error("PDFAnalyzerGemini model was not initialized successfully.")
                  return "Error: PDF analysis service model is not available."
 
-            chat = self.model.start_chat(history=[])
+            chat = model.start_chat(history=[])
             full_analysis = ""
             for i, chunk in enumerate(chunks, 1):
                 prompt = f"""
@@ -123,7 +226,9 @@ class PDFAnalyzerGemini:
                 {'Please continue your analysis.' if i > 1 else ''}
                 """
                 try:
-                    response = await chat.send_message_async(prompt)
+                    response = await asyncio.wait_for(
+                        chat.send_message_async(prompt), timeout=settings.GEMINI_TIMEOUT_SECONDS
+                    )
                     full_analysis += f"\n\n--- Analysis Part {i}/{len(chunks)} ---\n{response.text}"
                 except Exception as e:
                     logger.exception(f"Error processing PDF analysis chunk {i}: {e}") # Log full trace
@@ -135,13 +240,13 @@ class PDFAnalyzerGemini:
         else:
             return "Error: No text provided for analysis."
 
-    async def process_pdf(self, pdf_path: str) -> str:
+    async def process_pdf(self, source, mode: str = "concurrent") -> str:
         """
         Complete pipeline to process PDF and get analysis
         """
-        text = self.extract_text_from_pdf(pdf_path)
+        text = await self.extract_text_from_pdf(source)
         if text:
-            return await self.process_long_text(text)
+            return await self.process_long_text(text, mode)
         else:
             # Make error message consistent
             return "Error: Failed to extract text from PDF"
@@ -152,21 +257,19 @@ router = APIRouter()
 analyzer = PDFAnalyzerGemini(settings.GEMINI_KEY)
 
 @router.post("/analyze-pdf/")
-async def analyze_pdf(file: UploadFile = File(...)):
+async def analyze_pdf(file: UploadFile = File(...), mode: str = Query("concurrent")):
     if not file.filename or not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis mode '{mode}', expected one of {ANALYSIS_MODES}")
 
-    # Use a more robust temp file name if needed, but this is okay for basic use
-    temp_path = f"temp_{file.filename}"
+    upload = None
     try:
-        # Save uploaded file
-        with open(temp_path, "wb") as buffer:
-            # Use await file.read() for async context
-            content = await file.read()
-            buffer.write(content)
+        # Kept in memory, or spooled to a unique temp file when large
+        upload = await read_upload(file)
 
         # Process PDF using the analyzer instance
-        analysis_result = await analyzer.process_pdf(temp_path)
+        analysis_result = await analyzer.process_pdf(upload.source, mode)
 
         # Check for error strings returned by the analyzer methods
         if analysis_result.startswith("Error:"):
@@ -191,9 +294,45 @@ async def analyze_pdf(file: UploadFile = File(...)):
         logger.exception(f"Unexpected error in /analyze-pdf/ endpoint for {file.filename}: {e}")
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred while processing the PDF.")
     finally:
-        # Ensure temporary file is always cleaned up
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except Exception as cleanup_err:
-                logger.error(f"Failed to remove temporary file {temp_path}: {cleanup_err}")
\ No newline at end of file
+        # Ensure a spooled upload is always cleaned up
+        if upload is not None:
+            upload.close()
+
+
+@router.post("/analyze-pdf/stream/")
+async def analyze_pdf_stream(file: UploadFile = File(...)):
+    """
+    Server-sent events version of /analyze-pdf/ (always concurrent): a "part" event
+    per chunk as soon as its analysis is ready, then "done" with the synthesis, or
+    "error".
+    """
+    if not file.filename or not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+
+    upload = await read_upload(file)
+
+    async def event_stream():
+        try:
+            text = await analyzer.extract_text_from_pdf(upload.source)
+            upload.close()
+            if not text:
+                yield format_sse("error", {"message": "Error: Failed to extract text from PDF"})
+                return
+            async for event in analyzer.iter_long_text_analysis(text):
+                if event["event"] == "part":
+                    yield format_sse("part", {key: value for key, value in event.items() if key != "event"})
+                else:
+                    yield format_sse("done", {"analysis": event["analysis"]})
+        except RuntimeError as e:
+            yield format_sse("error", {"message": str(e)})
+        except Exception as e:
+            logger.exception(f"Unexpected error streaming PDF analysis for {file.filename}: {e}")
+            yield format_sse("error", {"message": "An unexpected server error occurred while processing the PDF."})
+        finally:
+            upload.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
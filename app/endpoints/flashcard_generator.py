@@ -1,14 +1,12 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, Form
 from pydantic import BaseModel
 from typing import List, Optional, Dict
-import fitz  # PyMuPDF for PDF text extraction
 from google.genai import types  # Correct import pattern that works
-import shutil
-import os
-import re
 import json
 from app.core.app_logging import app_logger as logger
-from app.services.gemini_client import call_gemini
+from app.services.document_extraction import extract_pdf_text
+from app.utils.uploads import read_upload
+from app.services.gemini_client import call_gemini_async
 from json_repair import repair_json
 # Add import for activity logging
 from app.endpoints.auth import log_user_activity  # Import the activity logging function
@@ -34,22 +32,9 @@ class FlashcardResponse(BaseModel):
 
 
 # --- Helper Functions ---
-def extract_text_from_pdf(pdf_path):
+async def extract_text_from_pdf(pdf_path):
     """Extract text content from a PDF file."""
-    doc = None
-    try:
-        doc = fitz.open(pdf_path)
-        text = "\n".join([page.get_text() for page in doc])
-        return text
-    except Exception as e:
-        logger.error(f"Failed to extract text from PDF {pdf_path}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to read PDF content: {e}")
-    finally:
-        if doc:
-            try:
-                doc.close()
-            except Exception as close_err:
-                logger.error(f"Error closing PDF document {pdf_path}: {close_err}")
+    return await extract_pdf_text(pdf_path)
 
 
 def process_gemini_response(response_text: str) -> List[Dict[str, str]]:
@@ -108,7 +93,7 @@ def process_gemini_response(response_text: str) -> List[Dict[str, str]]:
         return [{"front": "Error processing response", "back": "Please try again"}]
 
 
-def generate_flashcards_with_gemini(text: str, num_flashcards: int = 5) -> List[Dict[str, str]]:
+async def generate_flashcards_with_gemini(text: str, num_flashcards: int = 5) -> List[Dict[str, str]]:
     """Generate flashcards using Gemini."""
     # Create the prompt with proper formatting
     prompt = f"""
@@ -133,7 +118,7 @@ Text: {text}
 
     # Call Gemini - using the simplified pattern from working code
     try:
-        llm_response = call_gemini(prompt=prompt, config=config)
+        llm_response = await call_gemini_async(prompt=prompt, config=config, use_cache=True)
         logger.info(f"Raw Gemini response (Flashcards): {llm_response}")
         return process_gemini_response(llm_response)
     except Exception as e:
@@ -146,7 +131,7 @@ Text: {text}
 async def generate_flashcards_from_text(request: FlashcardRequest):
     """Generate flashcards from text input."""
     try:
-        flashcards_data = generate_flashcards_with_gemini(request.text, request.num_flashcards)
+        flashcards_data = await generate_flashcards_with_gemini(request.text, request.num_flashcards)
         flashcards = [Flashcard(**fc) for fc in flashcards_data]
 
         # Log the activity if user_id is provided
@@ -179,23 +164,17 @@ async def upload_pdf_for_flashcards(file: UploadFile = File(...), user_id: Optio
     if not file.filename or not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are accepted")
 
-    # Create temp directory if it doesn't exist
-    os.makedirs("temp", exist_ok=True)
-    safe_filename = re.sub(r'[^\w\-.]', '_', os.path.basename(file.filename))
-    file_path = os.path.join("temp", safe_filename)
+    # Kept in memory, or spooled to a unique temp file when large
+    upload = await read_upload(file)
 
     try:
-        # Save the uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
         # Extract text from PDF
-        text = extract_text_from_pdf(file_path)
+        text = await extract_text_from_pdf(upload.source)
         if not text or not text.strip():
             raise HTTPException(status_code=422, detail="Could not extract text content from PDF.")
 
         # Generate flashcards
-        flashcards_data = generate_flashcards_with_gemini(text)
+        flashcards_data = await generate_flashcards_with_gemini(text)
         flashcards = [Flashcard(**fc) for fc in flashcards_data]
 
         # Log the activity if user_id is provided
@@ -209,7 +188,7 @@ async def upload_pdf_for_flashcards(file: UploadFile = File(...), user_id: Optio
                         "num_flashcards": len(flashcards),
                         "sample_flashcard": flashcards[0].dict() if flashcards else None,
                         "filename": file.filename,
-                        "file_size": file.size,
+                        "file_size": upload.size,
                         "source": "pdf"
                     }
                 )
@@ -225,9 +204,4 @@ async def upload_pdf_for_flashcards(file: UploadFile = File(...), user_id: Optio
         logger.error(f"Error processing PDF for flashcards {file.filename}: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
     finally:
-        # Clean up the file
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as cleanup_err:
-                logger.error(f"Failed to remove temp PDF file {file_path}: {cleanup_err}")
\ No newline at end of file
+        upload.close()
\ No newline at end of file
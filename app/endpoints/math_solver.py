@@ -1,8 +1,15 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
-import google.generativeai as genai
+import asyncio
+import hashlib
+from google.genai import types
 from pydantic import BaseModel
 from app.core.app_logging import app_logger
+from app.core.cache import llm_cache
+from app.services.gemini_client import call_gemini_async
+from app.utils.uploads import read_upload
+
+MODEL_NAME = "gemini-2.0-flash"
 
 # Create a router
 router = APIRouter(prefix="/math-solver", tags=["Math Solver"])
@@ -29,16 +36,12 @@ async def solve_math_problem(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="File must be an image")
 
     try:
-        # Read the image file
-        image_content = await file.read()
-
-        # Get initialized model from the global context
-        try:
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            app_logger.info("Using Gemini 2.0 Flash model for math solver")
-        except Exception as e:
-            app_logger.error(f"Failed to initialize Gemini model: {e}")
-            raise HTTPException(status_code=500, detail="Failed to initialize AI model")
+        # Read the image file (size-capped); inline image parts are sent as bytes
+        async with await read_upload(file) as upload:
+            if upload.in_memory:
+                image_content = bytes(upload.source)
+            else:
+                image_content = await asyncio.to_thread(upload.source.read_bytes)
 
         # Create a prompt for Gemini
         prompt = """
@@ -54,12 +57,17 @@ async def solve_math_problem(file: UploadFile = File(...)):
         KaTeX: [katex formatted answer]
         """
 
-        # Send the image and prompt to Gemini
-        response = model.generate_content(
-            [prompt, {"mime_type": file.content_type, "data": image_content}]
-        )
+        # Send the image and prompt to Gemini (re-uploads of the same image hit the cache);
+        # the shared client applies the timeout and the concurrency limit
+        async def generate():
+            return await call_gemini_async(
+                [prompt, types.Part.from_bytes(data=image_content, mime_type=file.content_type)],
+                model=MODEL_NAME
+            )
 
-        response_text = response.text
+        image_hash = hashlib.sha256(image_content).hexdigest()
+        key = llm_cache.make_key(MODEL_NAME, prompt, file.content_type, image_hash)
+        response_text = await llm_cache.get_or_generate(key, generate)
         app_logger.debug(f"Raw Gemini response: {response_text[:200]}...")
 
         # Extract the sections from the response
@@ -102,6 +110,8 @@ async def solve_math_problem(file: UploadFile = File(...)):
             katex_solution=katex
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         app_logger.error(f"Error processing math problem image: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
@@ -2,13 +2,12 @@ from fastapi import APIRouter, HTTPException, File, UploadFile
 from pydantic import BaseModel
 from typing import List, Optional
 from google.genai import types
-from app.services.gemini_client import call_gemini
+from app.services.gemini_client import call_gemini_async
 from app.core.app_logging import app_logger as logger
+from app.services.document_extraction import extract_pdf_text
+from app.utils.uploads import read_upload
 import re
 import json
-import fitz  # PyMuPDF for PDF text extraction
-import os
-import shutil
 from json_repair import repair_json
 # Add import for activity logging
 from app.endpoints.auth import log_user_activity  # Import the activity logging function
@@ -34,14 +33,12 @@ class QuizResponse(BaseModel):
     quiz: List[Question]
 
 
-def extract_text_from_pdf(pdf_path):
+async def extract_text_from_pdf(pdf_path):
     """Extract text content from a PDF file."""
-    doc = fitz.open(pdf_path)
-    text = "\n".join([page.get_text() for page in doc])
-    return text
+    return await extract_pdf_text(pdf_path)
 
 
-def generate_quiz_questions(text: str, num_questions: int = 5, difficulty: str = "medium"):
+async def generate_quiz_questions(text: str, num_questions: int = 5, difficulty: str = "medium"):
     """Generate quiz questions from text using Gemini."""
     # Build a refined prompt
     prompt = f"""
@@ -77,7 +74,7 @@ Text: {text}
 
     # Call Gemini
     try:
-        llm_response = call_gemini(prompt=prompt, config=config)
+        llm_response = await call_gemini_async(prompt=prompt, config=config, use_cache=True)
         logger.info(f"Raw Gemini response (Quiz): {llm_response}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Gemini API error: {str(e)}")
@@ -123,7 +120,7 @@ Text: {text}
 async def generate_quiz(request: QuizRequest):
     """Generate quiz questions using text input."""
     try:
-        questions_data = generate_quiz_questions(request.text, request.num_questions, request.difficulty)
+        questions_data = await generate_quiz_questions(request.text, request.num_questions, request.difficulty)
 
         # Convert to Pydantic models
         quiz_questions = [Question(**q) for q in questions_data]
@@ -165,15 +162,10 @@ async def upload_pdf_for_quiz(
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are accepted")
 
-    os.makedirs("temp", exist_ok=True)
-    file_path = f"temp/{file.filename}"
-
+    upload = await read_upload(file)
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        text = extract_text_from_pdf(file_path)
-        questions_data = generate_quiz_questions(text, num_questions, difficulty)
+        text = await extract_text_from_pdf(upload.source)
+        questions_data = await generate_quiz_questions(text, num_questions, difficulty)
         quiz_questions = [Question(**q) for q in questions_data]
 
         if user_id:
@@ -188,7 +180,7 @@ async def upload_pdf_for_quiz(
                         "sample_question": quiz_questions[0].dict() if quiz_questions else None,
                         "difficulty": difficulty,
                         "filename": file.filename,
-                        "file_size": file.size,
+                        "file_size": upload.size,
                         "source": "pdf"
                     }
                 )
@@ -200,8 +192,7 @@ async def upload_pdf_for_quiz(
         logger.error(f"Error processing PDF for quiz: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
     finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        upload.close()
 
 class QuizResultRequest(BaseModel):
     user_id: str
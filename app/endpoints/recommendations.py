@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional
-from app.database.connection import supabase_db
-from app.services.gemini_client import call_gemini
+from app.database.connection import Database, get_db
+from app.services.gemini_client import call_gemini_async
 from datetime import datetime, timedelta
 import json
 import re
@@ -60,19 +60,18 @@ def summarize_activity_logs(logs: List[dict]) -> str:
     return "\n".join(summary_lines)
 
 @router.post("/personal", response_model=RecommendationsResponse)
-async def generate_recommendations(request: RecommendationsRequest):
+async def generate_recommendations(request: RecommendationsRequest, db: Database = Depends(get_db)):
     try:
         # 1. Get user activity logs for last N days
         since = datetime.utcnow() - timedelta(days=request.days or 14)
         logs = (
-            supabase_db
+            await db
             .table('user_activities')
             .select("*")
             .eq('user_id', request.user_id)
             .gte('timestamp', since.isoformat())
             .execute()
-            .data
-        )
+        ).data
         if not logs:
             raise HTTPException(status_code=404, detail="No activity logs found for user.")
 
@@ -89,7 +88,7 @@ async def generate_recommendations(request: RecommendationsRequest):
 
         # 4. Call Gemini and parse response
         try:
-            gemini_response = call_gemini(prompt)
+            gemini_response = await call_gemini_async(prompt)  # Personalized output, never cached
             print("Gemini output:", gemini_response)  # <-- For debugging
 
             # Remove code fences and any extra non-JSON text
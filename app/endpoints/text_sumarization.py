@@ -1,9 +1,15 @@
+from typing import List, Optional
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import google.generativeai as genai
+import asyncio
 import re
 import logging
 from app.core.config import settings
+from app.core.cache import llm_cache
+from app.services.model_registry import model_registry
+from app.utils.text_splitter import split_text, token_budget
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
@@ -11,9 +17,15 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+SUMMARY_MODES = ("map_reduce", "per_chunk")
+
+# Caps summarization calls in flight across every request in this worker
+_summary_semaphore = asyncio.Semaphore(settings.SUMMARY_MAX_CONCURRENCY)
+
 # Define the input and response models
 class TextInput(BaseModel):
     text: str
+    mode: str = "map_reduce"
 
 class SummaryResponse(BaseModel):
     summary: str
@@ -36,70 +48,111 @@ class TextSummarizerGemini:
             genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: genai.types.HarmBlockThreshold.BLOCK_NONE,
         }
 
-        model_name = getattr(settings, "GEMINI_MODEL_NAME", "gemini-pro")
+        self.model_name = getattr(settings, "GEMINI_MODEL_NAME", "gemini-pro")
 
+    @property
+    def model(self):
+        """Shared model handle from the registry (None if it cannot be created)."""
         try:
-            self.model = genai.GenerativeModel(
-                model_name=model_name,
+            return model_registry.generative_model(
+                self.model_name,
                 generation_config=self.generation_config,
                 safety_settings=self.safety_settings
             )
-            logger.info(f"TextSummarizerGemini initialized model '{model_name}'.")
         except Exception as model_init_err:
-            # Log the full error and set model to None so it fails gracefully later
+            # Log the full error and return None so it fails gracefully
             logger.exception(
-                f"CRITICAL: Failed to initialize GenerativeModel '{model_name}' in TextSummarizerGemini: {model_init_err}")
-            self.model = None
+                f"CRITICAL: Failed to initialize GenerativeModel '{self.model_name}' in TextSummarizerGemini: {model_init_err}")
+            return None
 
     def _process_text(self, text: str) -> str:
         processed_text = re.sub(r'\s+', ' ', text.strip())
         processed_text = processed_text.replace('"', '\\"')  # Escape double quotes
         return processed_text
 
-    def _split_text(self, text: str, max_length: int = 2000):
-        words = text.split()
-        chunks = []
-        current_chunk = []
-
-        for word in words:
-            current_chunk.append(word)
-            if len(" ".join(current_chunk)) > max_length:
-                chunks.append(" ".join(current_chunk[:-1]))
-                current_chunk = [word]
-
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
-
-        return chunks
-
-    async def summarize_text(self, text: str) -> str:
-        if not self.model:
+    def _split_text(self, text: str, max_tokens: Optional[int] = None) -> List[str]:
+        budget = token_budget(self.model_name, max_tokens or settings.SUMMARY_CHUNK_TOKENS)
+        return split_text(text, budget)
+
+    async def _generate(self, model, prompt: str) -> str:
+        chat = model.start_chat(history=[])
+        response = await chat.send_message_async(prompt)
+        return response.text
+
+    def _map_prompt(self, text: str) -> str:
+        return (
+            "Summarize the following text into key points and a crux:\n\n"
+            f"{self._process_text(text)}\n\n"
+            "Provide the output in the following format:\n"
+            "Key Points:\n- Point 1\n- Point 2\n- ...\n\n"
+            "Crux:\n- A single concise statement summarizing the text."
+        )
+
+    def _reduce_prompt(self, summaries: List[str]) -> str:
+        parts = "\n\n".join(f"Summary {i + 1}:\n{summary}" for i, summary in enumerate(summaries))
+        return (
+            "The following are summaries of consecutive sections of one document. "
+            "Merge them into a single summary of the whole document: combine overlapping points, "
+            "keep the most important ones in document order and drop repetition.\n\n"
+            f"{parts}\n\n"
+            "Provide the output in the following format:\n"
+            "Key Points:\n- Point 1\n- Point 2\n- ...\n\n"
+            "Crux:\n- A single concise statement summarizing the whole document."
+        )
+
+    async def _cached_generate(self, model, prompt: str) -> str:
+        key = llm_cache.make_key(self.model_name, self.generation_config, prompt)
+        async with _summary_semaphore:
+            return await llm_cache.get_or_generate(key, lambda: self._generate(model, prompt))
+
+    async def _reduce(self, model, summaries: List[str]) -> str:
+        """Merge partial summaries in rounds of SUMMARY_REDUCE_FAN_IN until one is left."""
+        fan_in = max(2, settings.SUMMARY_REDUCE_FAN_IN)
+        depth = 0
+        while len(summaries) > 1:
+            groups = [summaries[i:i + fan_in] for i in range(0, len(summaries), fan_in)]
+            summaries = await asyncio.gather(*(
+                self._cached_generate(model, self._reduce_prompt(group)) if len(group) > 1 else _passthrough(group[0])
+                for group in groups
+            ))
+            depth += 1
+        logger.info(f"Reduced partial summaries in {depth} round(s)")
+        return summaries[0]
+
+    async def summarize_text(self, text: str, mode: str = "map_reduce") -> str:
+        """
+        Summarize `text` into key points and a crux.
+
+        Chunks are summarized concurrently (at most SUMMARY_MAX_CONCURRENCY calls in
+        flight). In "map_reduce" mode the partial summaries are then merged into one;
+        "per_chunk" returns the partial summaries joined in document order.
+        """
+        if mode not in SUMMARY_MODES:
+            raise HTTPException(status_code=400, detail=f"Unknown summary mode '{mode}', expected one of {SUMMARY_MODES}")
+
+        model = self.model
+        if not model:
             logger.error("TextSummarizerGemini model was not initialized successfully during startup.")
             raise HTTPException(status_code=503, detail="Summarization service model is not available.")
 
         try:
             chunks = self._split_text(text)
-            summaries = []
-            for chunk in chunks:
-                processed_text = self._process_text(chunk)
-                prompt = (
-                    "Summarize the following text into key points and a crux:\n\n"
-                    f"{processed_text}\n\n"
-                    "Provide the output in the following format:\n"
-                    "Key Points:\n- Point 1\n- Point 2\n- ...\n\n"
-                    "Crux:\n- A single concise statement summarizing the text."
-                )
-
-                chat = self.model.start_chat(history=[])
-                response = await chat.send_message_async(prompt)
-                summaries.append(response.text)
-
-            return "\n".join(summaries)
+            summaries = list(await asyncio.gather(*(
+                self._cached_generate(model, self._map_prompt(chunk)) for chunk in chunks
+            )))
+            if mode == "per_chunk" or len(summaries) == 1:
+                return "\n".join(summaries)
+            return await self._reduce(model, summaries)
 
         except Exception as e:
             logger.error(f"Error during text summarization: {e}")
             raise HTTPException(status_code=500, detail=str(e))
 
+
+async def _passthrough(summary: str) -> str:
+    return summary
+
+
 # Instantiate the text summarizer
 text_summarizer = TextSummarizerGemini()
 
@@ -108,7 +161,7 @@ text_summarizer = TextSummarizerGemini()
 async def summarize(input_data: TextInput):
     try:
         # This now calls the modified summarize_text method
-        summary = await text_summarizer.summarize_text(input_data.text)
+        summary = await text_summarizer.summarize_text(input_data.text, input_data.mode)
         return {"summary": summary}
     except HTTPException as http_exc:
          # If summarize_text raised an HTTPException (like 503), re-raise it
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, Query
-from pathlib import Path
 from app.core.exception import CustomHTTPException
 from app.core.schemas import APIResponse
 from app.services.audio import process_audio_file
-from app.utils.helper_functions import save_file_async
+from app.utils.uploads import read_upload
+import mimetypes
 from fastapi import Depends
 import os
 from enum import Enum
@@ -46,14 +46,12 @@ async def transcribe_audio(
         if file_ext not in valid_extensions:
             raise CustomHTTPException("Invalid file format. Supported formats: MP3, WAV, M4A, OGG, AAC, FLAC, AIFF")
 
-        # Save file temporarily
-        file_path = await save_file_async(file, Path("temp_uploads"))
-
-        # Process audio with Gemini
-        result = await process_audio_file(file_path, mode=mode.value)
-
-        # Clean up temp file
-        os.remove(file_path)
+        # Small recordings stay in memory; large ones are spooled to a unique temp file
+        async with await read_upload(file) as upload:
+            mime_type = file.content_type if (file.content_type or "").startswith("audio/") \
+                else mimetypes.guess_type(file.filename)[0]
+            # Process audio with Gemini
+            result = await process_audio_file(upload.source, mode=mode.value, mime_type=mime_type)
 
         # Prepare response data
         response_data = {}
@@ -71,6 +69,8 @@ async def transcribe_audio(
             message="Audio processed successfully",
             data=response_data
         )
+    except CustomHTTPException:
+        raise
     except FileNotFoundError:
         raise CustomHTTPException("File not found")
     except RuntimeError as e:
@@ -10,8 +10,16 @@ from app.core.exception import CustomHTTPException
 from app.endpoints import auth, transcription
 from app.endpoints.text_sumarization import router as text_summarizer
 from contextlib import asynccontextmanager # Import lifespan manager
-import google.generativeai as genai # Import genai
+from app.services.model_registry import model_registry
+from app.services.ingestion_jobs import ingestion_queue
+from app.services.document_extraction import shutdown_extraction_pool
+from app.core import cache
+from app.core.event_bus import event_bus
+from app.core.cache import setup_cache, close_cache, llm_cache, llm_cache_bypass, wants_cache_bypass
 from app.core.app_logging import app_logger
+from app.core.security import password_hasher
+from app.database.connection import database
+from app.services.activity_log import activity_writer
 import re
 
 
@@ -36,7 +44,8 @@ async def lifespan(app: FastAPI):
     app_logger.info("Application startup: Configuring services...")
     if settings.GEMINI_KEY:
         try:
-            genai.configure(api_key=settings.GEMINI_KEY)
+            model_registry.configure(api_key=settings.GEMINI_KEY)
+            model_registry.warm_up()
             app_logger.info("Google Generative AI configured successfully.")
         except Exception as e:
             # Log the exception and decide if the app should crash
@@ -45,8 +54,25 @@ async def lifespan(app: FastAPI):
             # raise RuntimeError("Failed to configure Gemini API") from e
     else:
         app_logger.error("CRITICAL: GEMINI_KEY not found in settings. Gemini API features WILL fail.")
+    if settings.REDIS_URL:
+        try:
+            await setup_cache()
+            app_logger.info("Redis cache configured successfully.")
+            await event_bus.start_redis(cache.redis_client)
+        except Exception as e:
+            app_logger.error(f"Failed to configure Redis cache, using in-process cache only: {e}")
+    await ingestion_queue.start()
+    await activity_writer.start()
     yield
     # Code to run on shutdown (if any)
+    await ingestion_queue.stop()
+    await event_bus.stop()
+    shutdown_extraction_pool()
+    password_hasher.shutdown()
+    # Drain buffered activities while the database client is still open
+    await activity_writer.stop()
+    await database.close()
+    await close_cache()
     app_logger.info("Application shutdown.")
 
 
@@ -91,6 +117,16 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+# Let clients skip cached LLM responses (X-LLM-Cache: bypass or Cache-Control: no-cache)
+@app.middleware("http")
+async def llm_cache_bypass_middleware(request: Request, call_next):
+    token = llm_cache_bypass.set(wants_cache_bypass(request.headers))
+    try:
+        return await call_next(request)
+    finally:
+        llm_cache_bypass.reset(token)
+
+
 # Exception handler for custom HTTP exceptions
 @app.exception_handler(CustomHTTPException)
 async def custom_exception_handler(request: Request, exc: CustomHTTPException):
@@ -144,6 +180,30 @@ async def health_check():
     return {"status": "healthy"}
 
 
+# LLM response cache counters
+@app.get("/health/llm-cache")
+async def llm_cache_stats():
+    return llm_cache.snapshot()
+
+
+# bcrypt worker pool queue depth and timings
+@app.get("/health/password-hashing")
+async def password_hashing_stats():
+    return password_hasher.snapshot()
+
+
+# Database query timings from the pooled PostgREST client
+@app.get("/health/database")
+async def database_stats():
+    return database.snapshot()
+
+
+# Write-behind activity log buffer and spill counters
+@app.get("/health/activity-log")
+async def activity_log_stats():
+    return activity_writer.snapshot()
+
+
 # Root endpoint
 @app.get("/")
 async def root():
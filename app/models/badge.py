@@ -1,38 +1,37 @@
-import os
 from typing import List, Optional
 from datetime import datetime, timedelta
-from supabase import create_client, Client
 from pydantic import BaseModel
 from app.core.app_logging import app_logger
+from app.database.connection import Database, database
 
 class BadgeManager:
-    def __init__(self):
-        self.supabase: Client = create_client(
-            os.getenv('SUPABASE_URL'),
-            os.getenv('SUPABASE_KEY')
-        )
-        self.badge_cache = self._load_badges_cache()
-
-    def _load_badges_cache(self):
-        """Load badges into memory for faster access"""
+    def __init__(self, db: Database = database):
+        self.db = db
+        self.badge_cache = {}
+
+    async def _load_badges_cache(self):
+        """Load badges into memory for faster access (once, on first use)"""
+        if self.badge_cache:
+            return self.badge_cache
         try:
-            badges = self.supabase.table('badges').select('*').execute()
-            return {badge['id']: badge for badge in badges.data}
+            badges = await self.db.table('badges').select('*').execute()
+            self.badge_cache = {badge['id']: badge for badge in badges.data}
         except Exception as e:
             app_logger.error(f"Error loading badge cache: {e}")
-            return {}
+        return self.badge_cache
 
-    def award_badge(self, user_id: str, badge_id: int) -> bool:
+    async def award_badge(self, user_id: str, badge_id: int) -> bool:
         """
         Efficiently award a badge to a user
         Prevents duplicate awards and handles errors
         """
         try:
+            await self._load_badges_cache()
             if badge_id not in self.badge_cache:
                 app_logger.warning(f"Badge {badge_id} does not exist")
                 return False
 
-            result = self.supabase.table('user_badges').upsert({
+            result = await self.db.table('user_badges').upsert({
                 'user_id': user_id,
                 'badge_id': badge_id
             }, on_conflict='user_id,badge_id').execute()
@@ -42,13 +41,13 @@ class BadgeManager:
             app_logger.error(f"Badge award error: {e}")
             return False
 
-    def get_user_badges(self, user_id: str) -> List[dict]:
+    async def get_user_badges(self, user_id: str) -> List[dict]:
         """
         Efficiently retrieve user's earned badges
         Uses cached badge information
         """
         try:
-            result = self.supabase.table('user_badges') \
+            result = await self.db.table('user_badges') \
                 .select('badge_id, badges(name, description, image_url, activity_type, count, consecutive_days, streak_required, leaderboard_criterion, badge_count_required)') \
                 .eq('user_id', user_id) \
                 .execute()
@@ -72,11 +71,12 @@ class BadgeManager:
             app_logger.error(f"Error retrieving user badges: {e}")
             return []
 
-    def check_badge_progress(self, user_id: str, badge_id: int) -> dict:
+    async def check_badge_progress(self, user_id: str, badge_id: int) -> dict:
         """
         Check progress towards a specific badge based on its criteria
         """
         try:
+            await self._load_badges_cache()
             if badge_id not in self.badge_cache:
                 return {'progress': 0, 'total_required': 0, 'is_earned': False}
 
@@ -86,7 +86,7 @@ class BadgeManager:
             is_earned = False
 
             current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            streak_result = self.supabase.table('user_streaks') \
+            streak_result = await self.db.table('user_streaks') \
                 .select("current_streak, last_activity_date") \
                 .eq('user_id', user_id) \
                 .execute()
@@ -101,11 +101,11 @@ class BadgeManager:
             if badge.get('activity_type') and badge.get('count') is not None:
                 activity_type = badge['activity_type']
                 total_required = badge['count']
-                count = self.supabase.table('user_activities') \
-                    .select('id', count='exact') \
-                    .eq('user_id', user_id) \
-                    .eq('activity_type', activity_type) \
-                    .execute().count or 0
+                count = (await self.db.table('user_activities')
+                         .select('id', count='exact')
+                         .eq('user_id', user_id)
+                         .eq('activity_type', activity_type)
+                         .execute()).count or 0
                 progress = count
                 is_earned = count >= total_required
 
@@ -113,7 +113,7 @@ class BadgeManager:
             elif badge.get('activity_type') and badge.get('consecutive_days') is not None:
                 activity_type = badge['activity_type']
                 total_required = badge['consecutive_days']
-                consecutive_days = self._check_consecutive_days(user_id, activity_type)
+                consecutive_days = await self._check_consecutive_days(user_id, activity_type)
                 progress = consecutive_days if streak_active else 0  # Reset if streak broken
                 is_earned = consecutive_days >= total_required if streak_active else False
 
@@ -127,7 +127,7 @@ class BadgeManager:
             elif badge.get('leaderboard_criterion') is not None:
                 if badge['leaderboard_criterion'] == 'entered' and badge_id == 15:
                     total_required = 1
-                    result = self.supabase.table('user_activities') \
+                    result = await self.db.table('user_activities') \
                         .select('id', count='exact') \
                         .eq('user_id', user_id) \
                         .eq('activity_type', 'leaderboard_updated') \
@@ -136,7 +136,7 @@ class BadgeManager:
                     is_earned = progress >= 1
                 elif badge['leaderboard_criterion'] == 'top_10_percent' and badge_id == 16:
                     total_required = 1
-                    result = self.supabase.table('user_activities') \
+                    result = await self.db.table('user_activities') \
                         .select('metadata') \
                         .eq('user_id', user_id) \
                         .eq('activity_type', 'leaderboard_updated') \
@@ -152,7 +152,7 @@ class BadgeManager:
             # Handle badge collection badges
             elif badge.get('badge_count_required') is not None:
                 total_required = badge['badge_count_required']
-                user_badges = self.get_user_badges(user_id)
+                user_badges = await self.get_user_badges(user_id)
                 progress = len(user_badges)
                 is_earned = progress >= total_required
 
@@ -167,10 +167,10 @@ class BadgeManager:
             app_logger.error(f"Error checking badge progress for badge {badge_id}: {e}")
             return {'progress': 0, 'total_required': 10, 'is_earned': False}
 
-    def _check_consecutive_days(self, user_id: str, activity_type: str) -> int:
+    async def _check_consecutive_days(self, user_id: str, activity_type: str) -> int:
         """Helper method to check consecutive days"""
         try:
-            result = self.supabase.table('user_activities') \
+            result = await self.db.table('user_activities') \
                 .select("timestamp") \
                 .eq("user_id", user_id) \
                 .eq("activity_type", activity_type) \
@@ -210,8 +210,8 @@ class BadgeManager:
             app_logger.error(f"Error checking consecutive days: {e}")
             return 0
 
-    def get_all_badges(self) -> List[dict]:
+    async def get_all_badges(self) -> List[dict]:
         """
         Return all badges from cache
         """
-        return list(self.badge_cache.values())
\ No newline at end of file
+        return list((await self._load_badges_cache()).values())
\ No newline at end of file
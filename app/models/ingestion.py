@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class FileProgress(BaseModel):
+    filename: str
+    content_type: Optional[str] = None
+    file_size: int = 0
+    status: str = "pending"  # pending, extracting, embedding, done, failed
+    page_count: int = 0
+    chunk_count: int = 0
+    embedded_chunks: int = 0
+    file_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class IngestionJob(BaseModel):
+    id: str
+    owner_id: str
+    status: str = "queued"  # queued, running, completed, completed_with_errors, failed
+    files: List[FileProgress]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "completed_with_errors", "failed")
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel, EmailStr, Field
 
 class UserCreate(BaseModel):
@@ -11,6 +12,14 @@ class UserLogin(BaseModel):
     password: str
 
 
+class CurrentUser(BaseModel):
+    """The authenticated principal, resolved from the access token."""
+    id: str
+    username: str
+    email: Optional[str] = None
+    role: str = "user"
+
+
 class UserResponse(BaseModel):
     username: str
     email: str
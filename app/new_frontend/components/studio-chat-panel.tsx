@@ -46,6 +46,23 @@ interface Message {
 }
 
 const API_BASE_URL = "http://localhost:8000/api/v1"
+const UPLOAD_POLL_INTERVAL_MS = 1000
+
+interface UploadFileProgress {
+  filename: string
+  status: string
+  page_count: number
+  error?: string | null
+}
+
+interface UploadJob {
+  id: string
+  status: string
+  files: UploadFileProgress[]
+  error?: string | null
+}
+
+const FINISHED_JOB_STATUSES = ["completed", "completed_with_errors", "failed"]
 
 export default function StudioChatPanel() {
   const [activeFiles, setActiveFiles] = useState<FileInfo[]>([])
@@ -86,6 +103,34 @@ export default function StudioChatPanel() {
     return `${(bytes / (1024 * 1024)).toFixed(1)} MB`
   }
 
+  // Documents are kept per signed-in user; a rejected token is an error, not a fall back to anonymous data
+  const ensureAuthorized = (response: Response) => {
+    if (response.status === 401) {
+      throw new Error("Your session has expired. Please sign in again.")
+    }
+  }
+
+  // Uploads are ingested in the background: poll the job until every file is done or failed
+  const waitForUploadJob = async (jobId: string): Promise<UploadJob> => {
+    while (true) {
+      const response = await fetch(`${API_BASE_URL}/chatbot/upload-jobs/${jobId}`, {
+        headers: {
+          ...(token && { Authorization: `Bearer ${token}` }),
+        },
+      })
+      ensureAuthorized(response)
+      if (!response.ok) {
+        throw new Error(`Failed to check upload progress: ${response.statusText}`)
+      }
+      const data = await response.json()
+      const job: UploadJob = data.data
+      if (FINISHED_JOB_STATUSES.includes(job.status)) {
+        return job
+      }
+      await new Promise((resolve) => setTimeout(resolve, UPLOAD_POLL_INTERVAL_MS))
+    }
+  }
+
   const fetchActiveFiles = async () => {
     setIsLoading(true)
     try {
@@ -94,6 +139,7 @@ export default function StudioChatPanel() {
           ...(token && { Authorization: `Bearer ${token}` }),
         },
       })
+      ensureAuthorized(response)
       if (!response.ok) throw new Error(`Failed to fetch active files: ${response.statusText}`)
       const data = await response.json()
       setActiveFiles(data || [])
@@ -114,6 +160,7 @@ export default function StudioChatPanel() {
           ...(token && { Authorization: `Bearer ${token}` }),
         },
       })
+      ensureAuthorized(response)
       if (!response.ok) throw new Error(`Failed to fetch knowledge bases: ${response.statusText}`)
       const data = await response.json()
       setKnowledgeBases(data || [])
@@ -156,6 +203,7 @@ export default function StudioChatPanel() {
           ...(token && { Authorization: `Bearer ${token}` }),
         },
       })
+      ensureAuthorized(response)
       if (!response.ok) throw new Error(`Failed to clear chat: ${response.statusText}`)
       const data = await response.json()
       if (!data.success) throw new Error(data.message || "Failed to clear chat")
@@ -205,6 +253,7 @@ export default function StudioChatPanel() {
         },
         body: formData,
       })
+      ensureAuthorized(response)
       if (!response.ok) {
         const errorData = await response.json()
         throw new Error(errorData.message || errorData.detail || `Failed to upload files: ${response.statusText}`)
@@ -213,23 +262,30 @@ export default function StudioChatPanel() {
       if (!data.success) {
         throw new Error(data.message || "Failed to upload files")
       }
+      const job = await waitForUploadJob(data.data.job_id)
+      const ingested = job.files.filter((file) => file.status === "done")
+      const failed = job.files.filter((file) => file.status === "failed")
+      if (ingested.length === 0) {
+        throw new Error(failed[0]?.error || job.error || "Failed to process the uploaded files")
+      }
       await fetchActiveFiles()
-      if (token && data.data.uploaded_files) {
-        data.data.uploaded_files.forEach((file: FileInfo) =>
-          UserActivity.uploadDocument(file.name, file.page_count || 1, token)
-        )
+      if (token) {
+        ingested.forEach((file) => UserActivity.uploadDocument(file.filename, file.page_count || 1, token))
       }
+      const failedNote = failed.length
+        ? ` ${failed.length} file(s) could not be processed: ${failed.map((file) => file.filename).join(", ")}.`
+        : ""
       setMessages((prev) => [
         ...prev,
         {
           id: crypto.randomUUID(),
           role: "assistant",
-          content: `Successfully uploaded ${data.data.file_count} file(s). You can now ask questions about the documents.`,
+          content: `Successfully uploaded ${ingested.length} file(s). You can now ask questions about the documents.${failedNote}`,
           timestamp: new Date(),
           type: "text",
         },
       ])
-      toast({ title: "Success", description: `${data.data.file_count} file(s) uploaded successfully.` })
+      toast({ title: "Success", description: `${ingested.length} file(s) uploaded successfully.${failedNote}` })
     } catch (error) {
       const errorMessage = error instanceof Error ? error.message : "Error uploading files"
       setStudioError(errorMessage)
@@ -277,6 +333,7 @@ export default function StudioChatPanel() {
         body: JSON.stringify({ question: input, file_ids: activeFiles.filter(f => f.active).map(f => f.id) }),
       })
 
+      ensureAuthorized(response)
       if (!response.ok) {
         const errorData = await response.json()
         throw new Error(errorData.message || errorData.detail || `Failed to get response: ${response.statusText}`)
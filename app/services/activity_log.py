@@ -0,0 +1,274 @@
+"""
+Write-behind logging of user activities.
+
+Request handlers call `activity_writer.enqueue(...)`, which only appends to an
+in-process buffer. A background task, started in main.lifespan, writes the
+buffer to `user_activities` with one bulk insert per ACTIVITY_BATCH_SIZE events,
+either as soon as a batch is full or every ACTIVITY_FLUSH_INTERVAL_SECONDS.
+
+If the database can't be reached (transport error, timeout, 5xx), the batch is
+appended to a JSON-lines spill file under ACTIVITY_SPILL_DIR (one file per
+worker process). Spilled events are replayed by whichever worker next writes a
+batch successfully. On shutdown the buffer is flushed, and whatever can't be
+written is spilled, so no event is lost to an outage.
+
+If the database rejects the rows themselves (invalid data or a constraint
+violation, e.g. an unknown user id), the batch is retried row by row so that
+only the offending rows are dropped and logged.
+"""
+import asyncio
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from postgrest.exceptions import APIError
+from app.core.config import settings
+from app.core.app_logging import app_logger as logger
+from app.database.connection import Database, database
+
+SPILL_PATTERN = "activities-*.jsonl"
+
+WRITTEN, REJECTED, UNAVAILABLE = "written", "rejected", "unavailable"
+
+# SQLSTATE classes for problems with the submitted rows: 22 data exception
+# (e.g. malformed uuid), 23 integrity constraint violation (e.g. unknown user)
+ROW_ERROR_CLASSES = ("22", "23")
+
+
+def rejected_rows(error: Exception) -> bool:
+    """
+    True if the database refused the submitted rows, so retrying them can't help.
+    Transport errors, timeouts, 5xx and anything unrecognised count as the
+    database being unavailable.
+    """
+    if not isinstance(error, APIError) or error.code is None:
+        return False
+    code = str(error.code)
+    if len(code) == 3 and code.isdigit():
+        # No JSON error body; the code is the HTTP status (SQLSTATEs have five characters)
+        return int(code) in (400, 409, 422)
+    if code.startswith("PGRST"):
+        # PGRST1xx: the request body itself was invalid
+        return code.startswith("PGRST1")
+    return code[:2] in ROW_ERROR_CLASSES
+
+
+class ActivityWriter:
+    def __init__(self, db: Database, batch_size: int, flush_interval: float, spill_dir: str):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.spill_dir = Path(spill_dir)
+        self._buffer: List[Tuple[dict, asyncio.Future]] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Follow-up work waiting on written events (e.g. badge checks), finished in stop()
+        self._followups: Set[asyncio.Task] = set()
+        self.stats = {
+            "queued": 0, "written": 0, "batches": 0, "failed_batches": 0, "rejected": 0, "spilled": 0, "replayed": 0
+        }
+
+    @property
+    def spill_path(self) -> Path:
+        return self.spill_dir / f"activities-{os.getpid()}.jsonl"
+
+    def enqueue(self, user_id: str, activity_type: str, metadata: Optional[dict] = None) -> asyncio.Future:
+        """
+        Buffer one activity. The returned future resolves to True once the event is
+        in the database, or False if it was spilled to disk or rejected instead.
+        """
+        # Every row carries the same keys: PostgREST bulk inserts require it
+        event = {
+            "user_id": user_id,
+            "activity_type": activity_type,
+            "timestamp": datetime.utcnow().isoformat(),
+            "metadata": metadata or None
+        }
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append((event, future))
+        self.stats["queued"] += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return future
+
+    def track(self, task: asyncio.Task):
+        """Keep a task that waits on an enqueued event alive, and let stop() finish it."""
+        self._followups.add(task)
+        task.add_done_callback(self._followups.discard)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Activity writer started (batch {self.batch_size}, every {self.flush_interval}s)"
+            )
+
+    async def stop(self):
+        """
+        Flush everything still buffered, spill what can't be written, then give
+        tracked follow-up tasks DB_TIMEOUT_SECONDS to finish before cancelling them,
+        so none outlives the database client. Called from main.lifespan.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            batch = self._take(len(self._buffer))
+            await self._spill([event for event, _ in batch])
+            self._resolve(batch, [False] * len(batch))
+        await self._finish_followups()
+
+    async def _finish_followups(self):
+        if not self._followups:
+            return
+        pending = set(self._followups)
+        _, unfinished = await asyncio.wait(pending, timeout=settings.DB_TIMEOUT_SECONDS)
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            logger.warning(f"Cancelled {len(unfinished)} activity follow-up tasks on shutdown")
+            await asyncio.gather(*unfinished, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Activity flush failed: {e}")
+
+    def _take(self, count: int) -> List[Tuple[dict, asyncio.Future]]:
+        batch = self._buffer[:count]
+        del self._buffer[:count]
+        return batch
+
+    async def flush(self):
+        """Write the buffer in bulk inserts, then replay spilled events if the database is reachable."""
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._take(self.batch_size)
+                written, unwritten = await self._write([event for event, _ in batch])
+                self._resolve(batch, written)
+                if unwritten:
+                    await self._spill(unwritten)
+                    return
+            await self._replay_spilled()
+
+    async def _insert(self, rows: List[dict]) -> str:
+        try:
+            await self.db.table('user_activities').insert(rows).execute()
+        except Exception as e:
+            if rejected_rows(e):
+                if len(rows) == 1:
+                    self.stats["rejected"] += 1
+                    logger.error(f"Dropping activity rejected by the database: {rows[0]} ({e})")
+                return REJECTED
+            self.stats["failed_batches"] += 1
+            logger.error(f"Failed to write {len(rows)} activities: {e}")
+            return UNAVAILABLE
+        self.stats["batches"] += 1
+        self.stats["written"] += len(rows)
+        return WRITTEN
+
+    async def _write(self, rows: List[dict]) -> Tuple[List[bool], List[dict]]:
+        """
+        Insert rows. Returns whether each row was written, and the rows still to be
+        spilled because the database became unavailable (a suffix of `rows`).
+        """
+        outcome = await self._insert(rows)
+        if outcome == WRITTEN:
+            return [True] * len(rows), []
+        if outcome == UNAVAILABLE:
+            return [False] * len(rows), rows
+        if len(rows) == 1:
+            return [False], []
+
+        # Some row was refused: insert one by one so the valid rows still get in
+        logger.warning(f"Batch of {len(rows)} activities was rejected; retrying row by row")
+        written: List[bool] = []
+        for index, row in enumerate(rows):
+            outcome = await self._insert([row])
+            if outcome == UNAVAILABLE:
+                return written + [False] * (len(rows) - index), rows[index:]
+            written.append(outcome == WRITTEN)
+        return written, []
+
+    @staticmethod
+    def _resolve(batch: List[Tuple[dict, asyncio.Future]], written: List[bool]):
+        for (_, future), ok in zip(batch, written):
+            if not future.done():
+                future.set_result(ok)
+
+    async def _spill(self, rows: List[dict]):
+        try:
+            await asyncio.to_thread(self._append_spill, rows)
+            self.stats["spilled"] += len(rows)
+            logger.warning(f"Spilled {len(rows)} activities to {self.spill_path}")
+        except Exception as e:
+            logger.error(f"Failed to spill {len(rows)} activities, they are lost: {e}")
+
+    def _append_spill(self, rows: List[dict]):
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+    async def _replay_spilled(self):
+        if not self.spill_dir.is_dir():
+            return
+        for path in sorted(self.spill_dir.glob(SPILL_PATTERN)):
+            # Claim the file first so two workers never replay the same events
+            claimed = path.with_name(f"{path.name}.{os.getpid()}.claimed")
+            try:
+                path.rename(claimed)
+            except FileNotFoundError:
+                continue
+            rows = await asyncio.to_thread(self._read_spill, claimed)
+            for start in range(0, len(rows), self.batch_size):
+                chunk = rows[start:start + self.batch_size]
+                written, unwritten = await self._write(chunk)
+                self.stats["replayed"] += sum(written)
+                if unwritten:
+                    # Still unreachable: keep the rest for the next attempt
+                    await asyncio.to_thread(self._append_spill, unwritten + rows[start + len(chunk):])
+                    claimed.unlink(missing_ok=True)
+                    return
+            claimed.unlink(missing_ok=True)
+            logger.info(f"Replayed {len(rows)} spilled activities from {path.name}")
+
+    @staticmethod
+    def _read_spill(path: Path) -> List[dict]:
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt line in {path.name}")
+        return rows
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "buffered": len(self._buffer)}
+
+
+activity_writer = ActivityWriter(
+    database,
+    settings.ACTIVITY_BATCH_SIZE,
+    settings.ACTIVITY_FLUSH_INTERVAL_SECONDS,
+    settings.ACTIVITY_SPILL_DIR
+)
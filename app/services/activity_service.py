@@ -1,11 +1,13 @@
+import asyncio
 from typing import List, Optional
 from datetime import datetime, timedelta
-from app.database.connection import supabase_db
+from app.database.connection import Database, database
 from app.core.exception import CustomHTTPException
 from app.core.app_logging import app_logger
 from app.models.activity import UserActivityLog, ActivityBase
 from app.services.badges_service import BadgeService
 from app.services.badge_checker import BadgeChecker
+from app.services.activity_log import activity_writer
 
 
 # Create instances at module level for singleton behavior
@@ -14,36 +16,47 @@ badge_checker = BadgeChecker(badge_service)
 
 
 class ActivityService:
-    def __init__(self):
-        self.db = supabase_db
+    def __init__(self, db: Database = database):
+        self.db = db
 
     async def log_activity(self, user_id: str, activity_type: str, details: dict = None) -> dict:
-        """Log a user activity and check for new badges"""
+        """
+        Queue a user activity for the next batched write, then check for new badges
+        in the background once it is stored (badge counts are read from the table).
+
+        The write happens after this returns, so the result only says the activity
+        was accepted: "success" is True once it is queued, "activity_id" is always
+        None (the row doesn't exist yet) and "new_badges" is always empty. Badges
+        earned by the activity are awarded in the background; callers that need
+        them must read them from BadgeService afterwards.
+        """
         try:
-            activity = {
-                "user_id": user_id,
-                "activity_type": activity_type,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-
-            if details:
-                activity["metadata"] = details
-
-            result = self.db.table('user_activities').insert(activity).execute()
-
-            # Check if any badges should be awarded
-            awarded_badges = await badge_checker.check_activity_badges(user_id, activity_type, details)
+            written = activity_writer.enqueue(user_id, activity_type, details)
+            task = asyncio.create_task(self._check_badges_when_written(written, user_id, activity_type, details))
+            activity_writer.track(task)
 
             return {
-                "success": bool(result.data),
-                "activity_id": result.data[0]["id"] if result.data else None,
-                "new_badges": awarded_badges
+                "success": True,
+                "activity_id": None,
+                "new_badges": []
             }
 
         except Exception as e:
             app_logger.error(f"Failed to log activity: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    async def _check_badges_when_written(written: asyncio.Future, user_id: str, activity_type: str, details: dict):
+        if not await written:
+            app_logger.warning(f"Activity {activity_type} for {user_id} was spilled; skipping badge check")
+            return
+        try:
+            awarded_badges = await badge_checker.check_activity_badges(user_id, activity_type, details)
+            if awarded_badges:
+                app_logger.info(f"Awarded {len(awarded_badges)} badges to {user_id} after {activity_type}")
+        except Exception as e:
+            app_logger.error(f"Badge check after {activity_type} failed: {str(e)}")
+
     async def get_user_activities(
             self,
             user_id: str,
@@ -60,7 +73,7 @@ class ActivityService:
             if activity_type:
                 query = query.eq("activity_type", activity_type)
 
-            result = query.order("timestamp", desc=True).execute()
+            result = await query.order("timestamp", desc=True).execute()
 
             activities = [
                 ActivityBase(
@@ -88,7 +101,7 @@ class ActivityService:
             # Get activities from the last 30 days
             thirty_days_ago = datetime.utcnow() - timedelta(days=30)
 
-            result = self.db.table('user_activities') \
+            result = await self.db.table('user_activities') \
                 .select("activity_type, count") \
                 .eq("user_id", user_id) \
                 .gte("timestamp", thirty_days_ago) \
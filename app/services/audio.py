@@ -1,30 +1,43 @@
+import io
 import os
 from pathlib import Path
-from google import genai
+from typing import Optional, Union
+from google.genai import types
 from app.core.app_logging import app_logger
+from app.services.model_registry import model_registry
+from app.services.gemini_client import call_gemini_async
 
+# Transcribing long recordings takes much longer than a text prompt
+AUDIO_TIMEOUT_SECONDS = 300
 
-async def process_audio_file(file_path: Path, mode="both") -> dict:
+
+async def process_audio_file(file_path: Union[Path, bytes], mode="both", mime_type: Optional[str] = None) -> dict:
     """
     Process audio file using Google Gemini.
 
     Args:
-        file_path: Path to the audio file
+        file_path: Path to the audio file, or its bytes when held in memory (then pass mime_type)
         mode: 'transcript' for transcription only, 'summary' for summary only, 'both' for both
 
     Returns:
         Dictionary with transcript and/or summary information
     """
     try:
-        app_logger.info(f"Processing audio file: {file_path} with mode: {mode}")
+        app_logger.info(f"Processing audio file: {file_path if isinstance(file_path, Path) else 'in memory'} with mode: {mode}")
 
-        # Initialize Gemini client
-        client = genai.Client()
+        # Shared Gemini client from the model registry
+        client = model_registry.client
         model = "gemini-2.0-flash"
 
         # Upload the file to Gemini Files API
         app_logger.info(f"Uploading audio file to Gemini Files API")
-        uploaded_file = client.files.upload(file=str(file_path))
+        if isinstance(file_path, Path):
+            uploaded_file = await client.aio.files.upload(file=str(file_path))
+        else:
+            uploaded_file = await client.aio.files.upload(
+                file=io.BytesIO(file_path),
+                config=types.UploadFileConfig(mime_type=mime_type or "audio/mpeg")
+            )
 
         result = {}
 
@@ -33,12 +46,13 @@ async def process_audio_file(file_path: Path, mode="both") -> dict:
             transcript_prompt = "Generate a complete, accurate transcript of this audio file."
 
             app_logger.info(f"Generating transcript using Gemini")
-            transcript_response = client.models.generate_content(
+            transcript_text = await call_gemini_async(
+                [transcript_prompt, uploaded_file],
                 model=model,
-                contents=[transcript_prompt, uploaded_file]
+                timeout=AUDIO_TIMEOUT_SECONDS
             )
 
-            result["transcript"] = transcript_response.text.strip()
+            result["transcript"] = transcript_text.strip()
 
         # Get summary if needed
         if mode in ["summary", "both"]:
@@ -66,9 +80,11 @@ async def process_audio_file(file_path: Path, mode="both") -> dict:
                 """
 
                 app_logger.info(f"Generating summary from transcript")
-                summary_response = client.models.generate_content(
+                summary_text = await call_gemini_async(
+                    summary_prompt,
                     model=model,
-                    contents=summary_prompt
+                    timeout=AUDIO_TIMEOUT_SECONDS,
+                    use_cache=True
                 )
             else:
                 # If we don't have a transcript yet, ask Gemini to analyze the audio directly
@@ -91,13 +107,12 @@ async def process_audio_file(file_path: Path, mode="both") -> dict:
                 """
 
                 app_logger.info(f"Generating direct summary from audio")
-                summary_response = client.models.generate_content(
+                summary_text = await call_gemini_async(
+                    [summary_prompt, uploaded_file],
                     model=model,
-                    contents=[summary_prompt, uploaded_file]
+                    timeout=AUDIO_TIMEOUT_SECONDS
                 )
 
-            summary_text = summary_response.text
-
             # Parse the response
             title = ""
             summary = ""
@@ -146,7 +161,7 @@ async def process_audio_file(file_path: Path, mode="both") -> dict:
 
         # Clean up by deleting the file from Gemini Files API
         try:
-            client.files.delete(name=uploaded_file.name)
+            await client.aio.files.delete(name=uploaded_file.name)
             app_logger.info(f"Deleted file from Gemini Files API: {uploaded_file.name}")
         except Exception as e:
             app_logger.warning(f"Failed to delete file from Gemini Files API: {e}")
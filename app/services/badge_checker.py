@@ -146,7 +146,7 @@ class BadgeChecker:
 
             # If only one variation, use direct query
             if len(activity_variations) == 1:
-                result = self.db.table('user_activities') \
+                result = await self.db.table('user_activities') \
                     .select("id", count="exact") \
                     .eq("user_id", user_id) \
                     .eq("activity_type", activity_variations[0]) \
@@ -155,7 +155,7 @@ class BadgeChecker:
 
             # For multiple variations, we need to use OR filters
             filter_string = ",".join([f"activity_type.eq.{variation}" for variation in activity_variations])
-            result = self.db.table('user_activities') \
+            result = await self.db.table('user_activities') \
                 .select("id", count="exact") \
                 .eq("user_id", user_id) \
                 .or_(filter_string) \
@@ -176,7 +176,7 @@ class BadgeChecker:
 
             # Query for all variations
             if len(activity_variations) == 1:
-                result = self.db.table('user_activities') \
+                result = await self.db.table('user_activities') \
                     .select("timestamp") \
                     .eq("user_id", user_id) \
                     .eq("activity_type", activity_variations[0]) \
@@ -184,7 +184,7 @@ class BadgeChecker:
                     .execute()
             else:
                 filter_string = ",".join([f"activity_type.eq.{variation}" for variation in activity_variations])
-                result = self.db.table('user_activities') \
+                result = await self.db.table('user_activities') \
                     .select("timestamp") \
                     .eq("user_id", user_id) \
                     .or_(filter_string) \
@@ -233,7 +233,7 @@ class BadgeChecker:
     async def _check_streak_badges(self, user_id: str, current_badge_ids: List[int], awarded_badges: List[Dict]):
         """Check if user qualifies for streak badges"""
         try:
-            result = self.db.table('user_streaks') \
+            result = await self.db.table('user_streaks') \
                 .select("current_streak") \
                 .eq("user_id", user_id) \
                 .execute()
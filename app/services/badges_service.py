@@ -1,16 +1,17 @@
 from typing import List, Optional
 from app.core.exception import CustomHTTPException
-from app.database.connection import supabase_db
+from app.database.connection import Database, database
 from app.core.app_logging import app_logger
 
 class BadgeService:
-    def __init__(self):
-        self.db = supabase_db
+    def __init__(self, db: Database = database):
+        self.db = db
         self._badge_cache = {}
-        self._load_badges()
 
     async def _load_badges(self):
-        """Load badges into memory cache with criteria"""
+        """Load badges into memory cache with criteria (once; the first award triggers it)"""
+        if self._badge_cache:
+            return
         try:
             result = await self.db.table('badges').select("*").execute()
             self._badge_cache = {badge['id']: badge for badge in result.data}
@@ -18,9 +19,14 @@ class BadgeService:
             app_logger.error(f"Failed to load badges: {str(e)}")
             raise CustomHTTPException("Failed to initialize badge service")
 
+    async def get_all_badges(self) -> List[dict]:
+        result = await self.db.table('badges').select("*").execute()
+        return result.data
+
     async def award_badge(self, user_id: str, badge_id: int) -> bool:
         """Award a badge to a user"""
         try:
+            await self._load_badges()
             if badge_id not in self._badge_cache:
                 return False
 
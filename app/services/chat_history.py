@@ -0,0 +1,180 @@
+"""
+Per-session chatbot history.
+
+Each (owner, session) keeps its most recent messages plus a running summary of
+everything older. Once a session holds more than CHAT_HISTORY_MAX_MESSAGES, the
+oldest messages are folded into the summary with Gemini, leaving
+CHAT_HISTORY_KEEP_RECENT verbatim, so prompts built from the history stop
+growing. Summarizing runs as a background task (one per session at a time),
+so answering a question never waits on it. At most CHAT_HISTORY_MAX_SESSIONS sessions are kept in memory (least
+recently used dropped first); with REDIS_URL configured every session is also
+written to Redis and reloaded from there on a miss.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core import cache
+from app.core.config import settings
+from app.core.app_logging import app_logger as logger
+from app.services.gemini_client import call_gemini_async
+
+REDIS_PREFIX = "alif-chat:"
+
+SessionKey = Tuple[str, str]
+
+
+class ChatHistoryStore:
+    def __init__(self, max_sessions: int, max_messages: int, keep_recent: int, ttl_seconds: int):
+        self.max_sessions = max(1, max_sessions)
+        self.max_messages = max(2, max_messages)
+        self.keep_recent = max(0, min(keep_recent, self.max_messages - 1))
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[SessionKey, dict]" = OrderedDict()
+        self._compactions: Dict[SessionKey, asyncio.Task] = {}
+
+    @staticmethod
+    def _new_session() -> dict:
+        return {"summary": "", "messages": [], "compacted": 0, "updated_at": time.time()}
+
+    @staticmethod
+    def _redis_key(key: SessionKey) -> str:
+        return f"{REDIS_PREFIX}{key[0]}:{key[1]}"
+
+    def _remember(self, key: SessionKey, session: dict):
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def get(self, owner_id: str, session_id: str) -> dict:
+        key = (owner_id, session_id)
+        session = self._sessions.get(key)
+        if session is not None:
+            self._sessions.move_to_end(key)
+            return session
+
+        session = None
+        if cache.redis_client is not None:
+            try:
+                raw = await cache.redis_client.get(self._redis_key(key))
+                session = json.loads(raw) if raw else None
+            except Exception as e:
+                logger.warning(f"Failed to load chat history from Redis: {e}")
+        session = session or self._new_session()
+        self._remember(key, session)
+        return session
+
+    async def _save(self, key: SessionKey, session: dict):
+        if cache.redis_client is None:
+            return
+        try:
+            await cache.redis_client.set(self._redis_key(key), json.dumps(session), ex=self.ttl_seconds)
+            await cache.redis_client.sadd(f"{REDIS_PREFIX}sessions:{key[0]}", key[1])
+        except Exception as e:
+            logger.warning(f"Failed to store chat history in Redis: {e}")
+
+    async def append_turn(self, owner_id: str, session_id: str, question: str, answer: str):
+        key = (owner_id, session_id)
+        session = await self.get(owner_id, session_id)
+        session["messages"].append({"role": "user", "content": question})
+        session["messages"].append({"role": "assistant", "content": answer})
+        session["updated_at"] = time.time()
+        await self._save(key, session)
+        if len(session["messages"]) > self.max_messages and key not in self._compactions:
+            task = asyncio.create_task(self._compact_in_background(key, session))
+            self._compactions[key] = task
+            task.add_done_callback(lambda _: self._compactions.pop(key, None))
+
+    async def _compact_in_background(self, key: SessionKey, session: dict):
+        try:
+            # Turns appended while summarizing may push the session over the limit again
+            while len(session["messages"]) > self.max_messages:
+                await self._compact(session)
+            # Skip the save if the session was cleared or evicted meanwhile
+            if self._sessions.get(key) is session:
+                await self._save(key, session)
+        except Exception as e:
+            logger.error(f"Chat history compaction failed: {e}")
+
+    async def _compact(self, session: dict):
+        """Fold everything but the most recent messages into the running summary."""
+        cut = len(session["messages"]) - self.keep_recent
+        old = session["messages"][:cut]
+        transcript = "\n".join(
+            f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in old
+        )
+        prompt = f"""Update the running summary of a study conversation between a student and an assistant.
+Keep the topics covered, facts and definitions established, and any open questions. Be concise (under 250 words).
+
+Current summary:
+{session['summary'] or '(none)'}
+
+New messages:
+{transcript}
+
+Updated summary:"""
+        try:
+            session["summary"] = (await call_gemini_async(prompt)).strip()
+        except Exception as e:
+            # Keep the history bounded even if the summary can't be refreshed
+            logger.warning(f"Chat history summarization failed, dropping {len(old)} old messages: {e}")
+        # Re-slice: turns appended during the await must be kept
+        session["messages"] = session["messages"][cut:]
+        session["compacted"] += len(old)
+
+    async def page(self, owner_id: str, session_id: str, offset: int = 0, limit: int = 50) -> dict:
+        """Retained messages in chronological order, `limit` at a time, plus the summary."""
+        session = await self.get(owner_id, session_id)
+        messages = session["messages"]
+        offset = max(0, offset)
+        limit = max(1, limit)
+        return {
+            "summary": session["summary"],
+            "compacted_messages": session["compacted"],
+            "total": len(messages),
+            "offset": offset,
+            "limit": limit,
+            "chat_history": messages[offset:offset + limit]
+        }
+
+    async def clear_owner(self, owner_id: str):
+        """Forget every session of the owner."""
+        for key, task in list(self._compactions.items()):
+            if key[0] == owner_id:
+                task.cancel()
+        for key in [key for key in self._sessions if key[0] == owner_id]:
+            del self._sessions[key]
+        if cache.redis_client is None:
+            return
+        try:
+            index_key = f"{REDIS_PREFIX}sessions:{owner_id}"
+            session_ids = await cache.redis_client.smembers(index_key)
+            keys = [self._redis_key((owner_id, session_id)) for session_id in session_ids]
+            await cache.redis_client.delete(index_key, *keys)
+        except Exception as e:
+            logger.warning(f"Failed to clear chat history in Redis: {e}")
+
+
+def format_history(session: dict, max_messages: Optional[int] = None) -> str:
+    """Render a session (summary first, then recent turns) for a prompt."""
+    messages: List[Dict[str, str]] = session["messages"]
+    if max_messages is not None:
+        messages = messages[-max_messages:]
+    lines = []
+    if session.get("summary"):
+        lines.append(f"Summary of earlier conversation: {session['summary']}")
+    for msg in messages:
+        role = "User" if msg["role"] == "user" else "Assistant"
+        lines.append(f"{role}: {msg['content']}")
+    return "\n".join(lines)
+
+
+chat_history_store = ChatHistoryStore(
+    max_sessions=settings.CHAT_HISTORY_MAX_SESSIONS,
+    max_messages=settings.CHAT_HISTORY_MAX_MESSAGES,
+    keep_recent=settings.CHAT_HISTORY_KEEP_RECENT,
+    ttl_seconds=settings.CHAT_HISTORY_TTL_SECONDS
+)
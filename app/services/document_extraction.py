@@ -0,0 +1,227 @@
+"""
+Document text extraction shared by every upload endpoint.
+
+PDFs are parsed with PyMuPDF. Large PDFs are split into page ranges that are
+extracted in parallel by a process pool (EXTRACTION_MAX_WORKERS processes), so a
+500-page textbook uses every core and never runs on the event loop. Pages come
+back in order from `iter_pdf_pages`, a generator, and documents over
+EXTRACTION_MAX_BYTES or EXTRACTION_MAX_PAGES are rejected with 413.
+
+A source is either the raw bytes of the upload or a path to it on disk; with a
+path, worker processes open the file themselves instead of receiving a copy.
+
+Results are cached by content hash (see app.services.extraction_cache), so a
+document that was parsed before is served from disk.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import fitz  # PyMuPDF
+from app.core.config import settings
+from app.core.exception import CustomHTTPException
+from app.core.app_logging import app_logger as logger
+from app.services.extraction_cache import content_hash, extraction_cache
+
+Source = Union[bytes, bytearray, memoryview, str, Path]
+
+PDF = "application/pdf"
+PPTX = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+DOCX_TYPES = ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/msword")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, not fork: the server process runs threads
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.EXTRACTION_MAX_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def shutdown_extraction_pool():
+    """Stop the worker processes. Called from main.lifespan on shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _open_pdf(source: Source) -> fitz.Document:
+    if isinstance(source, (str, Path)):
+        return fitz.open(str(source))
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _extract_page_range(source: Source, start: int, end: int) -> List[str]:
+    """Runs in a worker process: text of pages [start, end)."""
+    with _open_pdf(source) as doc:
+        return [doc[i].get_text("text") for i in range(start, end)]
+
+
+def _source_size(source: Source) -> int:
+    if isinstance(source, (str, Path)):
+        return os.path.getsize(source)
+    return len(source)
+
+
+def check_size(source: Source):
+    size = _source_size(source)
+    if size > settings.EXTRACTION_MAX_BYTES:
+        raise CustomHTTPException(
+            f"File is too large ({size // (1024 * 1024)} MB); the limit is "
+            f"{settings.EXTRACTION_MAX_BYTES // (1024 * 1024)} MB",
+            status_code=413
+        )
+
+
+def iter_pdf_pages(source: Source) -> Iterator[Dict]:
+    """
+    Yield {"text", "page_number"} for every page, in order. Blocking: call it from a
+    worker thread (see extract_pdf_pages / extract_pdf_text for the async versions).
+    """
+    check_size(source)
+    digest = content_hash(source)
+    cached = extraction_cache.get(digest, "pdf")
+    if cached is not None:
+        for i, text in enumerate(cached):
+            yield {"text": text, "page_number": i + 1}
+        return
+
+    texts = []
+    for page in _parse_pdf_pages(source):
+        texts.append(page["text"])
+        yield page
+    extraction_cache.put(digest, "pdf", texts)
+
+
+def _parse_pdf_pages(source: Source) -> Iterator[Dict]:
+    try:
+        with _open_pdf(source) as doc:
+            page_count = len(doc)
+            if page_count > settings.EXTRACTION_MAX_PAGES:
+                raise CustomHTTPException(
+                    f"PDF has {page_count} pages; the limit is {settings.EXTRACTION_MAX_PAGES}",
+                    status_code=413
+                )
+            if page_count < settings.EXTRACTION_PARALLEL_MIN_PAGES or settings.EXTRACTION_MAX_WORKERS <= 1:
+                # Not worth shipping to other processes
+                for i in range(page_count):
+                    yield {"text": doc[i].get_text("text"), "page_number": i + 1}
+                return
+    except CustomHTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to open PDF for extraction: {e}")
+        raise CustomHTTPException(f"Failed to read PDF content: {e}", status_code=422)
+
+    # Two ranges per worker keeps every process busy without copying the source too often
+    ranges = settings.EXTRACTION_MAX_WORKERS * 2
+    step = max(settings.EXTRACTION_PARALLEL_MIN_PAGES // 2, -(-page_count // ranges))
+    if isinstance(source, memoryview):
+        source = source.tobytes()
+    pool = _get_pool()
+    futures = [
+        pool.submit(_extract_page_range, source, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+    try:
+        page_number = 1
+        for future in futures:
+            for text in future.result():
+                yield {"text": text, "page_number": page_number}
+                page_number += 1
+    except Exception as e:
+        logger.error(f"Parallel PDF extraction failed: {e}")
+        raise CustomHTTPException(f"Failed to read PDF content: {e}", status_code=422)
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _read_bytes(source: Source) -> bytes:
+    if isinstance(source, (str, Path)):
+        return Path(source).read_bytes()
+    return bytes(source)
+
+
+def extract_document_pages(source: Source, content_type: str) -> List[Dict]:
+    """Pages of a PDF, TXT, PPTX or DOCX document. Blocking."""
+    if content_type == PDF:
+        return list(iter_pdf_pages(source))
+
+    check_size(source)
+    kind = _cache_kind(content_type)
+    digest = content_hash(source) if kind else None
+    if kind:
+        cached = extraction_cache.get(digest, kind)
+        if cached is not None:
+            return [{"text": text, "page_number": i + 1} for i, text in enumerate(cached)]
+
+    pages = _parse_other(source, content_type)
+    if kind:
+        extraction_cache.put(digest, kind, [page["text"] for page in pages])
+    return pages
+
+
+def _cache_kind(content_type: str) -> Optional[str]:
+    if content_type == PPTX:
+        return "pptx"
+    if content_type in DOCX_TYPES:
+        return "docx"
+    # Plain text is cheaper to decode than to look up
+    return None
+
+
+def _parse_other(source: Source, content_type: str) -> List[Dict]:
+    try:
+        if content_type and content_type.startswith("text/"):
+            return [{"text": _read_bytes(source).decode("utf-8", errors="ignore"), "page_number": 1}]
+        if content_type == PPTX:
+            from pptx import Presentation
+
+            prs = Presentation(BytesIO(_read_bytes(source)))
+            return [
+                {
+                    "text": "\n".join(shape.text for shape in slide.shapes if hasattr(shape, "text")),
+                    "page_number": i + 1
+                }
+                for i, slide in enumerate(prs.slides)
+            ]
+        if content_type in DOCX_TYPES:
+            import docx2txt
+
+            return [{"text": docx2txt.process(BytesIO(_read_bytes(source))), "page_number": 1}]
+    except Exception as e:
+        logger.error(f"Failed to extract text from {content_type} document: {e}")
+        raise CustomHTTPException(f"Failed to extract text from file: {e}", status_code=422)
+
+    raise CustomHTTPException(f"Unsupported file type: {content_type}", status_code=415)
+
+
+async def extract_pdf_pages(source: Source) -> List[Dict]:
+    return await asyncio.to_thread(lambda: list(iter_pdf_pages(source)))
+
+
+async def extract_pdf_text(source: Source) -> str:
+    """All page texts of a PDF joined by newlines, extracted off the event loop."""
+    pages = await extract_pdf_pages(source)
+    return "\n".join(page["text"] for page in pages).strip()
+
+
+async def extract_document_text(source: Source, content_type: str) -> str:
+    pages = await asyncio.to_thread(extract_document_pages, source, content_type)
+    return "\n".join(page["text"] for page in pages).strip()
@@ -0,0 +1,82 @@
+"""
+Batched, concurrent embedding of document chunks.
+
+Chunks are grouped into provider-sized batches (EMBEDDING_BATCH_SIZE). Each batch
+is embedded in a worker thread, so the event loop keeps serving requests while a
+textbook is being ingested. A process-wide semaphore keeps at most
+EMBEDDING_MAX_CONCURRENCY batches in flight across all uploads, which is the
+backpressure. Failed batches are retried with exponential backoff.
+"""
+import asyncio
+import time
+from typing import Callable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.core.app_logging import app_logger as logger
+
+# progress(done_chunks, total_chunks)
+ProgressCallback = Callable[[int, int], None]
+
+# Shared by every ingestion in this worker so concurrent uploads can't overload the API
+_embedding_semaphore = asyncio.Semaphore(settings.EMBEDDING_MAX_CONCURRENCY)
+
+
+async def _embed_batch(embeddings: Embeddings, batch: List[str], index: int, max_retries: int) -> List[List[float]]:
+    attempt = 0
+    while True:
+        async with _embedding_semaphore:
+            try:
+                return await asyncio.to_thread(embeddings.embed_documents, batch)
+            except Exception as e:
+                attempt += 1
+                if attempt > max_retries:
+                    logger.error(f"Embedding batch {index} failed after {attempt} attempts: {e}")
+                    raise
+                delay = settings.EMBEDDING_RETRY_BASE_SECONDS * (2 ** (attempt - 1))
+                logger.warning(f"Embedding batch {index} failed (attempt {attempt}/{max_retries + 1}), retrying in {delay:.1f}s: {e}")
+        # Back off outside the semaphore so other batches can use the slot
+        await asyncio.sleep(delay)
+
+
+async def embed_texts(
+        embeddings: Embeddings,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        progress: Optional[ProgressCallback] = None
+) -> List[List[float]]:
+    """Embed texts in concurrent batches and return the vectors in input order."""
+    if not texts:
+        return []
+    batch_size = max(1, batch_size or settings.EMBEDDING_BATCH_SIZE)
+    max_retries = settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    total = len(texts)
+    done = 0
+    started = time.perf_counter()
+
+    async def run(index: int, batch: List[str]) -> List[List[float]]:
+        nonlocal done
+        vectors = await _embed_batch(embeddings, batch, index, max_retries)
+        done += len(batch)
+        if progress is not None:
+            try:
+                progress(done, total)
+            except Exception as e:
+                logger.warning(f"Embedding progress callback failed: {e}")
+        return vectors
+
+    tasks = [asyncio.create_task(run(i, batch)) for i, batch in enumerate(batches)]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    logger.info(
+        f"Embedded {total} chunks in {len(batches)} batches in {time.perf_counter() - started:.2f}s"
+    )
+    return [vector for batch_vectors in results for vector in batch_vectors]
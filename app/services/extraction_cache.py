@@ -0,0 +1,108 @@
+"""
+On-disk cache of extracted document text.
+
+Entries are keyed by the SHA-256 of the uploaded bytes (plus the document kind)
+and hold the per-page texts as zlib-compressed JSON under EXTRACTION_CACHE_DIR.
+A hit refreshes the file's mtime; once the directory grows past
+EXTRACTION_CACHE_MAX_BYTES the least recently used files are deleted. The same
+PDF sent to the quiz, flashcard, summarizer, solver and chatbot endpoints is
+therefore parsed once.
+"""
+import hashlib
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import List, Optional, Union
+
+from app.core.config import settings
+from app.core.app_logging import app_logger as logger
+
+Source = Union[bytes, bytearray, memoryview, str, Path]
+
+
+def content_hash(source: Source) -> str:
+    """SHA-256 of the document bytes; paths are hashed in 1 MB blocks."""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    else:
+        digest.update(source)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _path(self, digest: str, kind: str) -> Path:
+        return self.directory / f"{digest}.{kind}.zz"
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._size = sum(p.stat().st_size for p in self.directory.glob("*.zz"))
+        return self._size
+
+    def get(self, digest: str, kind: str) -> Optional[List[str]]:
+        path = self._path(digest, kind)
+        try:
+            pages = json.loads(zlib.decompress(path.read_bytes()))
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable extraction cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return pages
+
+    def put(self, digest: str, kind: str, pages: List[str]):
+        data = zlib.compress(json.dumps(pages).encode("utf-8"), 6)
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(digest, kind)
+        with self._lock:
+            size = self._current_size()
+            try:
+                previous = path.stat().st_size if path.exists() else 0
+                tmp = path.with_suffix(f".tmp{threading.get_ident()}")
+                tmp.write_bytes(data)
+                tmp.replace(path)
+            except Exception as e:
+                logger.warning(f"Failed to write extraction cache entry {path.name}: {e}")
+                return
+            self._size = size - previous + len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits again (lock held)."""
+        entries = []
+        for p in self.directory.glob("*.zz"):
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if self._size <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            self._size -= size
+            self.stats["evictions"] += 1
+
+
+extraction_cache = ExtractionCache(settings.EXTRACTION_CACHE_DIR, settings.EXTRACTION_CACHE_MAX_BYTES)
@@ -0,0 +1,162 @@
+"""
+FAISS index types for large document collections.
+
+LangChain's FAISS store always starts with an exact IndexFlatL2. Once an index
+holds VECTOR_INDEX_PROMOTE_THRESHOLD vectors it is rebuilt as the approximate
+index named by VECTOR_INDEX_TYPE:
+
+- "hnsw":     IndexHNSWFlat, graph search, no training, full vectors kept
+- "ivf_flat": IndexIVFFlat, inverted lists over k-means cells, trained on a sample
+- "ivf_pq":   IndexIVFPQ, like ivf_flat but vectors product-quantized to a few bytes
+- "flat":     never promote
+
+Every type keeps squared-L2 distances and the same vector order, so the
+docstore mapping of the LangChain store stays valid after a rebuild.
+
+Run `python -m app.services.faiss_index <owner_id>` to compare recall and
+latency of each type on an owner's stored vectors.
+"""
+import math
+import sys
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+from app.core.config import settings
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# 8-bit PQ codebooks have 256 centroids each; FAISS wants ~39 training points per centroid
+PQ_MIN_TRAIN = 256 * 39
+
+
+def index_type(index) -> str:
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    return type(index).__name__
+
+
+def _nlist(count: int) -> int:
+    # ~4 * sqrt(n) cells, with at least 39 training points per cell as FAISS recommends
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+
+def _pq_subquantizers(dim: int) -> int:
+    for m in (96, 64, 48, 32, 24, 16, 8):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def apply_search_params(index):
+    """Set query-time knobs, which are not part of the saved index."""
+    kind = index_type(index)
+    if kind == "hnsw":
+        index.hnsw.efSearch = settings.VECTOR_INDEX_HNSW_EF_SEARCH
+    elif kind in ("ivf_flat", "ivf_pq"):
+        index.nprobe = min(settings.VECTOR_INDEX_NPROBE, index.nlist)
+    return index
+
+
+def build_index(kind: str, vectors: np.ndarray):
+    """Build an index of the given type holding `vectors` (float32, shape n x dim)."""
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}', expected one of {INDEX_TYPES}")
+    count, dim = vectors.shape
+
+    if kind == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, settings.VECTOR_INDEX_HNSW_M)
+    else:
+        nlist = _nlist(count)
+        quantizer = faiss.IndexFlatL2(dim)
+        if kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), 8)
+        # Train on a random sample; k-means cost grows with the sample, not the collection
+        min_train = max(nlist * 39, PQ_MIN_TRAIN if kind == "ivf_pq" else 0)
+        sample_size = min(count, max(min_train, settings.VECTOR_INDEX_TRAIN_SAMPLE))
+        sample = vectors[np.random.default_rng(0).choice(count, size=sample_size, replace=False)]
+        index.train(sample)
+
+    index.add(vectors)
+    return apply_search_params(index)
+
+
+def all_vectors(index) -> np.ndarray:
+    """Every stored vector, in insertion order (flat and HNSW indexes)."""
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def promotion_target(index) -> Optional[str]:
+    """Index type this flat index should be rebuilt as now, or None."""
+    target = settings.VECTOR_INDEX_TYPE
+    if target == "flat" or index_type(index) != "flat":
+        return None
+    if index.ntotal < settings.VECTOR_INDEX_PROMOTE_THRESHOLD:
+        return None
+    if target == "ivf_pq" and index.ntotal < PQ_MIN_TRAIN:
+        return None
+    return target
+
+
+def benchmark(vectors: np.ndarray, kinds=INDEX_TYPES, queries: int = 200, k: int = 10) -> List[Dict]:
+    """
+    Build each index type over `vectors` and measure recall@k against exact search,
+    mean query latency, build time and serialized size. Queries are sampled from the
+    stored vectors themselves.
+    """
+    count = vectors.shape[0]
+    rng = np.random.default_rng(1)
+    query_vectors = vectors[rng.choice(count, size=min(queries, count), replace=False)]
+    k = min(k, count)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(query_vectors, k)
+
+    results = []
+    for kind in kinds:
+        if kind == "ivf_pq" and count < PQ_MIN_TRAIN:
+            results.append({"type": kind, "skipped": f"needs at least {PQ_MIN_TRAIN} vectors"})
+            continue
+        started = time.perf_counter()
+        index = build_index(kind, vectors)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _, found = index.search(query_vectors, k)
+        latency_ms = (time.perf_counter() - started) * 1000 / len(query_vectors)
+
+        hits = sum(len(set(row_found) & set(row_truth)) for row_found, row_truth in zip(found, truth))
+        results.append({
+            "type": kind,
+            "vectors": count,
+            "recall_at_k": round(hits / (len(query_vectors) * k), 4),
+            "latency_ms": round(latency_ms, 3),
+            "build_seconds": round(build_seconds, 3),
+            "size_mb": round(faiss.serialize_index(index).nbytes / (1024 * 1024), 2)
+        })
+    return results
+
+
+if __name__ == "__main__":
+    from app.services.vector_store import vector_store_manager
+
+    owner = sys.argv[1] if len(sys.argv) > 1 else "default"
+    db = vector_store_manager.get(owner)
+    if db is None:
+        sys.exit(f"No vector store for '{owner}'")
+    if index_type(db.index) not in ("flat", "hnsw"):
+        sys.exit(f"Index for '{owner}' is {index_type(db.index)}; benchmark needs stored full vectors")
+    for row in benchmark(all_vectors(db.index)):
+        print(row)
@@ -1,23 +1,64 @@
-from google import genai
+import asyncio
+from typing import Optional, Union, List, Any
+
 from google.genai import types
 from app.core.config import settings
 from app.core.app_logging import app_logger as logger
+from app.core.cache import llm_cache
+from app.services.model_registry import model_registry
+
+# Upper bound on Gemini requests in flight from this worker
+_gemini_semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
 
-# Create client using the API key from settings
-client = genai.Client(api_key=settings.GEMINI_KEY)
 
-def call_gemini(prompt: str, model: str = None, config: types.GenerateContentConfig = None) -> str:
+async def call_gemini_async(
+        prompt: Union[str, List[Any]],
+        model: str = None,
+        config: types.GenerateContentConfig = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = False
+) -> str:
     """
-    Calls the Google Gemini model using the genai library, returning the raw text response.
+    Calls the Google Gemini model, returning the raw text response.
+
+    Requests go through the SDK's async client, are limited to GEMINI_MAX_CONCURRENCY
+    in flight per worker and are cancelled after `timeout` seconds
+    (GEMINI_TIMEOUT_SECONDS by default). Cancelling the awaiting task, e.g. when the
+    client disconnects, cancels the underlying request too.
+
+    With use_cache=True, text prompts are answered from the LLM response cache when
+    the same model, config and prompt were seen before. Leave it off for personalized
+    output that must not be shared between users.
     """
-    try:
-        model_name = model or settings.GEMINI_MODEL_NAME
-        response = client.models.generate_content(
-            model=model_name,
-            contents=prompt,
-            config=config  # pass the config if provided
+    model_name = model or settings.GEMINI_MODEL_NAME
+    timeout = timeout or settings.GEMINI_TIMEOUT_SECONDS
+
+    if use_cache and isinstance(prompt, str):
+        key = llm_cache.make_key(model_name, config, prompt)
+        return await llm_cache.get_or_generate(
+            key, lambda: _generate_async(prompt, model_name, config, timeout)
         )
-        return response.text
-    except Exception as e:
-        logger.error(f"Error calling Gemini: {e}")
-        raise Exception("LLM call failed")
\ No newline at end of file
+    return await _generate_async(prompt, model_name, config, timeout)
+
+
+async def _generate_async(prompt, model_name: str, config, timeout: float) -> str:
+    async with _gemini_semaphore:
+        try:
+            response = await asyncio.wait_for(
+                model_registry.client.aio.models.generate_content(
+                    model=model_name,
+                    contents=prompt,
+                    config=config
+                ),
+                timeout=timeout
+            )
+            return response.text
+        except asyncio.TimeoutError:
+            logger.error(f"Gemini call timed out after {timeout}s (model: {model_name})")
+            raise Exception("LLM call timed out")
+        except asyncio.CancelledError:
+            logger.info(f"Gemini call cancelled (model: {model_name})")
+            raise
+        except Exception as e:
+            logger.error(f"Error calling Gemini: {e}")
+            raise Exception("LLM call failed")
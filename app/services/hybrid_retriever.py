@@ -0,0 +1,188 @@
+"""
+Hybrid keyword + vector retrieval for the document chatbot.
+
+A BM25 inverted index over the owner's chunk texts is combined with FAISS
+similarity. Both candidate lists are merged with reciprocal rank fusion, then
+(optionally) reranked by a weighted blend of the normalized vector similarity
+and BM25 score. That blend is returned as each chunk's `relevance`, so the
+sources shown to the user carry real scores.
+
+The BM25 index is built from the FAISS docstore the first time an owner's
+documents are searched and rebuilt only after their vector store version changes.
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from langchain.docstore.document import Document
+from app.core.config import settings
+from app.core.app_logging import app_logger as logger
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Reciprocal rank fusion constant from the original RRF paper
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1]
+
+
+def chunk_key(doc: Document) -> tuple:
+    meta = doc.metadata
+    return meta.get("source"), meta.get("page_number"), meta.get("chunk_index"), hash(doc.page_content)
+
+
+class BM25Index:
+    def __init__(self, documents: List[Document], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = documents
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: List[int] = []
+        self.positions: Dict[tuple, int] = {}
+        for idx, doc in enumerate(documents):
+            tokens = tokenize(doc.page_content)
+            self.doc_lengths.append(len(tokens))
+            self.positions[chunk_key(doc)] = idx
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, {})[idx] = tf
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.documents)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _term_score(self, tf: int, idx: int, idf: float) -> float:
+        norm = 1 - self.b + self.b * (self.doc_lengths[idx] / self.avg_length if self.avg_length else 0)
+        return idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top-k (document position, score); only postings of the query terms are visited."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for idx, tf in postings.items():
+                scores[idx] = scores.get(idx, 0.0) + self._term_score(tf, idx, idf)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def score(self, query: str, doc: Document) -> float:
+        idx = self.positions.get(chunk_key(doc))
+        if idx is None:
+            return 0.0
+        total = 0.0
+        for term in set(tokenize(query)):
+            tf = self.postings.get(term, {}).get(idx)
+            if tf:
+                total += self._term_score(tf, idx, self._idf(term))
+        return total
+
+
+_bm25_indexes: "OrderedDict[str, Tuple[int, BM25Index]]" = OrderedDict()
+_bm25_lock = threading.Lock()
+
+
+def get_bm25_index(owner_id: str, version: int, vector_db) -> BM25Index:
+    """BM25 index over the owner's chunks, rebuilt only when the vector store version changes."""
+    with _bm25_lock:
+        entry = _bm25_indexes.get(owner_id)
+        if entry is not None and entry[0] == version:
+            _bm25_indexes.move_to_end(owner_id)
+            return entry[1]
+        documents = list(getattr(vector_db.docstore, "_dict", {}).values())
+        index = BM25Index(documents)
+        _bm25_indexes[owner_id] = (version, index)
+        _bm25_indexes.move_to_end(owner_id)
+        while len(_bm25_indexes) > settings.VECTOR_STORE_MAX_RESIDENT:
+            _bm25_indexes.popitem(last=False)
+        logger.info(f"Built BM25 index for '{owner_id}' over {len(documents)} chunks")
+        return index
+
+
+class HybridRetriever(BaseRetriever):
+    vector_db: Any
+    owner_id: str
+    version: int = 0
+    k: int = 3
+    fetch_k: int = 20
+    alpha: float = 0.6  # weight of vector similarity in the blended relevance
+    rerank: bool = True
+
+    def _get_relevant_documents(
+            self, query: str, *, run_manager: Optional[CallbackManagerForRetrieverRun] = None
+    ) -> List[Document]:
+        bm25 = get_bm25_index(self.owner_id, self.version, self.vector_db)
+
+        # FAISS returns squared L2 distances; for the unit-length Gemini embeddings
+        # cosine similarity is 1 - d/2, the same scale used for BM25-only candidates below
+        vector_hits = [
+            (doc, 1 - distance / 2)
+            for doc, distance in self.vector_db.similarity_search_with_score(query, k=self.fetch_k)
+        ]
+        keyword_hits = [(bm25.documents[idx], score) for idx, score in bm25.search(query, self.fetch_k)]
+
+        candidates: Dict[tuple, dict] = {}
+        for rank, (doc, similarity) in enumerate(vector_hits):
+            entry = candidates.setdefault(chunk_key(doc), {"doc": doc, "rrf": 0.0, "vector": None, "bm25": None})
+            entry["rrf"] += 1.0 / (RRF_K + rank + 1)
+            entry["vector"] = max(0.0, min(1.0, similarity))
+        for rank, (doc, score) in enumerate(keyword_hits):
+            entry = candidates.setdefault(chunk_key(doc), {"doc": doc, "rrf": 0.0, "vector": None, "bm25": None})
+            entry["rrf"] += 1.0 / (RRF_K + rank + 1)
+            entry["bm25"] = score
+
+        if not candidates:
+            return []
+
+        # Fill in the score each candidate is missing from the other retriever
+        missing_vectors = [entry for entry in candidates.values() if entry["vector"] is None]
+        if missing_vectors:
+            query_vector = self.vector_db.embeddings.embed_query(query)
+            texts = [entry["doc"].page_content for entry in missing_vectors]
+            for entry, vector in zip(missing_vectors, self.vector_db.embeddings.embed_documents(texts)):
+                entry["vector"] = max(0.0, _cosine(query_vector, vector))
+        for entry in candidates.values():
+            if entry["bm25"] is None:
+                entry["bm25"] = bm25.score(query, entry["doc"])
+
+        max_bm25 = max(entry["bm25"] for entry in candidates.values()) or 1.0
+        for entry in candidates.values():
+            entry["relevance"] = self.alpha * entry["vector"] + (1 - self.alpha) * (entry["bm25"] / max_bm25)
+
+        sort_key = "relevance" if self.rerank else "rrf"
+        ranked = sorted(candidates.values(), key=lambda entry: entry[sort_key], reverse=True)[:self.k]
+
+        # Copies, so the scores never leak into the documents held by the docstore
+        return [
+            Document(
+                page_content=entry["doc"].page_content,
+                metadata={**entry["doc"].metadata, "relevance": round(entry["relevance"], 4)}
+            )
+            for entry in ranked
+        ]
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def hybrid_retriever(owner_id: str, vector_db, version: int) -> HybridRetriever:
+    return HybridRetriever(
+        vector_db=vector_db,
+        owner_id=owner_id,
+        version=version,
+        k=settings.RETRIEVAL_K,
+        fetch_k=settings.RETRIEVAL_FETCH_K,
+        alpha=settings.RETRIEVAL_HYBRID_ALPHA,
+        rerank=settings.RETRIEVAL_RERANK
+    )
@@ -0,0 +1,141 @@
+"""
+Background ingestion jobs for chatbot uploads.
+
+An upload is turned into an IngestionJob and put on an asyncio queue served by
+INGESTION_WORKERS worker tasks (started in `main.lifespan`). The request
+returns the job id straight away and clients poll the job for per-file
+progress. Job state lives in this process and, when REDIS_URL is configured, is
+mirrored to Redis so a status poll can be answered by any worker.
+"""
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.core import cache
+from app.core.config import settings
+from app.core.app_logging import app_logger as logger
+from app.models.ingestion import FileProgress, IngestionJob
+
+JobHandler = Callable[[IngestionJob], Awaitable[None]]
+
+REDIS_PREFIX = "alif-ingest:"
+
+
+class IngestionJobQueue:
+    def __init__(self, workers: int, job_ttl_seconds: int):
+        self.worker_count = max(1, workers)
+        self.job_ttl_seconds = job_ttl_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._done_events: Dict[str, asyncio.Event] = {}
+
+    async def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"ingestion-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info(f"Started {self.worker_count} ingestion workers")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    async def submit(self, owner_id: str, files: List[FileProgress], handler: JobHandler) -> IngestionJob:
+        """Queue a job; handler(job) does the work and updates job.files as it goes."""
+        await self.start()
+        self._prune()
+        job = IngestionJob(id=str(uuid.uuid4()), owner_id=owner_id, files=files, created_at=time.time())
+        self._jobs[job.id] = job
+        self._done_events[job.id] = asyncio.Event()
+        await self.save(job)
+        await self._queue.put((job, handler))
+        logger.info(f"Queued ingestion job {job.id} for '{owner_id}' with {len(files)} files")
+        return job
+
+    async def _worker(self, index: int):
+        while True:
+            job, handler = await self._queue.get()
+            try:
+                await self._run(job, handler)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestionJob, handler: JobHandler):
+        job.status = "running"
+        job.started_at = time.time()
+        await self.save(job)
+        try:
+            await handler(job)
+            failed = [f for f in job.files if f.status == "failed"]
+            if not failed:
+                job.status = "completed"
+            elif len(failed) == len(job.files):
+                job.status = "failed"
+            else:
+                job.status = "completed_with_errors"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Cancelled during shutdown"
+            raise
+        except Exception as e:
+            logger.exception(f"Ingestion job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            await self.save(job)
+            event = self._done_events.pop(job.id, None)
+            if event is not None:
+                event.set()
+        logger.info(f"Ingestion job {job.id} {job.status} in {job.finished_at - job.started_at:.2f}s")
+
+    async def save(self, job: IngestionJob):
+        """Publish the job's current state to Redis (no-op without Redis)."""
+        if cache.redis_client is None:
+            return
+        try:
+            await cache.redis_client.set(REDIS_PREFIX + job.id, job.model_dump_json(), ex=self.job_ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Failed to store ingestion job {job.id} in Redis: {e}")
+
+    async def get(self, job_id: str) -> Optional[IngestionJob]:
+        job = self._jobs.get(job_id)
+        if job is not None or cache.redis_client is None:
+            return job
+        try:
+            raw = await cache.redis_client.get(REDIS_PREFIX + job_id)
+        except Exception as e:
+            logger.warning(f"Failed to read ingestion job {job_id} from Redis: {e}")
+            return None
+        return IngestionJob.model_validate_json(raw) if raw else None
+
+    def list_for_owner(self, owner_id: str) -> List[IngestionJob]:
+        jobs = [job for job in self._jobs.values() if job.owner_id == owner_id]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[IngestionJob]:
+        """Wait for a job queued by this worker to finish."""
+        event = self._done_events.get(job_id)
+        if event is not None:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and (job.finished_at or 0) < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+ingestion_queue = IngestionJobQueue(settings.INGESTION_WORKERS, settings.INGESTION_JOB_TTL_SECONDS)
@@ -0,0 +1,141 @@
+"""
+Process-wide registry of Gemini model handles.
+
+The app talks to Gemini through three SDKs: google-genai (`genai.Client`),
+google-generativeai (`GenerativeModel`) and LangChain (`ChatGoogleGenerativeAI`,
+`GoogleGenerativeAIEmbeddings`). The registry builds each handle once, keyed by
+model name, generation config and safety settings, and hands the same object
+back to every request. It is configured in `main.lifespan`.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from google import genai
+from google.genai import types
+import google.generativeai as genai_legacy
+from app.core.config import settings
+from app.core.app_logging import app_logger as logger
+
+DEFAULT_EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+def _freeze(value: Any) -> Any:
+    """Turn configs (dicts, lists, pydantic models, enums) into a hashable key."""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if hasattr(value, "model_dump_json"):
+        return value.model_dump_json(exclude_none=True)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._api_key = settings.GEMINI_KEY
+        self._client: Optional[genai.Client] = None
+        self._handles: Dict[tuple, Any] = {}
+        self.stats = {"created": 0, "reused": 0}
+
+    def configure(self, api_key: Optional[str] = None):
+        """Configure both Google SDKs with the API key. Called once at startup."""
+        self._api_key = api_key or settings.GEMINI_KEY
+        genai_legacy.configure(api_key=self._api_key)
+        with self._lock:
+            self._client = None
+            self._handles.clear()
+
+    @property
+    def langchain_api_key(self) -> str:
+        return settings.GOOGLE_API_KEY or self._api_key
+
+    @property
+    def client(self) -> genai.Client:
+        """Shared google-genai client; its HTTP transport is reused by every call."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = genai.Client(
+                        api_key=self._api_key,
+                        http_options=types.HttpOptions(timeout=int(settings.GEMINI_TIMEOUT_SECONDS * 1000))
+                    )
+                    self.stats["created"] += 1
+        return self._client
+
+    def _get_or_create(self, key: tuple, factory):
+        handle = self._handles.get(key)
+        if handle is not None:
+            self.stats["reused"] += 1
+            return handle
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                handle = factory()
+                self._handles[key] = handle
+                self.stats["created"] += 1
+                logger.info(f"Model registry created handle {key[0]} for '{key[1]}'")
+        return handle
+
+    def generative_model(
+            self,
+            model_name: Optional[str] = None,
+            generation_config: Optional[dict] = None,
+            safety_settings: Optional[dict] = None
+    ) -> genai_legacy.GenerativeModel:
+        """google-generativeai GenerativeModel for the given model and configs."""
+        model_name = model_name or settings.GEMINI_MODEL_NAME
+        key = ("generative", model_name, _freeze(generation_config), _freeze(safety_settings))
+        return self._get_or_create(key, lambda: genai_legacy.GenerativeModel(
+            model_name=model_name,
+            generation_config=generation_config,
+            safety_settings=safety_settings
+        ))
+
+    def chat_model(self, model_name: Optional[str] = None, temperature: float = 0.7, **kwargs):
+        """LangChain chat model for the given model and sampling settings."""
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        model_name = model_name or settings.GEMINI_MODEL_NAME
+        key = ("chat", model_name, temperature, _freeze(kwargs))
+        return self._get_or_create(key, lambda: ChatGoogleGenerativeAI(
+            model=model_name,
+            temperature=temperature,
+            google_api_key=self.langchain_api_key,
+            **kwargs
+        ))
+
+    def embeddings(self, model_name: str = DEFAULT_EMBEDDING_MODEL, cached: bool = True):
+        """
+        LangChain embeddings client for the given embedding model. By default it is
+        wrapped in CachedEmbeddings so previously seen chunks are not embedded again.
+        """
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        key = ("embeddings", model_name)
+        embeddings = self._get_or_create(key, lambda: GoogleGenerativeAIEmbeddings(
+            model=model_name,
+            google_api_key=self.langchain_api_key
+        ))
+        if not cached:
+            return embeddings
+
+        from app.services.embedding_cache import CachedEmbeddings, get_embedding_cache
+
+        cached_key = ("cached_embeddings", model_name)
+        return self._get_or_create(cached_key, lambda: CachedEmbeddings(embeddings, model_name, get_embedding_cache()))
+
+    def warm_up(self):
+        """Build the handles every worker needs so the first request doesn't pay for them."""
+        self.client
+        self.generative_model()
+        self.chat_model()
+        self.embeddings()
+        logger.info(f"Model registry warmed up with {len(self._handles)} handles")
+
+
+model_registry = ModelRegistry()
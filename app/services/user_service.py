@@ -1,42 +1,144 @@
-from supabase import create_client, Client
+import threading
+import time
+from collections import OrderedDict
 from app.core.config import settings
+from app.database.connection import Database, database
+from app.core.app_logging import app_logger as logger
 from typing import Optional, Dict, Any
 
+# PostgreSQL "undefined column": the lower-case lookup migration hasn't been applied
+UNDEFINED_COLUMN = "42703"
+
+
+def _quote(value: str) -> str:
+    """Quote a value for a PostgREST or=(...) filter so commas and parentheses stay literal."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards, including `*`, which PostgREST treats as an alias of `%`."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "\\*")
+
+
+class NegativeLookupCache:
+    """
+    Bounded, short-lived set of identifiers known not to belong to any user, so a
+    flood of failed logins for unknown names doesn't reach the database each time.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+    def add(self, key: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
 class UserService:
-    def __init__(self):
-        self.supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    def __init__(self, db: Database = database):
+        self.db = db
+        self.not_found = NegativeLookupCache(
+            settings.USER_LOOKUP_NEGATIVE_CACHE_SIZE, settings.USER_LOOKUP_NEGATIVE_TTL_SECONDS
+        )
+        self._lower_columns = True
 
-    async def get_user_by_username(self, username: str):
-        """Get a user by username with case-insensitive matching"""
-        # Normalize username to lowercase
-        normalized_username = username.lower() if username else None
+    async def _query_users(self, username: Optional[str], email: Optional[str]) -> list:
+        """Users whose username or email equals the given lower-case values, via the indexed columns."""
+        if self._lower_columns:
+            filters = []
+            if username:
+                filters.append(f"username_lower.eq.{_quote(username)}")
+            if email:
+                filters.append(f"email_lower.eq.{_quote(email)}")
+            try:
+                return (await self.db.table('users').select("*").or_(",".join(filters)).limit(2).execute()).data
+            except Exception as e:
+                if UNDEFINED_COLUMN not in str(e):
+                    raise
+                logger.warning(
+                    "users.username_lower/email_lower are missing; apply "
+                    "app/database/sql/001_users_lower_lookup.sql. Falling back to ILIKE lookups."
+                )
+                self._lower_columns = False
 
-        if not normalized_username:
+        # Without the migration: case-insensitive ILIKE (wildcards escaped), still one round trip.
+        # PostgREST rewrites `*` to `%` before Postgres sees it, so re-check matches exactly.
+        filters = []
+        if username:
+            filters.append(f"username.ilike.{_quote(_escape_like(username))}")
+        if email:
+            filters.append(f"email.ilike.{_quote(_escape_like(email))}")
+        users = (await self.db.table('users').select("*").or_(",".join(filters)).limit(2).execute()).data
+        return [
+            user for user in users
+            if (username and (user.get('username') or '').lower() == username)
+            or (email and (user.get('email') or '').lower() == email)
+        ]
+
+    async def find_user(self, identifier: str) -> Optional[Dict[Any, Any]]:
+        """User whose username or email matches `identifier`, ignoring case."""
+        normalized = identifier.strip().lower() if identifier else None
+        if not normalized or normalized in self.not_found:
             return None
 
-        # Try case-insensitive match using ilike
-        user_result = self.supabase.table('users').select("*").ilike("username", normalized_username).execute()
+        users = await self._query_users(normalized, normalized)
+        if not users:
+            self.not_found.add(normalized)
+            return None
+        # Prefer a username match over an email match
+        for user in users:
+            if (user.get('username') or '').lower() == normalized:
+                return user
+        return users[0]
 
-        # If no results or ilike not supported, try alternative approach
-        if not user_result.data:
-            # Get all users and filter manually
-            all_users = self.supabase.table('users').select("*").execute()
-            user_result.data = [
-                user for user in all_users.data
-                if user.get('username', '').lower() == normalized_username or
-                   user.get('email', '').lower() == normalized_username
-            ]
+    async def find_existing(self, username: str, email: str) -> Optional[Dict[Any, Any]]:
+        """Any user already holding `username` or `email` (both lower case)."""
+        users = await self._query_users(username, email)
+        return users[0] if users else None
 
-        if user_result.data:
-            return user_result.data[0]
+    def forget_missing(self, *identifiers: str):
+        """
+        Drop identifiers from this worker's negative cache once a user with them
+        exists. Registration publishes USER_REGISTERED on the event bus so every
+        worker calls this, see app.endpoints.auth.
+        """
+        self.not_found.discard(*(identifier.lower() for identifier in identifiers if identifier))
 
-        return None
+    async def get_user_by_username(self, username: str):
+        """Get a user by username with case-insensitive matching"""
+        return await self.find_user(username)
     
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[Any, Any]]:
         """Get user by ID from database"""
         try:
-            result = self.supabase.table('users').select("*").eq('id', user_id).single().execute()
+            result = await self.db.table('users').select("*").eq('id', user_id).single().execute()
             return result.data if result.data else None
         except Exception as e:
             print(f"Error fetching user: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+user_service = UserService()
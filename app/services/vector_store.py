@@ -0,0 +1,283 @@
+"""
+Per-owner FAISS vector stores.
+
+Each user (or session) gets its own index, saved under VECTOR_STORE_DIR with
+FAISS `save_local` and loaded lazily on first use. At most
+VECTOR_STORE_MAX_RESIDENT indexes are kept in memory; the least recently used
+one is dropped (it stays on disk). Large indexes are rebuilt as an approximate
+FAISS index type, see app.services.faiss_index. New documents are appended to the existing
+index, so previously uploaded chunks are never embedded again.
+
+`aadd_documents` is the async entry point used by ingestion: it embeds the new
+chunks through the batched pipeline and only touches the index (in a worker
+thread) once all vectors are ready. Async code reads indexes through `aget` and
+`amanifest`, which may load from disk, so the event loop never waits on a lock.
+
+Disk work (loading, `save_local`, manifest rebuilds) and index changes run under
+a per-owner lock; the manager-wide lock only guards the in-memory dicts, so one
+owner's slow load or save never blocks another owner. Promoting a large index
+is built outside every lock and swapped in under the owner's.
+
+Alongside each index a per-file manifest (manifest.json) records every source's
+pages, chunk count and sizes. It is updated as chunks are added, so listing an
+owner's files costs O(files) instead of a scan over every chunk in the docstore.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from langchain_community.vectorstores import FAISS
+from langchain.docstore.document import Document
+from app.core.config import settings
+from app.core.app_logging import app_logger as logger
+from app.services.model_registry import model_registry
+from app.services.embedding_pipeline import ProgressCallback, embed_texts
+from app.services.faiss_index import all_vectors, apply_search_params, build_index, index_type, promotion_target
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+class VectorStoreManager:
+    def __init__(self, base_dir: str, max_resident: int):
+        self.base_dir = Path(base_dir)
+        self.max_resident = max(1, max_resident)
+        self._indexes: "OrderedDict[str, FAISS]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._manifests: Dict[str, Dict[str, dict]] = {}
+        self._promoting: Set[str] = set()
+        self._owner_locks: Dict[str, threading.RLock] = {}
+        # Guards the dicts above; never held while waiting for an owner lock
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return model_registry.embeddings(EMBEDDING_MODEL)
+
+    def _path(self, owner_id: str) -> Path:
+        # Readable prefix plus a hash so different ids never map to the same folder
+        safe = re.sub(r"[^\w\-]", "_", owner_id)[:40]
+        digest = hashlib.sha1(owner_id.encode("utf-8")).hexdigest()[:10]
+        return self.base_dir / f"{safe}_{digest}"
+
+    def _owner_lock(self, owner_id: str) -> threading.RLock:
+        with self._lock:
+            lock = self._owner_locks.get(owner_id)
+            if lock is None:
+                lock = self._owner_locks[owner_id] = threading.RLock()
+            return lock
+
+    def _remember(self, owner_id: str, db: FAISS):
+        """Call with self._lock held."""
+        self._indexes[owner_id] = db
+        self._indexes.move_to_end(owner_id)
+        while len(self._indexes) > self.max_resident:
+            evicted, _ = self._indexes.popitem(last=False)
+            logger.info(f"Vector store for '{evicted}' evicted from memory (kept on disk)")
+
+    def get(self, owner_id: str) -> Optional[FAISS]:
+        """Return the owner's index, loading it from disk if it is not resident."""
+        with self._lock:
+            db = self._indexes.get(owner_id)
+            if db is not None:
+                self._indexes.move_to_end(owner_id)
+                return db
+
+        with self._owner_lock(owner_id):
+            with self._lock:
+                # Another thread may have loaded it while we waited
+                db = self._indexes.get(owner_id)
+                if db is not None:
+                    return db
+            path = self._path(owner_id)
+            if not (path / "index.faiss").exists():
+                return None
+            try:
+                db = FAISS.load_local(str(path), self.embeddings, allow_dangerous_deserialization=True)
+                apply_search_params(db.index)
+            except Exception as e:
+                logger.error(f"Failed to load vector store for '{owner_id}' from {path}: {e}")
+                return None
+            with self._lock:
+                self._remember(owner_id, db)
+            logger.info(f"Loaded vector store for '{owner_id}' from disk")
+            return db
+
+    async def aget(self, owner_id: str) -> Optional[FAISS]:
+        return await asyncio.to_thread(self.get, owner_id)
+
+    async def aadd_documents(
+            self,
+            owner_id: str,
+            documents: List[Document],
+            progress: Optional[ProgressCallback] = None
+    ) -> Optional[FAISS]:
+        """Embed the documents in concurrent batches off the event loop, then append them."""
+        if not documents:
+            return await asyncio.to_thread(self.get, owner_id)
+        texts = [doc.page_content for doc in documents]
+        vectors = await embed_texts(self.embeddings, texts, progress=progress)
+        return await asyncio.to_thread(
+            self._add_embeddings, owner_id, list(zip(texts, vectors)), [doc.metadata for doc in documents]
+        )
+
+    def _add_embeddings(self, owner_id: str, text_embeddings: list, metadatas: List[dict]) -> FAISS:
+        with self._owner_lock(owner_id):
+            db = self.get(owner_id)
+            # Load (or rebuild) the manifest before the index changes
+            self.manifest(owner_id)
+            if db is None:
+                db = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas)
+            else:
+                db.add_embeddings(text_embeddings, metadatas=metadatas)
+            self._update_manifest(owner_id, [(text, meta) for (text, _), meta in zip(text_embeddings, metadatas)])
+            self._save(owner_id, db)
+            with self._lock:
+                self._remember(owner_id, db)
+                self._versions[owner_id] = self._versions.get(owner_id, 0) + 1
+        self._promote(owner_id, db)
+        return db
+
+    def _promote(self, owner_id: str, db: FAISS):
+        """Rebuild the owner's flat index as the configured approximate type once it is large enough."""
+        owner_lock = self._owner_lock(owner_id)
+        with owner_lock:
+            target = promotion_target(db.index)
+            with self._lock:
+                if target is None or owner_id in self._promoting:
+                    return
+                self._promoting.add(owner_id)
+            vectors = all_vectors(db.index)
+        try:
+            started = time.perf_counter()
+            index = build_index(target, vectors)
+            with owner_lock:
+                with self._lock:
+                    current = self._indexes.get(owner_id)
+                if current is not db or index_type(db.index) != "flat":
+                    # Cleared or reloaded while building
+                    return
+                # Carry over vectors added while the new index was being built
+                added = db.index.ntotal - len(vectors)
+                if added:
+                    index.add(db.index.reconstruct_n(len(vectors), added))
+                db.index = index
+                self._save(owner_id, db)
+            logger.info(
+                f"Promoted FAISS index for '{owner_id}' to {target} with {index.ntotal} vectors "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        except Exception as e:
+            logger.error(f"Failed to promote FAISS index for '{owner_id}': {e}")
+        finally:
+            with self._lock:
+                self._promoting.discard(owner_id)
+
+    def _save(self, owner_id: str, db: FAISS):
+        """Call with the owner's lock held."""
+        path = self._path(owner_id)
+        path.mkdir(parents=True, exist_ok=True)
+        db.save_local(str(path))
+        manifest = self._manifests.get(owner_id)
+        if manifest is not None:
+            tmp = path / "manifest.json.tmp"
+            tmp.write_text(json.dumps(manifest), encoding="utf-8")
+            tmp.replace(path / "manifest.json")
+
+    def _update_manifest(self, owner_id: str, chunks: Iterable[tuple]):
+        """Fold (text, metadata) pairs for newly added chunks into the owner's manifest."""
+        manifest = self.manifest(owner_id)
+        now = time.time()
+        # Pages per source are gathered in sets and merged into the sorted lists once
+        new_pages: Dict[str, Set[int]] = {}
+        for text, metadata in chunks:
+            source = metadata.get("source")
+            if source is None:
+                continue
+            entry = manifest.get(source)
+            if entry is None:
+                entry = manifest[source] = {
+                    "source": source,
+                    "pages": [],
+                    "chunk_count": 0,
+                    "text_bytes": 0,
+                    "file_size": 0,
+                    "added_at": now
+                }
+            page = metadata.get("page_number")
+            if page is not None:
+                new_pages.setdefault(source, set()).add(page)
+            entry["chunk_count"] += 1
+            entry["text_bytes"] += len(text.encode("utf-8"))
+            entry["file_size"] = max(entry["file_size"], metadata.get("file_size") or 0)
+        for source, pages in new_pages.items():
+            entry = manifest[source]
+            entry["pages"] = sorted(pages.union(entry["pages"]))
+
+    def manifest(self, owner_id: str) -> Dict[str, dict]:
+        """Per-file summary of the owner's index, keyed by source name."""
+        with self._lock:
+            manifest = self._manifests.get(owner_id)
+        if manifest is not None:
+            return manifest
+
+        with self._owner_lock(owner_id):
+            with self._lock:
+                manifest = self._manifests.get(owner_id)
+            if manifest is not None:
+                return manifest
+            path = self._path(owner_id) / "manifest.json"
+            if path.exists():
+                try:
+                    manifest = json.loads(path.read_text(encoding="utf-8"))
+                except Exception as e:
+                    logger.error(f"Failed to read manifest for '{owner_id}': {e}")
+                    manifest = None
+            if manifest is None:
+                manifest = {}
+                with self._lock:
+                    self._manifests[owner_id] = manifest
+                # Index saved before manifests existed: build it once from the docstore
+                db = self.get(owner_id)
+                if db is not None:
+                    docs = getattr(db.docstore, "_dict", {}).values()
+                    self._update_manifest(owner_id, [(d.page_content, d.metadata) for d in docs])
+                    self._save(owner_id, db)
+                    logger.info(f"Rebuilt manifest for '{owner_id}' with {len(manifest)} files")
+            with self._lock:
+                self._manifests[owner_id] = manifest
+            return manifest
+
+    async def amanifest(self, owner_id: str) -> Dict[str, dict]:
+        return await asyncio.to_thread(self.manifest, owner_id)
+
+    def clear(self, owner_id: str):
+        """Drop the owner's index from memory and disk."""
+        with self._owner_lock(owner_id):
+            with self._lock:
+                self._indexes.pop(owner_id, None)
+                self._manifests.pop(owner_id, None)
+                self._versions[owner_id] = self._versions.get(owner_id, 0) + 1
+            path = self._path(owner_id)
+            if path.exists():
+                shutil.rmtree(path, ignore_errors=True)
+
+    def invalidate(self, owner_id: str):
+        """Forget the in-memory copy so the next get() reloads the index from disk."""
+        with self._owner_lock(owner_id), self._lock:
+            self._indexes.pop(owner_id, None)
+            self._manifests.pop(owner_id, None)
+            self._versions[owner_id] = self._versions.get(owner_id, 0) + 1
+
+    def version(self, owner_id: str) -> int:
+        """Counter bumped whenever the owner's documents change."""
+        return self._versions.get(owner_id, 0)
+
+
+vector_store_manager = VectorStoreManager(settings.VECTOR_STORE_DIR, settings.VECTOR_STORE_MAX_RESIDENT)
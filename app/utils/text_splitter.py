@@ -0,0 +1,115 @@
+"""
+Token-aware text splitting shared by the summarizer, the PDF analyzer and
+chatbot ingestion.
+
+Text is cut into paragraphs, then sentences, and only sentences longer than a
+whole chunk are broken at words (or, for a single huge "word", at the character
+limit). Pieces are packed greedily into chunks while the running length is
+tracked incrementally, so splitting is linear in the size of the text.
+
+Chunk sizes are given in tokens and converted with a fixed characters-per-token
+estimate, which is close enough for Gemini on English text and needs no
+tokenizer round trip.
+"""
+import re
+from typing import Iterator, List, Optional, Tuple
+
+# Rough average for Gemini's tokenizer on English prose
+CHARS_PER_TOKEN = 4
+
+# Input context windows; a chunk may use at most a quarter of one, leaving room
+# for the prompt and, in map-reduce, for several partial results at once
+MODEL_CONTEXT_TOKENS = {
+    "gemini-2.0": 1_048_576,
+    "gemini-1.5-pro": 2_097_152,
+    "gemini-1.5-flash": 1_048_576,
+    "gemini-pro": 30_720,
+}
+DEFAULT_CONTEXT_TOKENS = 30_720
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def token_budget(model_name: Optional[str], max_tokens: int) -> int:
+    """Tokens per chunk for `model_name`: max_tokens, capped by the model's context window."""
+    context = DEFAULT_CONTEXT_TOKENS
+    for prefix, tokens in MODEL_CONTEXT_TOKENS.items():
+        if model_name and model_name.startswith(prefix):
+            context = tokens
+            break
+    return max(1, min(max_tokens, context // 4))
+
+
+class TextSplitter:
+    def __init__(self, chunk_tokens: int, overlap_tokens: int = 0):
+        self.max_chars = max(1, chunk_tokens * CHARS_PER_TOKEN)
+        # Overlap beyond half a chunk would make every chunk mostly repetition
+        self.overlap_chars = min(max(0, overlap_tokens * CHARS_PER_TOKEN), self.max_chars // 2)
+
+    def _pieces(self, text: str) -> Iterator[Tuple[str, str]]:
+        """(piece, separator joining it to the previous piece), in document order."""
+        for paragraph in _PARAGRAPH_RE.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            sep = "\n\n"
+            for sentence in _SENTENCE_RE.split(paragraph):
+                if not sentence:
+                    continue
+                if len(sentence) <= self.max_chars:
+                    yield sentence, sep
+                    sep = " "
+                    continue
+                for word in sentence.split():
+                    for start in range(0, len(word), self.max_chars):
+                        yield word[start:start + self.max_chars], sep if start == 0 else ""
+                    sep = " "
+
+    @staticmethod
+    def _join(pieces: List[Tuple[str, str]]) -> str:
+        parts = [pieces[0][0]]
+        for piece, sep in pieces[1:]:
+            parts.append(sep)
+            parts.append(piece)
+        return "".join(parts)
+
+    def _overlap(self, pieces: List[Tuple[str, str]]) -> Tuple[List[Tuple[str, str]], int]:
+        """Trailing pieces of a finished chunk that fit in the overlap, and their joined length."""
+        kept: List[Tuple[str, str]] = []
+        length = 0
+        for piece, sep in reversed(pieces):
+            added = len(piece) + (len(kept[-1][1]) if kept else 0)
+            if length + added > self.overlap_chars:
+                break
+            kept.append((piece, sep))
+            length += added
+        kept.reverse()
+        return kept, length
+
+    def split_text(self, text: str) -> List[str]:
+        chunks: List[str] = []
+        current: List[Tuple[str, str]] = []
+        length = 0
+        for piece, sep in self._pieces(text):
+            added = len(piece) + (len(sep) if current else 0)
+            if current and length + added > self.max_chars:
+                chunks.append(self._join(current))
+                current, length = self._overlap(current) if self.overlap_chars else ([], 0)
+                added = len(piece) + (len(sep) if current else 0)
+                if current and length + added > self.max_chars:
+                    current, length = [], 0
+                    added = len(piece)
+            current.append((piece, sep))
+            length += added
+        if current:
+            chunks.append(self._join(current))
+        return chunks
+
+
+def split_text(text: str, chunk_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    return TextSplitter(chunk_tokens, overlap_tokens).split_text(text)
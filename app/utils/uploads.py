@@ -0,0 +1,115 @@
+"""
+Buffered handling of uploaded files.
+
+`read_upload` streams an UploadFile in 1 MB chunks. Uploads up to
+UPLOAD_MEMORY_LIMIT are appended to one bytearray and handed out as a memoryview
+over it, which PyMuPDF and the extraction cache read without copying. Larger ones are spooled to a uniquely named temp file, so two
+users uploading "notes.pdf" at the same time never share a path. Anything over
+UPLOAD_MAX_BYTES is rejected with 413 while it is still being read.
+"""
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+import aiofiles
+from fastapi import UploadFile
+from app.core.config import settings
+from app.core.exception import CustomHTTPException
+from app.core.app_logging import app_logger as logger
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BufferedUpload:
+    def __init__(self, filename: str, content_type: Optional[str], size: int,
+                 buffer: Optional[bytearray] = None, path: Optional[Path] = None):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self._buffer = buffer
+        self.path = path
+
+    @property
+    def in_memory(self) -> bool:
+        return self._buffer is not None
+
+    @property
+    def data(self) -> Optional[memoryview]:
+        """Read-only view of the in-memory contents (no copy), or None if spooled."""
+        return memoryview(self._buffer).toreadonly() if self._buffer is not None else None
+
+    @property
+    def source(self) -> Union[memoryview, Path]:
+        """A view of the contents when held in memory, otherwise the spooled file's path."""
+        return self.data if self._buffer is not None else self.path
+
+    def close(self):
+        """Delete the spooled file, if any."""
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to remove spooled upload {self.path}: {e}")
+            self.path = None
+        self._buffer = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+
+async def read_upload(
+        file: UploadFile,
+        max_bytes: Optional[int] = None,
+        memory_limit: Optional[int] = None
+) -> BufferedUpload:
+    """Read an upload in chunks, keeping it in memory or spooling it to a unique temp file."""
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    memory_limit = settings.UPLOAD_MEMORY_LIMIT if memory_limit is None else memory_limit
+    filename = os.path.basename(file.filename or "upload")
+
+    buffer = bytearray()
+    size = 0
+    path: Optional[Path] = None
+    out = None
+    try:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise CustomHTTPException(
+                    f"File is too large; the limit is {max_bytes // (1024 * 1024)} MB", status_code=413
+                )
+            if out is None and size > memory_limit:
+                fd, name = tempfile.mkstemp(
+                    prefix="alif-upload-",
+                    suffix=Path(filename).suffix,
+                    dir=settings.UPLOAD_SPOOL_DIR or None
+                )
+                os.close(fd)
+                path = Path(name)
+                out = await aiofiles.open(path, "wb")
+                await out.write(buffer)
+                buffer = bytearray()
+            if out is not None:
+                await out.write(chunk)
+            else:
+                buffer += chunk
+    except BaseException:
+        if out is not None:
+            await out.close()
+        if path is not None:
+            path.unlink(missing_ok=True)
+        raise
+
+    if out is not None:
+        await out.close()
+        return BufferedUpload(filename, file.content_type, size, path=path)
+    return BufferedUpload(filename, file.content_type, size, buffer=buffer)
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# app.database.connection refuses to import without Supabase settings; the tests never reach it
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services.activity_log import ActivityWriter, rejected_rows
+
+UNKNOWN_USER = APIError({"message": "violates foreign key constraint", "code": "23503"})
+
+
+class FakeActivitiesTable:
+    """Records bulk inserts; `outage` makes every insert fail as if the database were unreachable."""
+
+    def __init__(self):
+        self.inserts = []
+        self.outage = False
+        self.rejected_users = set()
+        self._rows = None
+
+    def table(self, name):
+        assert name == "user_activities"
+        return self
+
+    def insert(self, rows):
+        self._rows = rows
+        return self
+
+    async def execute(self):
+        rows, self._rows = self._rows, None
+        if self.outage:
+            raise ConnectionError("connection refused")
+        if any(row["user_id"] in self.rejected_users for row in rows):
+            raise UNKNOWN_USER
+        self.inserts.append([row["user_id"] for row in rows])
+
+
+@pytest.fixture
+def db():
+    return FakeActivitiesTable()
+
+
+@pytest.fixture
+def writer(db, tmp_path):
+    return ActivityWriter(db, batch_size=3, flush_interval=60, spill_dir=str(tmp_path / "spill"))
+
+
+def spilled_users(writer):
+    lines = writer.spill_path.read_text(encoding="utf-8").splitlines()
+    return [json.loads(line)["user_id"] for line in lines]
+
+
+def test_rejected_rows_classification():
+    assert rejected_rows(UNKNOWN_USER)
+    assert rejected_rows(APIError({"message": "invalid input syntax for type uuid", "code": "22P02"}))
+    assert rejected_rows(APIError({"message": "Bad Request", "code": 400}))
+    assert rejected_rows(APIError({"message": "bad payload", "code": "PGRST102"}))
+    assert not rejected_rows(APIError({"message": "Bad Gateway", "code": 502}))
+    assert not rejected_rows(APIError({"message": "statement timeout", "code": "57014"}))
+    assert not rejected_rows(APIError({"message": "no schema", "code": "PGRST301"}))
+    assert not rejected_rows(ConnectionError("connection refused"))
+
+
+def test_flush_writes_in_batches(db, writer):
+    async def scenario():
+        futures = [writer.enqueue(f"user-{i}", "quiz") for i in range(7)]
+        await writer.flush()
+        return [future.result() for future in futures]
+
+    assert asyncio.run(scenario()) == [True] * 7
+    assert db.inserts == [["user-0", "user-1", "user-2"], ["user-3", "user-4", "user-5"], ["user-6"]]
+    assert writer.snapshot()["buffered"] == 0
+
+
+def test_full_batch_wakes_the_background_task(db, writer):
+    async def scenario():
+        await writer.start()
+        futures = [writer.enqueue(f"user-{i}", "quiz") for i in range(3)]
+        results = await asyncio.wait_for(asyncio.gather(*futures), timeout=5)
+        await writer.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [True] * 3
+    assert db.inserts == [["user-0", "user-1", "user-2"]]
+
+
+def test_outage_spills_then_replays(db, writer):
+    async def scenario():
+        db.outage = True
+        futures = [writer.enqueue(f"user-{i}", "quiz") for i in range(4)]
+        await writer.flush()
+
+        # The first failed batch is spilled; the rest stays buffered for the next flush
+        assert [future.done() and future.result() for future in futures] == [False] * 4
+        assert spilled_users(writer) == ["user-0", "user-1", "user-2"]
+        assert writer.snapshot()["buffered"] == 1
+
+        db.outage = False
+        futures.append(writer.enqueue("user-4", "quiz"))
+        await writer.flush()
+        return [future.result() for future in futures]
+
+    assert asyncio.run(scenario()) == [False, False, False, True, True]
+    assert db.inserts == [["user-3", "user-4"], ["user-0", "user-1", "user-2"]]
+    assert list(writer.spill_dir.iterdir()) == []
+    assert writer.stats["replayed"] == 3
+
+
+def test_stop_spills_what_cannot_be_written(db, writer):
+    async def scenario():
+        db.outage = True
+        future = writer.enqueue("user-0", "quiz")
+        await writer.stop()
+        return future.result()
+
+    assert asyncio.run(scenario()) is False
+    assert spilled_users(writer) == ["user-0"]
+
+
+def test_rejected_batch_is_retried_row_by_row(db, writer):
+    db.rejected_users = {"ghost"}
+
+    async def scenario():
+        futures = [writer.enqueue(user, "quiz") for user in ("user-0", "ghost", "user-2")]
+        await writer.flush()
+        return [future.result() for future in futures]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert db.inserts == [["user-0"], ["user-2"]]
+    assert writer.stats["rejected"] == 1
+    assert not writer.spill_path.exists()
+
+
+def test_outage_during_row_by_row_retry_spills_the_rest(db, writer):
+    db.rejected_users = {"ghost"}
+    real_execute = db.execute
+
+    async def execute():
+        # The database goes away right after refusing the bad row
+        if db._rows is not None and db._rows[0]["user_id"] == "ghost" and len(db._rows) == 1:
+            db.outage = True
+        return await real_execute()
+
+    db.execute = execute
+
+    async def scenario():
+        futures = [writer.enqueue(user, "quiz") for user in ("user-0", "ghost", "user-2")]
+        await writer.flush()
+        return [future.result() for future in futures]
+
+    assert asyncio.run(scenario()) == [True, False, False]
+    assert db.inserts == [["user-0"]]
+    assert spilled_users(writer) == ["ghost", "user-2"]
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+from langchain.docstore.document import Document
+
+from app.services import hybrid_retriever
+from app.services.hybrid_retriever import RRF_K, BM25Index, HybridRetriever, get_bm25_index, tokenize
+
+
+def doc(text: str, index: int) -> Document:
+    return Document(page_content=text, metadata={"source": "notes.pdf", "page_number": 1, "chunk_index": index})
+
+
+DOCS = [
+    doc("apple banana", 0),
+    doc("cherry durian", 1),
+    doc("apple cherry", 2),
+    doc("elderberry fig grape", 3),
+]
+
+
+class FakeEmbeddings:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, query):
+        return [1.0, 0.0]
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+
+class FakeVectorStore:
+    """Returns fixed FAISS hits (squared L2 distances) for every query."""
+
+    def __init__(self, documents, hits, vectors):
+        self.docstore = SimpleNamespace(_dict={str(i): d for i, d in enumerate(documents)})
+        self.hits = hits
+        self.embeddings = FakeEmbeddings(vectors)
+
+    def similarity_search_with_score(self, query, k):
+        return self.hits[:k]
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes(monkeypatch):
+    monkeypatch.setattr(hybrid_retriever, "_bm25_indexes", OrderedDict())
+
+
+def test_tokenize_lowercases_and_drops_single_characters():
+    assert tokenize("A Tale of 2 Cities, Vol. II") == ["tale", "of", "cities", "vol", "ii"]
+
+
+def test_search_only_returns_documents_with_query_terms():
+    index = BM25Index(DOCS)
+
+    assert {idx for idx, _ in index.search("apple", 10)} == {0, 2}
+    assert index.search("kiwi", 10) == []
+
+
+def test_rarer_terms_weigh_more():
+    index = BM25Index(DOCS)
+    # "apple" is in two documents, "banana" only in the first
+    results = dict(index.search("banana cherry", 10))
+
+    assert results[0] > results[1]
+    assert results[0] > results[2]
+
+
+def test_term_frequency_and_length_normalization():
+    index = BM25Index([doc("apple apple pie", 0), doc("apple pie", 1), doc("apple pie with a long list of toppings", 2)])
+    ranking = [idx for idx, _ in index.search("apple", 3)]
+
+    assert ranking == [0, 1, 2]
+
+
+def test_score_matches_search():
+    index = BM25Index(DOCS)
+    searched = dict(index.search("apple cherry", 10))
+
+    for idx, score in searched.items():
+        assert index.score("apple cherry", DOCS[idx]) == pytest.approx(score)
+    assert index.score("apple", doc("apple", 99)) == 0.0
+
+
+def test_index_is_rebuilt_only_for_a_new_version():
+    store = FakeVectorStore(DOCS, [], {})
+
+    first = get_bm25_index("owner", 1, store)
+    assert get_bm25_index("owner", 1, store) is first
+    assert get_bm25_index("owner", 2, store) is not first
+
+
+def retriever(store, rerank: bool, k: int = 3) -> HybridRetriever:
+    return HybridRetriever(vector_db=store, owner_id="owner", version=1, k=k, fetch_k=10, alpha=0.6, rerank=rerank)
+
+
+def test_reciprocal_rank_fusion_favours_documents_found_by_both():
+    vectors = {"apple banana": [0.0, 1.0]}
+    store = FakeVectorStore(DOCS, [(DOCS[1], 0.4), (DOCS[2], 0.6)], vectors)
+
+    results = retriever(store, rerank=False).invoke("apple")
+
+    # "apple cherry" is second in both lists: 2 / (RRF_K + 2) beats 1 / (RRF_K + 1)
+    assert 2 / (RRF_K + 2) > 1 / (RRF_K + 1)
+    assert results[0].page_content == "apple cherry"
+    assert {result.page_content for result in results[1:]} == {"cherry durian", "apple banana"}
+
+
+def test_rerank_orders_by_blended_relevance():
+    vectors = {"apple banana": [1.0, 0.0], "apple cherry": [0.6, 0.8]}
+    store = FakeVectorStore(DOCS, [(DOCS[1], 0.2), (DOCS[3], 1.8)], vectors)
+
+    results = retriever(store, rerank=True, k=4).invoke("apple")
+    relevance = [result.metadata["relevance"] for result in results]
+
+    assert relevance == sorted(relevance, reverse=True)
+    # Exact keyword match with an identical embedding: full marks on both scores
+    assert results[0].page_content == "apple banana"
+    assert relevance[0] == pytest.approx(1.0)
+    assert all("relevance" not in d.metadata for d in DOCS)
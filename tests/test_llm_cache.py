@@ -0,0 +1,153 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import cache
+from app.core.cache import LLMResponseCache, llm_cache_bypass, wants_cache_bypass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def counting_producer(value: str = "answer"):
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        return value
+
+    return produce, calls
+
+
+def test_least_recently_used_entry_is_evicted():
+    llm_cache = LLMResponseCache(max_entries=2, max_bytes=1000, ttl_seconds=60)
+
+    async def scenario():
+        await llm_cache.set("a", "1")
+        await llm_cache.set("b", "2")
+        await llm_cache.get("a")
+        await llm_cache.set("c", "3")
+        return [await llm_cache.get(key) for key in "abc"]
+
+    assert run(scenario()) == ["1", None, "3"]
+    assert llm_cache.stats["evictions"] == 1
+
+
+def test_total_size_is_bounded():
+    llm_cache = LLMResponseCache(max_entries=10, max_bytes=10, ttl_seconds=60)
+
+    async def scenario():
+        await llm_cache.set("a", "x" * 6)
+        await llm_cache.set("b", "y" * 6)
+        await llm_cache.set("huge", "z" * 11)
+        return [await llm_cache.get(key) for key in ("a", "b", "huge")]
+
+    assert run(scenario()) == [None, "y" * 6, None]
+    assert llm_cache.snapshot()["bytes"] == 6
+
+
+def test_entries_expire_after_their_ttl(clock):
+    llm_cache = LLMResponseCache(max_entries=10, max_bytes=1000, ttl_seconds=60)
+    run(llm_cache.set("short", "1", ttl=5))
+    run(llm_cache.set("default", "2"))
+
+    clock[0] += 10
+    assert run(llm_cache.get("short")) is None
+    assert run(llm_cache.get("default")) == "2"
+
+    clock[0] += 60
+    assert run(llm_cache.get("default")) is None
+    assert llm_cache.snapshot()["entries"] == 0
+
+
+def test_cached_value_is_reused():
+    llm_cache = LLMResponseCache(max_entries=10, max_bytes=1000, ttl_seconds=60)
+    produce, calls = counting_producer()
+
+    assert run(llm_cache.get_or_generate("key", produce)) == "answer"
+    assert run(llm_cache.get_or_generate("key", produce)) == "answer"
+    assert len(calls) == 1
+    assert llm_cache.stats["memory_hits"] == 1
+
+
+def test_concurrent_identical_requests_share_one_call():
+    llm_cache = LLMResponseCache(max_entries=10, max_bytes=1000, ttl_seconds=60)
+    calls = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def produce():
+            calls.append(1)
+            await release.wait()
+            return "answer"
+
+        waiters = [asyncio.create_task(llm_cache.get_or_generate("key", produce)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*waiters)
+
+    assert run(scenario()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert llm_cache.stats["misses"] == 1
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    llm_cache = LLMResponseCache(max_entries=10, max_bytes=1000, ttl_seconds=60)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise RuntimeError("LLM call failed")
+
+        waiters = [asyncio.create_task(llm_cache.get_or_generate("key", fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    produce, calls = counting_producer()
+    assert run(llm_cache.get_or_generate("key", produce)) == "answer"
+    assert len(calls) == 1
+
+
+def test_bypass_calls_the_producer_and_refreshes_the_entry():
+    llm_cache = LLMResponseCache(max_entries=10, max_bytes=1000, ttl_seconds=60)
+    run(llm_cache.set("key", "stale"))
+    produce, calls = counting_producer("fresh")
+
+    async def bypassed():
+        llm_cache_bypass.set(True)
+        return await llm_cache.get_or_generate("key", produce)
+
+    assert run(bypassed()) == "fresh"
+    assert len(calls) == 1
+    assert llm_cache.stats["bypassed"] == 1
+    assert run(llm_cache.get("key")) == "fresh"
+
+
+def test_bypass_headers():
+    assert wants_cache_bypass({"x-llm-cache": "BYPASS"})
+    assert wants_cache_bypass({"cache-control": "no-cache, no-store"})
+    assert not wants_cache_bypass({"cache-control": "max-age=0"})
+    assert not wants_cache_bypass({})
+
+
+def test_keys_depend_on_every_part():
+    key = LLMResponseCache.make_key("model", {"temperature": 0.7, "top_p": 0.9}, "prompt")
+
+    assert key == LLMResponseCache.make_key("model", {"top_p": 0.9, "temperature": 0.7}, "prompt")
+    assert key != LLMResponseCache.make_key("model", {"temperature": 0.2, "top_p": 0.9}, "prompt")
+    assert key != LLMResponseCache.make_key("other-model", {"temperature": 0.7, "top_p": 0.9}, "prompt")
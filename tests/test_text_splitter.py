@@ -0,0 +1,58 @@
+from app.utils.text_splitter import (
+    CHARS_PER_TOKEN, DEFAULT_CONTEXT_TOKENS, TextSplitter, estimate_tokens, split_text, token_budget
+)
+
+
+def sentences(count: int) -> str:
+    return " ".join(f"Sentence number {i} is here." for i in range(count))
+
+
+def test_short_text_is_one_chunk():
+    assert split_text("First para.\n\n\nSecond para.", 100) == ["First para.\n\nSecond para."]
+
+
+def test_empty_text_has_no_chunks():
+    assert split_text("  \n\n  ", 100) == []
+
+
+def test_chunks_end_on_sentence_boundaries_within_budget():
+    chunks = split_text(sentences(20), 20)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 20 * CHARS_PER_TOKEN for chunk in chunks)
+    assert all(chunk.startswith("Sentence") and chunk.endswith("here.") for chunk in chunks)
+    assert " ".join(chunks) == sentences(20)
+
+
+def test_overlap_repeats_trailing_sentences():
+    splitter = TextSplitter(chunk_tokens=20, overlap_tokens=8)
+    chunks = splitter.split_text(sentences(20))
+
+    for previous, current in zip(chunks, chunks[1:]):
+        last_sentence = previous.rsplit(". ", 1)[-1]
+        assert current.startswith(last_sentence)
+        assert len(last_sentence) <= splitter.overlap_chars
+    assert all(len(chunk) <= splitter.max_chars for chunk in chunks)
+
+
+def test_overlap_is_capped_at_half_a_chunk():
+    assert TextSplitter(chunk_tokens=10, overlap_tokens=100).overlap_chars == 10 * CHARS_PER_TOKEN // 2
+
+
+def test_oversized_word_is_cut_at_the_character_limit():
+    assert split_text("A" * 25, 2) == ["A" * 8, "A" * 8, "A" * 8, "A"]
+
+
+def test_long_sentence_breaks_at_words():
+    words = " ".join(f"word{i}" for i in range(50))
+    chunks = split_text(words, 5)
+
+    assert all(len(chunk) <= 5 * CHARS_PER_TOKEN for chunk in chunks)
+    assert " ".join(chunks).split() == words.split()
+
+
+def test_token_estimates():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcde") == 2
+    assert token_budget("gemini-2.0-flash", 8000) == 8000
+    assert token_budget("unknown-model", 10 ** 6) == DEFAULT_CONTEXT_TOKENS // 4
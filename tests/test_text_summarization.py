@@ -0,0 +1,71 @@
+import asyncio
+import re
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.cache import LLMResponseCache
+from app.core.config import settings
+from app.endpoints import text_sumarization
+from app.endpoints.text_sumarization import TextSummarizerGemini
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    """Summarizer whose Gemini calls are answered locally and recorded in `summarizer.calls`."""
+    monkeypatch.setattr(text_sumarization, "llm_cache", LLMResponseCache(100, 10 ** 6, 60))
+    monkeypatch.setattr(settings, "SUMMARY_CHUNK_TOKENS", 5)
+    monkeypatch.setattr(settings, "SUMMARY_REDUCE_FAN_IN", 3)
+    monkeypatch.setattr(TextSummarizerGemini, "model", property(lambda self: object()))
+
+    summarizer = TextSummarizerGemini()
+    summarizer.calls = []
+
+    async def generate(model, prompt):
+        if prompt.startswith("Summarize"):
+            summarizer.calls.append("map")
+            return "[" + re.search(r"Section (\d+)", prompt).group(1) + "]"
+        summarizer.calls.append("reduce")
+        return "(" + "+".join(re.findall(r"Summary \d+:\n(.+)", prompt)) + ")"
+
+    summarizer._generate = generate
+    return summarizer
+
+
+def sections(count: int) -> str:
+    # Each section fills most of a 5-token chunk, so every one is summarized on its own
+    return "\n\n".join(f"Section {i} text." for i in range(count))
+
+
+def test_reduce_recurses_until_one_summary_is_left(summarizer):
+    summary = asyncio.run(summarizer.summarize_text(sections(7)))
+
+    assert summary == "(([0]+[1]+[2])+([3]+[4]+[5])+[6])"
+    assert summarizer.calls.count("map") == 7
+    # Round one merges two full groups and passes the seventh summary through; round two merges the rest
+    assert summarizer.calls.count("reduce") == 3
+
+
+def test_single_chunk_is_not_reduced(summarizer):
+    assert asyncio.run(summarizer.summarize_text(sections(1))) == "[0]"
+    assert summarizer.calls == ["map"]
+
+
+def test_per_chunk_mode_joins_partial_summaries(summarizer):
+    summary = asyncio.run(summarizer.summarize_text(sections(4), mode="per_chunk"))
+
+    assert summary == "[0]\n[1]\n[2]\n[3]"
+    assert "reduce" not in summarizer.calls
+
+
+def test_repeated_chunks_are_summarized_once(summarizer):
+    text = "\n\n".join(["Section 0 text."] * 3)
+
+    assert asyncio.run(summarizer.summarize_text(text)) == "([0]+[0]+[0])"
+    assert summarizer.calls == ["map", "reduce"]
+
+
+def test_unknown_mode_is_rejected(summarizer):
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(summarizer.summarize_text(sections(2), mode="bullets"))
+    assert excinfo.value.status_code == 400
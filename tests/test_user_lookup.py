@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.event_bus import USER_REGISTERED, event_bus
+from app.endpoints import auth  # noqa: F401  (subscribes to USER_REGISTERED)
+from app.services import user_service as user_service_module
+from app.services.user_service import NegativeLookupCache, UserService, _escape_like, user_service
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(user_service_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+class FakeUsersTable:
+    """Just enough of the PostgREST query builder for UserService lookups."""
+
+    def __init__(self, rows, error=None):
+        self.rows = rows
+        self.error = error
+        self.filters = []
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return self
+
+    def or_(self, filters):
+        self.filters.append(filters)
+        return self
+
+    def limit(self, count):
+        return self
+
+    async def execute(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return SimpleNamespace(data=list(self.rows))
+
+
+def test_entries_expire(clock):
+    cache = NegativeLookupCache(max_entries=10, ttl_seconds=60)
+    cache.add("ghost")
+
+    clock[0] += 59
+    assert "ghost" in cache
+    clock[0] += 2
+    assert "ghost" not in cache
+
+
+def test_oldest_entries_are_evicted(clock):
+    cache = NegativeLookupCache(max_entries=2, ttl_seconds=60)
+    for name in ("a", "b", "c"):
+        cache.add(name)
+
+    assert "a" not in cache
+    assert "b" in cache and "c" in cache
+
+
+def test_disabled_cache_remembers_nothing():
+    cache = NegativeLookupCache(max_entries=0, ttl_seconds=60)
+    cache.add("ghost")
+    assert "ghost" not in cache
+
+
+def test_unknown_identifiers_skip_the_database_until_expiry(clock):
+    db = FakeUsersTable([])
+    service = UserService(db)
+
+    assert asyncio.run(service.find_user("Ghost")) is None
+    assert asyncio.run(service.find_user("ghost ")) is None
+    assert len(db.filters) == 1
+
+    clock[0] += service.not_found.ttl_seconds + 1
+    asyncio.run(service.find_user("ghost"))
+    assert len(db.filters) == 2
+
+
+def test_registration_clears_the_negative_cache():
+    user_service.not_found.add("newcomer")
+    user_service.not_found.add("newcomer@example.com")
+
+    asyncio.run(event_bus.publish(USER_REGISTERED, "user-id", identifiers=["Newcomer", "newcomer@example.com"]))
+
+    assert "newcomer" not in user_service.not_found
+    assert "newcomer@example.com" not in user_service.not_found
+
+
+def test_escape_like_covers_postgrest_wildcards():
+    assert _escape_like(r"a_b%c*d\e") == r"a\_b\%c\*d\\e"
+
+
+def test_ilike_fallback_keeps_only_exact_matches():
+    rows = [{"username": "a%b", "email": "other@example.com"}, {"username": "A*B", "email": "a*b@example.com"}]
+    db = FakeUsersTable(rows, error=Exception("column users.username_lower does not exist (42703)"))
+    service = UserService(db)
+
+    assert asyncio.run(service.find_user("a*b")) == rows[1]
+    assert not service._lower_columns
+    assert db.filters[-1] == 'username.ilike."a\\\\*b",email.ilike."a\\\\*b"'